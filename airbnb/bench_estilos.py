@@ -0,0 +1,64 @@
+"""
+Benchmark del registro de estilos: tiempo de estilado y de wb.save.
+
+Estila una grilla FC_DATA_ROWS × horizonte con los mismos roles que build_flujo,
+antes (_aplicar_estilo: objetos nuevos por celda) y después (style_cell con
+registro). Horizontes: 36, 360 y 1200 meses.
+
+    python bench_estilos.py [--horizontes 36 360 1200] [--repeticiones 3]
+"""
+
+import argparse
+import io
+import time
+
+import openpyxl
+
+import generar_flujo_caja as g
+
+
+def _grilla(horizonte, estilar):
+    wb  = openpyxl.Workbook()
+    ws  = wb.active
+    lay = g.layout(horizonte)
+
+    t0 = time.perf_counter()
+    for row_num, _, is_bold, num_fmt in g.FC_DATA_ROWS:
+        for m in range(1, horizonte + 1):
+            cell = ws.cell(row=row_num, column=m + 1)
+            bg, fg = g.fc_colores(row_num, m, lay)
+            estilar(cell, bg=bg, fg=fg, bold=is_bold, size=9, num_fmt=num_fmt)
+    t_estilo = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    wb.save(io.BytesIO())
+    t_save = time.perf_counter() - t0
+    return t_estilo, t_save
+
+
+def _antes(cell, bg, fg, bold, size, num_fmt):
+    g._aplicar_estilo(cell, bg, fg, bold, size, "right", False, num_fmt, False, True)
+
+
+def _despues(cell, bg, fg, bold, size, num_fmt):
+    g.style_cell(cell, bg=bg, fg=fg, bold=bold, size=size, num_fmt=num_fmt)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--horizontes", type=int, nargs="+", default=[36, 360, 1200])
+    ap.add_argument("--repeticiones", type=int, default=3)
+    args = ap.parse_args(argv)
+
+    print(f"{'meses':>6} {'celdas':>7}  {'estilo antes':>12} {'estilo después':>14}"
+          f"  {'save antes':>10} {'save después':>12}")
+    for h in args.horizontes:
+        antes   = min((_grilla(h, _antes)   for _ in range(args.repeticiones)), key=sum)
+        despues = min((_grilla(h, _despues) for _ in range(args.repeticiones)), key=sum)
+        print(f"{h:>6} {h * len(g.FC_DATA_ROWS):>7}  "
+              f"{antes[0]:>11.3f}s {despues[0]:>13.3f}s  "
+              f"{antes[1]:>9.3f}s {despues[1]:>11.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Benchmark de fórmulas por celda vs. fórmulas compartidas (formulas="compartidas").
+
+Por horizonte y modo mide: tamaño del xlsx (y del XML de las hojas sin
+comprimir), tiempo de generar_libro (armado + wb.save + valores cacheados),
+apertura con openpyxl y recálculo completo con evaluador.py. Si hay
+LibreOffice (soffice) en el PATH, mide además la apertura headless con
+recálculo (conversión a csv).
+
+    python bench_formulas.py [--horizontes 36 120 360] [--repeticiones 3]
+"""
+
+import argparse
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+import zipfile
+
+import openpyxl
+
+from evaluador import Evaluador
+from generar_flujo_caja import FORMULAS, generar_libro
+
+
+def _tiempo(fn, repeticiones):
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        fn()
+        mejor = min(mejor, time.perf_counter() - t0)
+    return mejor
+
+
+def _soffice(path, soffice):
+    with tempfile.TemporaryDirectory() as tmp:
+        subprocess.run([soffice, "--headless", "--convert-to", "csv", "--outdir", tmp, path],
+                       check=True, capture_output=True)
+
+
+def _bytes_xml(path):
+    with zipfile.ZipFile(path) as zf:
+        return sum(i.file_size for i in zf.infolist() if i.filename.startswith("xl/worksheets/"))
+
+
+def medir(horizonte, formulas, dir_out, repeticiones=3, soffice=None):
+    params = {"horizonte": horizonte}
+    out = os.path.join(dir_out, f"bench_{formulas}_{horizonte}.xlsx")
+    return {
+        "horizonte": horizonte,
+        "formulas":  formulas,
+        "generar":   _tiempo(lambda: generar_libro(params, out, formulas=formulas),
+                             repeticiones),
+        "bytes":     os.path.getsize(out),
+        "bytes_xml": _bytes_xml(out),
+        "abrir":     _tiempo(lambda: openpyxl.load_workbook(out), repeticiones),
+        "recalculo": _tiempo(lambda: Evaluador.desde_libro(out).calcular(), repeticiones),
+        "soffice":   _tiempo(lambda: _soffice(out, soffice), 1) if soffice else None,
+    }
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--horizontes", type=int, nargs="+", default=[36, 120, 360])
+    ap.add_argument("--repeticiones", type=int, default=3)
+    ap.add_argument("--dir", default=None, help="Dónde dejar los xlsx (por defecto: temporal)")
+    args = ap.parse_args(argv)
+
+    soffice = shutil.which("soffice") or shutil.which("libreoffice")
+    print(f"{'meses':>6} {'modo':>12} {'KB':>8} {'KB XML':>8} {'generar':>9} {'abrir':>8} "
+          f"{'recálculo':>10} {'soffice':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for h in args.horizontes:
+            for formulas in FORMULAS:
+                r = medir(h, formulas, args.dir or tmp, args.repeticiones, soffice)
+                lo = f"{r['soffice']:>7.2f}s" if r["soffice"] is not None else f"{'–':>8}"
+                print(f"{h:>6} {formulas:>12} {r['bytes'] / 1024:>8.1f} "
+                      f"{r['bytes_xml'] / 1024:>8.1f} "
+                      f"{r['generar']:>8.3f}s {r['abrir']:>7.3f}s {r['recalculo']:>9.3f}s {lo}")
+
+
+if __name__ == "__main__":
+    main()
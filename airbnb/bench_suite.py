@@ -0,0 +1,269 @@
+"""
+Suite de benchmarks reproducible: generación de libros y cálculo de KPIs.
+
+Cada caso corre en un proceso nuevo (el pico de RSS es del caso, no de la
+suite) sobre los puntos de entrada reales: generar_libro por backend,
+build_flujo + build_resumen, ModeloFlujo en lote (VAN / TIR / payback) y
+lote.generar_lote. El resultado es un JSON con el entorno (versiones, commit)
+y, por caso, el mejor tiempo, la mediana y el RSS pico.
+
+    python bench_suite.py correr --perfil completo --json bench_HEAD.json
+    python bench_suite.py comparar bench_base.json bench_HEAD.json --umbral 0.10
+
+comparar marca como regresión los casos cuyo tiempo (mejor de N) o RSS pico
+sube más que el umbral, y termina con código 1 si hay alguna.
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+PERFILES = {
+    "rapido": {
+        "horizontes":   [36, 360],
+        "propiedades":  [1, 1000],
+        "backends":     ["openpyxl", "stream"],
+        "lote":         [10],
+        "repeticiones": 3,
+    },
+    "completo": {
+        "horizontes":   [36, 120, 360, 1200],
+        "propiedades":  [1, 100, 1000, 10_000],
+        "backends":     ["openpyxl", "stream"],
+        "lote":         [10, 100],
+        "repeticiones": 5,
+    },
+}
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# CASOS  (corren en el proceso hijo)
+# ═════════════════════════════════════════════════════════════════════════════
+def _lote_params(n, horizonte, semilla=0):
+    """n propiedades alrededor de PARAMETROS_DEFAULT (semilla fija)."""
+    import numpy as np
+    from modelo import PARAMETROS_DEFAULT
+
+    rng = np.random.default_rng(semilla)
+    lote = {k: np.full(n, float(v)) for k, v in PARAMETROS_DEFAULT.items()}
+    lote["horizonte"][:] = horizonte
+    lote["adr"]    *= rng.uniform(0.7, 1.3, n)
+    lote["noches"]  = np.round(lote["noches"] * rng.uniform(0.6, 1.3, n))
+    lote["inversion"] *= rng.uniform(0.8, 1.5, n)
+    return lote
+
+
+def caso_libro(horizonte, backend, tmp):
+    """generar_libro completo (armado + save + valores cacheados)."""
+    from generar_flujo_caja import generar_libro
+
+    out = os.path.join(tmp, "libro.xlsx")
+    generar_libro({"horizonte": horizonte}, out, backend=backend)
+    return {"bytes": os.path.getsize(out)}
+
+
+def caso_build(horizonte, tmp):
+    """build_flujo + build_resumen sobre un Workbook en memoria (sin save)."""
+    import openpyxl
+    from generar_flujo_caja import build_flujo, build_parametros, build_resumen, layout
+    from modelo import ModeloFlujo, PARAMETROS_DEFAULT
+
+    params = {**PARAMETROS_DEFAULT, "horizonte": horizonte}
+    lay    = layout(horizonte)
+    modelo = ModeloFlujo(params, horizonte=horizonte)
+    wb = openpyxl.Workbook()
+    wb.remove(wb.active)
+    build_parametros(wb, params)
+    build_flujo(wb, modelo, lay)
+    build_resumen(wb, modelo, lay)
+    return {}
+
+
+def caso_kpis(propiedades, horizonte, tmp):
+    """VAN, TIR anual y payback de `propiedades` con ModeloFlujo en lote."""
+    import numpy as np
+    from modelo import ModeloFlujo
+
+    modelo = ModeloFlujo(_lote_params(propiedades, horizonte), horizonte=horizonte)
+    van, tir, payback = modelo.van, modelo.tir_anual, modelo.payback_meses
+    return {"van_suma": float(np.sum(van)), "tir_nd": int(np.isnan(tir).sum()),
+            "payback_medio": float(np.mean(payback))}
+
+
+def caso_lote(propiedades, tmp):
+    """lote.generar_lote con un worker (un xlsx por propiedad)."""
+    from lote import generar_lote
+
+    lote  = _lote_params(propiedades, 36)
+    tabla = [(f"p{i}", {k: v[i].item() for k, v in lote.items()}) for i in range(propiedades)]
+    rep   = generar_lote(tabla, os.path.join(tmp, "lote"), workers=1)
+    return {"fallos": len(rep["fallos"])}
+
+
+CASOS = {"libro": caso_libro, "build": caso_build, "kpis": caso_kpis, "lote": caso_lote}
+
+
+def _ejecutar(spec):
+    """Proceso hijo: corre un caso `repeticiones` veces y devuelve tiempos y RSS."""
+    from perfil import rss_pico_kb                          # importa NumPy: solo en el hijo
+
+    fn = CASOS[spec["caso"]]
+    tiempos, extra = [], {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for _ in range(spec["repeticiones"]):
+            t0 = time.perf_counter()
+            extra = fn(**spec["args"], tmp=tmp)
+            tiempos.append(time.perf_counter() - t0)
+    return {"tiempos": tiempos, "rss_pico_kb": rss_pico_kb(hijos=True), "extra": extra}
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# SUITE
+# ═════════════════════════════════════════════════════════════════════════════
+def casos(perfil):
+    """[(id, spec)] del perfil, en orden estable."""
+    cfg, rep = PERFILES[perfil], PERFILES[perfil]["repeticiones"]
+    out = []
+    for h in cfg["horizontes"]:
+        for backend in cfg["backends"]:
+            out.append((f"libro/{backend}/h={h}",
+                        {"caso": "libro", "args": {"horizonte": h, "backend": backend}}))
+        out.append((f"build/h={h}", {"caso": "build", "args": {"horizonte": h}}))
+        for n in cfg["propiedades"]:
+            out.append((f"kpis/n={n}/h={h}",
+                        {"caso": "kpis", "args": {"propiedades": n, "horizonte": h}}))
+    for n in cfg["lote"]:
+        out.append((f"lote/n={n}", {"caso": "lote", "args": {"propiedades": n}}))
+    for _, spec in out:
+        spec["repeticiones"] = 1 if spec["caso"] == "lote" else rep
+    return out
+
+
+def _entorno():
+    import numpy
+    import openpyxl
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "fecha":    datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit":   commit,
+        "python":   platform.python_version(),
+        "numpy":    numpy.__version__,
+        "openpyxl": openpyxl.__version__,
+        "sistema":  platform.platform(),
+        "cpus":     os.cpu_count(),
+    }
+
+
+def correr(perfil="rapido", filtro=None, progreso=None):
+    """Corre la suite; cada caso en `python bench_suite.py _caso <spec>`."""
+    resultados = {}
+    for caso_id, spec in casos(perfil):
+        if filtro and filtro not in caso_id:
+            continue
+        proc = subprocess.run([sys.executable, os.path.abspath(__file__), "_caso",
+                               json.dumps(spec)], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)))
+        if proc.returncode != 0:
+            resultados[caso_id] = {"error": proc.stderr.strip().splitlines()[-1]}
+        else:
+            r = json.loads(proc.stdout)
+            resultados[caso_id] = {
+                "segundos":    round(min(r["tiempos"]), 6),
+                "mediana":     round(statistics.median(r["tiempos"]), 6),
+                "repeticiones": len(r["tiempos"]),
+                "rss_pico_kb": r["rss_pico_kb"],
+                **r["extra"],
+            }
+        if progreso is not None:
+            progreso(caso_id, resultados[caso_id])
+    return {"entorno": _entorno(), "perfil": perfil, "casos": resultados}
+
+
+def comparar(base, nuevo, umbral=0.10):
+    """
+    [(id, seg_base, seg_nuevo, rss_base, rss_nuevo, regresion)] de los casos
+    presentes en ambos. Regresión: tiempo o RSS pico sube más que `umbral`.
+    """
+    filas = []
+    for caso_id, b in base["casos"].items():
+        n = nuevo["casos"].get(caso_id)
+        if n is None or "error" in b or "error" in n:
+            continue
+        peor_t   = n["segundos"] > b["segundos"] * (1 + umbral)
+        peor_rss = (b["rss_pico_kb"] and n["rss_pico_kb"]
+                    and n["rss_pico_kb"] > b["rss_pico_kb"] * (1 + umbral))
+        filas.append((caso_id, b["segundos"], n["segundos"], b["rss_pico_kb"],
+                      n["rss_pico_kb"], bool(peor_t or peor_rss)))
+    return filas
+
+
+def _imprimir_caso(caso_id, r):
+    if "error" in r:
+        print(f"{caso_id:<28} ERROR {r['error']}", file=sys.stderr)
+    else:
+        print(f"{caso_id:<28} {r['segundos']:>9.4f}s {r['mediana']:>9.4f}s "
+              f"{(r['rss_pico_kb'] or 0) / 1024:>8.1f} MB", file=sys.stderr)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    sub = ap.add_subparsers(dest="comando", required=True)
+
+    c = sub.add_parser("correr", help="Corre la suite y guarda el JSON")
+    c.add_argument("--perfil", choices=sorted(PERFILES), default="rapido")
+    c.add_argument("--filtro", default=None, help="Solo casos cuyo id contiene el texto")
+    c.add_argument("--json", default=None, help="Por defecto: bench_<commit>.json")
+
+    k = sub.add_parser("comparar", help="Compara dos JSON y marca regresiones")
+    k.add_argument("base")
+    k.add_argument("nuevo")
+    k.add_argument("--umbral", type=float, default=0.10, help="Alza relativa tolerada")
+
+    h = sub.add_parser("_caso")            # uso interno: proceso hijo
+    h.add_argument("spec")
+    args = ap.parse_args(argv)
+
+    if args.comando == "_caso":
+        json.dump(_ejecutar(json.loads(args.spec)), sys.stdout)
+        return 0
+
+    if args.comando == "correr":
+        print(f"{'caso':<28} {'mejor':>10} {'mediana':>10} {'RSS pico':>11}", file=sys.stderr)
+        res  = correr(args.perfil, args.filtro, progreso=_imprimir_caso)
+        path = args.json or f"bench_{res['entorno']['commit'] or 'local'}.json"
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(res, f, ensure_ascii=False, indent=2)
+        print(f"Resultados guardados: {path}")
+        return 1 if any("error" in r for r in res["casos"].values()) else 0
+
+    with open(args.base, encoding="utf-8") as f:
+        base = json.load(f)
+    with open(args.nuevo, encoding="utf-8") as f:
+        nuevo = json.load(f)
+    filas = comparar(base, nuevo, args.umbral)
+    print(f"{base['entorno']['commit']} → {nuevo['entorno']['commit']}  "
+          f"(umbral {args.umbral:.0%})")
+    print(f"{'caso':<28} {'base':>9} {'nuevo':>9} {'Δ tiempo':>9} {'Δ RSS':>8}")
+    for caso_id, tb, tn, rb, rn, regresion in filas:
+        d_rss = f"{rn / rb - 1:>+8.1%}" if rb and rn else f"{'–':>8}"
+        print(f"{caso_id:<28} {tb:>8.4f}s {tn:>8.4f}s {tn / tb - 1:>+9.1%} {d_rss}"
+              f"{'  REGRESIÓN' if regresion else ''}")
+    regresiones = sum(f[-1] for f in filas)
+    print(f"{regresiones} regresiones en {len(filas)} casos comparados")
+    return 1 if regresiones else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+"""
+Cache de libros generados, direccionado por contenido.
+
+La clave es el SHA-256 de los parámetros, el layout y la versión del generador
+(ver generar_flujo_caja.clave_libro). Un acierto entrega una copia del xlsx ya
+construido; el directorio tiene un tamaño máximo y se desaloja por LRU (mtime,
+que se refresca en cada acierto).
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import stat
+import tempfile
+
+
+def huella(obj):
+    """SHA-256 hex de `obj` serializado en JSON canónico."""
+    data = json.dumps(obj, sort_keys=True, separators=(",", ":"), default=float)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+class CacheLibros:
+    """
+    Directorio de xlsx nombrados por clave.
+
+    Los archivos del cache quedan de solo lectura y cada acierto entrega una
+    copia con permisos normales: editar la salida nunca toca la entrada.
+    `bytes` lleva el tamaño del directorio desde el último recorrido; solo se
+    vuelve a listar (desalojar) cuando supera max_bytes. Es por instancia: con
+    varios procesos sobre el mismo directorio cada uno ve sus propios guardados,
+    y el recorrido de desalojar corrige el total.
+    """
+
+    def __init__(self, directorio, max_bytes=512 * 2**20):
+        self.directorio = directorio
+        self.max_bytes  = max_bytes
+        self.hits       = 0
+        self.misses     = 0
+        self.desalojos  = 0
+        os.makedirs(directorio, exist_ok=True)
+        self.bytes      = sum(size for _, size, _ in self._entradas())
+
+    def _ruta(self, clave):
+        return os.path.join(self.directorio, f"{clave}.xlsx")
+
+    def _entradas(self):
+        """[(mtime, bytes, nombre)] de los libros del directorio."""
+        entradas = []
+        for nombre in os.listdir(self.directorio):
+            if not nombre.endswith(".xlsx"):
+                continue
+            try:
+                st = os.stat(os.path.join(self.directorio, nombre))
+            except FileNotFoundError:             # otro proceso lo desalojó
+                continue
+            entradas.append((st.st_mtime, st.st_size, nombre))
+        return entradas
+
+    def obtener(self, clave, out):
+        """Copia el libro cacheado a `out`; False si no está."""
+        ruta = self._ruta(clave)
+        try:
+            os.utime(ruta)                       # LRU: marca como usado
+        except FileNotFoundError:
+            self.misses += 1
+            return False
+        self.liberar(out)
+        shutil.copyfile(ruta, out)               # sin copiar el modo de solo lectura
+        self.hits += 1
+        return True
+
+    def liberar(self, out):
+        """
+        Quita `out` antes de reconstruirlo: si es un enlace (por ejemplo un hard
+        link a una entrada de solo lectura del cache), escribir encima fallaría o
+        la corrompería.
+        """
+        if os.path.lexists(out):
+            os.remove(out)
+
+    def guardar(self, clave, src):
+        """Copia `src` al cache (escritura atómica) y desaloja si pasa de max_bytes."""
+        ruta = self._ruta(clave)
+        try:
+            previo = os.stat(ruta).st_size
+        except FileNotFoundError:
+            previo = 0
+        fd, tmp = tempfile.mkstemp(suffix=".tmp", dir=self.directorio)
+        os.close(fd)
+        try:
+            shutil.copyfile(src, tmp)
+            os.chmod(tmp, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+            size = os.path.getsize(tmp)
+            os.replace(tmp, ruta)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        self.bytes += size - previo
+        if self.bytes > self.max_bytes:
+            self.desalojar()
+
+    def desalojar(self):
+        """Borra los libros menos usados hasta quedar bajo max_bytes."""
+        entradas = self._entradas()
+        total = sum(size for _, size, _ in entradas)
+        for _, size, nombre in sorted(entradas):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directorio, nombre))
+                self.desalojos += 1
+            except FileNotFoundError:
+                pass
+            total -= size
+        self.bytes = total
+
+    def estadisticas(self):
+        consultas = self.hits + self.misses
+        return {
+            "hits":      self.hits,
+            "misses":    self.misses,
+            "hit_rate":  self.hits / consultas if consultas else 0.0,
+            "desalojos": self.desalojos,
+        }
@@ -0,0 +1,206 @@
+"""
+Línea de comandos del Flujo de Caja Airbnb.
+
+    python cli.py                                       # libro con los valores por defecto
+    python cli.py --params depto.json --adr 42000 -o depto.xlsx
+    python cli.py --params depto.json --summary json    # VAN / TIR / payback, sin openpyxl
+    python cli.py --params props.csv --id p7 --format parquet -o p7
+    python cli.py --reservas reservas.csv --listing depto-1 --calibrar -o depto.xlsx
+
+Parámetros: --params (JSON {clave: valor}, tabla CSV/JSON como lote.py con
+--id para elegir la fila, o un xlsx generado: se leen sus Parámetros) y un
+flag por clave (--adr, --crec-adr…), que pisa al archivo. --reservas (CSV o
+iCal, ver reservas.py) fija ADR y Noches de los meses ya cerrados con la
+ocupación real; --calibrar ajusta además adr / noches a los últimos 12 meses
+para proyectar el resto.
+
+Formatos: xlsx (libro), csv / parquet / arrow (flujo + KPIs en formato
+columnar, ver exportar.py) y json (KPIs). Sin --format se deduce de la
+extensión de --out. --summary imprime los KPIs con ModeloFlujo (NumPy) sin
+importar openpyxl; los módulos pesados se importan solo en el camino que los usa.
+"""
+
+import argparse
+import json
+import os
+import sys
+
+from lote import leer_tabla
+from parametros import PARAMETROS_DEFAULT, numero, validar
+
+FORMATOS = {".xlsx": "xlsx", ".csv": "csv", ".parquet": "parquet", ".arrow": "arrow",
+            ".json": "json"}
+SALIDA_DEFAULT = "flujo_caja_airbnb"
+
+
+# ── Parámetros ────────────────────────────────────────────────────────────────
+def leer_params(path, prop_id=None):
+    """{clave: número} desde JSON (objeto o tabla), CSV (tabla) o xlsx generado."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".xlsx":
+        from ingesta import leer_parametros
+        return leer_parametros(path)
+
+    if ext == ".json":
+        with open(path, encoding="utf-8") as f:
+            datos = json.load(f)
+        if isinstance(datos, dict):
+            desconocidas = set(datos) - set(PARAMETROS_DEFAULT)
+            if desconocidas:
+                raise ValueError(f"{path}: claves desconocidas {sorted(desconocidas)}")
+            return {k: numero(v) for k, v in datos.items() if v not in (None, "")}
+
+    tabla = leer_tabla(path)
+    if prop_id is not None:
+        filas = [params for i, params in tabla if i == prop_id]
+        if not filas:
+            raise ValueError(f"{path}: no hay fila con id {prop_id!r}")
+    elif len(tabla) == 1:
+        filas = [tabla[0][1]]
+    else:
+        raise ValueError(f"{path} tiene {len(tabla)} filas: elija una con --id "
+                         f"(o use lote.py para generar todas)")
+    return {k: numero(v) for k, v in filas[0].items()}
+
+
+# ── Salidas ───────────────────────────────────────────────────────────────────
+def resumen(params, reales=None):
+    """KPIs de Resumen con ModeloFlujo: los mismos números que el libro."""
+    from modelo import ModeloFlujo
+    modelo = ModeloFlujo(params, horizonte=int(params["horizonte"]), reales=reales)
+    res = modelo.resumen()
+    return {
+        **{k: res[k] for k in ("flujo_neto_total", "flujo_acum_final", "tasa_mensual",
+                               "van", "tir_mensual", "tir_anual")},
+        "payback_meses": int(modelo.payback_meses),
+        "payback":       res["payback"],
+    }
+
+
+def _imprimir_resumen(params, kpis, formato):
+    if formato == "json":
+        print(json.dumps(kpis, ensure_ascii=False))
+        return
+    if formato == "tsv":
+        print("\t".join(kpis))
+        print("\t".join(str(v) for v in kpis.values()))
+        return
+
+    def pct(v):
+        return v if isinstance(v, str) else f"{v:.2%}"
+    print(f"VAN               {kpis['van']:>16,.0f}   (tasa {params['tasa']:.2%} anual)")
+    print(f"TIR mensual       {pct(kpis['tir_mensual']):>16}")
+    print(f"TIR anual equiv.  {pct(kpis['tir_anual']):>16}")
+    print(f"Payback           {kpis['payback']:>16}")
+    print(f"Flujo acum. final {kpis['flujo_acum_final']:>16,.0f}")
+
+
+def escribir(params, out, formato, args, reales=None, conc=None):
+    """Genera `out` en `formato`; devuelve las rutas escritas."""
+    if formato == "xlsx":
+        from generar_flujo_caja import main as generar
+        generar(params, not args.sin_valores, args.backend, args.cache_dir, None,
+                args.formulas, args.profile, args.cprofile, out=out, reales=reales,
+                conciliacion=conc)
+        return []
+
+    if formato == "json":
+        with open(out, "w", encoding="utf-8") as f:
+            json.dump({"params": params, "kpis": resumen(params, reales)}, f,
+                      ensure_ascii=False, indent=2)
+        return [out]
+
+    from exportar import exportar_modelo
+    from modelo import ModeloFlujo
+    modelo = ModeloFlujo(params, horizonte=int(params["horizonte"]), reales=reales)
+    return exportar_modelo(modelo, os.path.splitext(out)[0], formato)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(
+        description=__doc__.strip().splitlines()[0],
+        epilog="Claves: " + ", ".join(PARAMETROS_DEFAULT))
+    ap.add_argument("--params", default=None, help="JSON, CSV o xlsx con los parámetros")
+    ap.add_argument("--id", default=None, help="Fila de la tabla de --params")
+    g = ap.add_argument_group("parámetros (pisan a --params)")
+    for key, valor in PARAMETROS_DEFAULT.items():
+        g.add_argument(f"--{key.replace('_', '-')}", dest=key, type=numero, default=None,
+                       metavar="N", help=f"(por defecto {valor})")
+
+    r = ap.add_argument_group("datos reales (ver reservas.py y conciliacion.py)")
+    r.add_argument("--reservas", nargs="+", default=None, metavar="ARCHIVO",
+                   help="Exportaciones de reservas CSV o iCal")
+    r.add_argument("--listing", default=None, help="Propiedad de las reservas")
+    r.add_argument("--formato-fecha", default=None, metavar="DMA|MDA|PATRÓN",
+                   help="Fechas con barras de --reservas y --cartola: DMA (por defecto), "
+                        "MDA (EE.UU.) o un patrón strptime")
+    r.add_argument("--corte", default=None, metavar="AAAA-MM",
+                   help="Primer mes proyectado (por defecto: el mes actual)")
+    r.add_argument("--calibrar", action="store_true",
+                   help="adr / noches desde los últimos 12 meses cerrados")
+    r.add_argument("--cartola", nargs="+", default=None, metavar="CSV",
+                   help="Movimientos bancarios: agrega la hoja Real vs Proyectado al xlsx")
+    r.add_argument("--reglas", default=None, help="Reglas de clasificación de --cartola")
+
+    ap.add_argument("-o", "--out", default=None,
+                    help=f"Ruta de salida (por defecto {SALIDA_DEFAULT}.<formato>)")
+    ap.add_argument("--format", choices=sorted(set(FORMATOS.values())), default=None,
+                    help="Formato de salida (por defecto: según la extensión de --out, o xlsx)")
+    ap.add_argument("--summary", nargs="?", const="texto", choices=("texto", "json", "tsv"),
+                    default=None, help="Solo imprime VAN / TIR / payback (sin openpyxl)")
+
+    x = ap.add_argument_group("libro xlsx")
+    x.add_argument("--backend", choices=("openpyxl", "stream"), default="openpyxl")
+    x.add_argument("--formulas", choices=("celda", "compartidas"), default="celda")
+    x.add_argument("--sin-valores", action="store_true",
+                   help="No cachea los valores de las fórmulas")
+    x.add_argument("--cache-dir", default=None, help="Cache de libros (ver cache_libros.py)")
+    x.add_argument("--profile", metavar="JSON", default=None,
+                   help="Tiempo y memoria por etapa en un registro JSON (ver perfil.py)")
+    x.add_argument("--cprofile", metavar="PSTATS", default=None,
+                   help="Con --profile: volcado cProfile")
+    args = ap.parse_args(argv)
+
+    reales = conc = None
+    try:
+        params = dict(PARAMETROS_DEFAULT)
+        if args.params:
+            params.update(leer_params(args.params, args.id))
+        flags = {k: getattr(args, k) for k in PARAMETROS_DEFAULT if getattr(args, k) is not None}
+        params.update(flags)
+        if args.reservas:
+            from reservas import leer_reservas
+            ocup = leer_reservas(args.reservas, listing=args.listing,
+                                 formato=args.formato_fecha)
+            if args.calibrar:
+                params.update(ocup.calibrar(args.listing, params["crec_adr"], args.corte))
+                params.update(flags)
+            reales = ocup.reales(args.listing, int(params["horizonte"]), args.corte)
+            if args.formulas == "compartidas":
+                raise ValueError("--reservas no se combina con --formulas compartidas")
+        if args.cartola:
+            from conciliacion import Reglas, conciliar, leer_reglas
+            conc = conciliar(args.cartola,
+                             Reglas(leer_reglas(args.reglas) if args.reglas else None),
+                             formato=args.formato_fecha)
+        validar(params)
+    except (OSError, ValueError) as e:
+        ap.error(str(e))
+
+    if args.summary:
+        _imprimir_resumen(params, resumen(params, reales), args.summary)
+        return 0
+
+    formato = args.format
+    if formato is None:
+        ext = os.path.splitext(args.out or "")[1].lower()
+        formato = FORMATOS.get(ext, "xlsx")
+    out = args.out or f"{SALIDA_DEFAULT}.{formato}"
+
+    for path in escribir(params, out, formato, args, reales, conc):
+        print(f"Archivo guardado: {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
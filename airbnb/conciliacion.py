@@ -0,0 +1,329 @@
+"""
+Conciliación de movimientos bancarios contra la proyección (hoja "Real vs Proyectado").
+
+Lee cartolas o exportaciones contables CSV por bloques, clasifica cada
+movimiento en un concepto de FC (ing_netos, g_comunes, servicios, fondo,
+dividendo) con un conjunto de reglas y agrega los montos por concepto y mes
+(np.unique + np.bincount). La memoria depende del bloque y de los meses, no
+del largo del archivo.
+
+Reglas: [{"concepto": "servicios", "contiene": "aguas andinas", "signo": "-"}],
+en orden de prioridad (la primera que calza gana). Se compilan a un índice
+por la primera palabra de cada frase: un movimiento solo se compara con las
+reglas cuyas palabras iniciales aparecen en su glosa, no con todas. Las
+glosas repetidas (el mismo proveedor cada mes) se resuelven desde un memo.
+
+    python conciliacion.py cartola.csv --reglas reglas.json --out libro.xlsx
+"""
+
+import argparse
+import csv
+import itertools
+import json
+import re
+import sys
+import time
+import unicodedata
+
+import numpy as np
+
+from reservas import _fechas, _montos
+
+BLOQUE  = 100_000
+MUESTRA = 5                             # filas descartadas que se guardan para el reporte
+
+# Conceptos de FC que se concilian (mismas claves que FC en generar_flujo_caja)
+CONCEPTOS = ("ing_netos", "g_comunes", "servicios", "fondo", "dividendo")
+INGRESOS  = {"ing_netos"}
+
+REGLAS_DEFAULT = [
+    {"concepto": "ing_netos", "contiene": "airbnb",                  "signo": "+"},
+    {"concepto": "ing_netos", "contiene": "booking com",             "signo": "+"},
+    {"concepto": "g_comunes", "contiene": "gastos comunes"},
+    {"concepto": "g_comunes", "contiene": "gasto comun"},
+    {"concepto": "g_comunes", "contiene": "comunidad edificio"},
+    {"concepto": "fondo",     "contiene": "fondo de reserva"},
+    {"concepto": "fondo",     "contiene": "mantencion"},
+    {"concepto": "dividendo", "contiene": "dividendo"},
+    {"concepto": "dividendo", "contiene": "credito hipotecario"},
+    {"concepto": "dividendo", "contiene": "arriendo",                "signo": "-"},
+    {"concepto": "servicios", "contiene": "enel"},
+    {"concepto": "servicios", "contiene": "aguas andinas"},
+    {"concepto": "servicios", "contiene": "metrogas"},
+    {"concepto": "servicios", "contiene": "vtr"},
+    {"concepto": "servicios", "contiene": "movistar"},
+    {"concepto": "servicios", "contiene": "entel"},
+    {"concepto": "servicios", "contiene": "internet"},
+]
+
+# Encabezados aceptados (sin tildes, en minúsculas, con "-" y espacios como "_")
+COLUMNAS = {
+    "fecha": ("fecha", "fecha_operacion", "fecha_contable", "fecha_movimiento", "date"),
+    "glosa": ("descripcion", "glosa", "detalle", "description", "movimiento", "concepto"),
+    "monto": ("monto", "importe", "amount", "valor"),
+    "cargo": ("cargo", "cargos", "debito", "debe", "debit"),
+    "abono": ("abono", "abonos", "credito", "haber", "credit"),
+}
+
+_RE_NO_PALABRA = re.compile(r"[^a-z0-9]+")
+
+
+def normalizar(texto):
+    """Minúsculas, sin tildes, solo letras y dígitos separados por un espacio."""
+    texto = unicodedata.normalize("NFKD", texto).encode("ascii", "ignore").decode()
+    return _RE_NO_PALABRA.sub(" ", texto.lower()).strip()
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# REGLAS
+# ═════════════════════════════════════════════════════════════════════════════
+class Reglas:
+    """
+    Clasificador compilado: `clasificar(glosa, monto)` → índice en CONCEPTOS,
+    o -1 si ninguna regla calza. El costo por movimiento depende de sus
+    palabras y de las reglas que comparten la primera palabra, no del total.
+    """
+
+    def __init__(self, reglas=None, memo=100_000):
+        self._indice = {}              # primera palabra → [(orden, palabras, concepto, signo)]
+        for orden, regla in enumerate(REGLAS_DEFAULT if reglas is None else reglas):
+            concepto = regla.get("concepto")
+            if concepto not in CONCEPTOS:
+                raise ValueError(f"Regla {orden + 1}: concepto desconocido {concepto!r} "
+                                 f"(opciones: {', '.join(CONCEPTOS)})")
+            palabras = tuple(normalizar(regla.get("contiene") or "").split())
+            if not palabras:
+                raise ValueError(f"Regla {orden + 1}: 'contiene' vacío")
+            signo = regla.get("signo")
+            if signo not in (None, "+", "-"):
+                raise ValueError(f"Regla {orden + 1}: signo debe ser '+' o '-': {signo!r}")
+            self._indice.setdefault(palabras[0], []).append(
+                (orden, palabras, CONCEPTOS.index(concepto), signo))
+        self._memo     = {}
+        self._memo_max = memo
+
+    def _buscar(self, glosa, signo):
+        palabras = normalizar(glosa).split()
+        mejor = None
+        for i, palabra in enumerate(palabras):
+            for orden, frase, concepto, s in self._indice.get(palabra, ()):
+                if ((mejor is None or orden < mejor[0]) and (s is None or s == signo)
+                        and tuple(palabras[i:i + len(frase)]) == frase):
+                    mejor = (orden, concepto)
+        return -1 if mejor is None else mejor[1]
+
+    def clasificar(self, glosa, monto):
+        signo = "-" if monto < 0 else "+"
+        clave = (glosa, signo)
+        concepto = self._memo.get(clave)
+        if concepto is None:
+            if len(self._memo) >= self._memo_max:
+                self._memo.clear()
+            concepto = self._memo[clave] = self._buscar(glosa, signo)
+        return concepto
+
+
+def leer_reglas(path):
+    """Lista de reglas desde JSON ([{concepto, contiene, signo?}]) o CSV con esas columnas."""
+    if path.lower().endswith(".json"):
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        return [{k: v for k, v in fila.items() if v not in (None, "")}
+                for fila in csv.DictReader(f)]
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# LECTURA POR BLOQUES
+# ═════════════════════════════════════════════════════════════════════════════
+def _indices(encabezado, path):
+    norm = [normalizar(c).replace(" ", "_") for c in encabezado]
+    idx = {campo: next((norm.index(a) for a in alias if a in norm), None)
+           for campo, alias in COLUMNAS.items()}
+    if idx["fecha"] is None or idx["glosa"] is None:
+        raise ValueError(f"{path}: faltan las columnas de fecha y descripción")
+    if idx["monto"] is None and idx["cargo"] is None and idx["abono"] is None:
+        raise ValueError(f"{path}: falta la columna monto (o cargo / abono)")
+    return idx
+
+
+def bloques(path, bloque=BLOQUE, formato=None):
+    """
+    Itera (fechas, glosas, montos, descartadas) de a `bloque` movimientos;
+    abono > 0, cargo < 0. `descartadas` son las filas crudas que no son
+    movimientos (cortas, subtotales, saldos, sin fecha o sin monto).
+    `formato` es el de las fechas (ver reservas._fechas).
+    """
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        primera = f.readline()
+        f.seek(0)
+        filas = csv.reader(f, delimiter=";" if ";" in primera else ",")
+        idx = _indices(next(filas, []), path)
+        ancho = max(i for i in idx.values() if i is not None) + 1
+        while True:
+            trozo = list(itertools.islice(filas, bloque))
+            if not trozo:
+                return
+            trozo = [r for r in trozo if any(c.strip() for c in r)]
+            descartadas = [r for r in trozo if len(r) < ancho]
+            trozo = [r for r in trozo if len(r) >= ancho]
+
+            def col(campo):
+                return [r[idx[campo]].strip() for r in trozo]
+
+            if idx["monto"] is not None:
+                montos = _montos(col("monto"))
+            else:
+                montos = np.zeros(len(trozo))
+                if idx["abono"] is not None:
+                    montos += np.nan_to_num(_montos(col("abono")))
+                if idx["cargo"] is not None:
+                    montos -= np.abs(np.nan_to_num(_montos(col("cargo"))))
+                sin_monto = np.ones(len(trozo), dtype=bool)
+                for campo in ("abono", "cargo"):
+                    if idx[campo] is not None:
+                        sin_monto &= np.array([not t for t in col(campo)], dtype=bool)
+                montos[sin_monto] = np.nan
+            fechas = _fechas(col("fecha"), formato, estricto=False)
+
+            validos = ~np.isnat(fechas) & ~np.isnan(montos)
+            if not validos.all():
+                descartadas += [r for r, ok in zip(trozo, validos.tolist()) if not ok]
+            glosas = [g for g, ok in zip(col("glosa"), validos.tolist()) if ok]
+            yield fechas[validos], glosas, montos[validos], descartadas
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# CONCILIACIÓN  (concepto × mes)
+# ═════════════════════════════════════════════════════════════════════════════
+class Conciliacion:
+    """
+    Montos reales por concepto y mes, en el signo de FC (ingresos y egresos
+    positivos): `real` (CONCEPTOS, meses) sobre `meses` (datetime64[M]
+    contiguos), más `sin_clasificar` (monto neto) y el conteo de movimientos.
+    `descartadas` cuenta las filas que no eran movimientos (ver bloques) y
+    `muestra_descartadas` guarda las primeras, para revisarlas.
+    """
+
+    def __init__(self, meses, real, sin_clasificar, movimientos, no_clasificados,
+                 descartadas=0, muestra_descartadas=()):
+        self.meses           = meses
+        self.real            = real
+        self.sin_clasificar  = sin_clasificar
+        self.movimientos     = movimientos
+        self.no_clasificados = no_clasificados
+        self.descartadas     = descartadas
+        self.muestra_descartadas = list(muestra_descartadas)
+
+    def fila(self, concepto):
+        return self.real[CONCEPTOS.index(concepto)]
+
+    @property
+    def flujo_neto(self):
+        ingresos = sum(self.fila(c) for c in INGRESOS)
+        return ingresos - sum(self.fila(c) for c in CONCEPTOS if c not in INGRESOS)
+
+    def meses_modelo(self, horizonte, inicio=None):
+        """[(m, j)]: mes del modelo (1 = `inicio`, por defecto START_DATE) e índice en `meses`."""
+        if inicio is None:
+            from generar_flujo_caja import START_DATE as inicio
+        desde = int(self.meses[0] - np.datetime64(inicio, "M"))
+        return [(j + desde + 1, j) for j in range(self.meses.size)
+                if 1 <= j + desde + 1 <= horizonte]
+
+
+def conciliar(paths, reglas=None, bloque=BLOQUE, formato=None):
+    """
+    Conciliacion de uno o más CSV; `reglas` es una lista o un Reglas ya
+    compilado. Las filas que no son movimientos se cuentan y se omiten.
+    """
+    if isinstance(paths, str):
+        paths = [paths]
+    if not isinstance(reglas, Reglas):
+        reglas = Reglas(reglas)
+    acum = {}                           # (concepto + 1, mes) → [monto, movimientos]
+    descartadas, muestra = 0, []
+
+    for path in paths:
+        for fechas, glosas, montos, filas in bloques(path, bloque, formato):
+            descartadas += len(filas)
+            muestra += [(path, ";".join(r)) for r in filas[:MUESTRA - len(muestra)]]
+            conceptos = np.fromiter(
+                (reglas.clasificar(g, m) for g, m in zip(glosas, montos.tolist())),
+                dtype=np.int64, count=len(glosas))
+
+            # Egresos en positivo, como en FC; sin clasificar queda con su signo
+            egreso = (conceptos >= 0) & ~np.isin(conceptos, [CONCEPTOS.index(c)
+                                                             for c in INGRESOS])
+            montos = np.where(egreso, -montos, montos)
+            # Meses desde el mínimo del bloque (≥ 0, también antes de 1970) en los
+            # 32 bits bajos y el concepto en los altos: una clave int64 por grupo
+            mes   = fechas.astype("datetime64[M]").astype(np.int64)
+            base  = int(mes.min())
+            clave = ((conceptos + 1) << 32) + (mes - base)
+            unicas, inv = np.unique(clave, return_inverse=True)
+            sumas = np.stack([np.bincount(inv, montos, unicas.size),
+                              np.bincount(inv, minlength=unicas.size)], axis=1)
+            grupos = zip((unicas >> 32).tolist(), ((unicas & 0xFFFFFFFF) + base).tolist())
+            for k, s in zip(grupos, sumas):
+                if k in acum:
+                    acum[k] += s
+                else:
+                    acum[k] = s
+
+    if not acum:
+        raise ValueError("No hay movimientos válidos en " + ", ".join(paths))
+    claves = np.array(list(acum), dtype=np.int64)
+    fila, mes = claves[:, 0] - 1, claves[:, 1]
+    inicio = mes.min()
+    meses  = np.arange(inicio, mes.max() + 1).astype("datetime64[M]")
+    tabla  = np.zeros((len(CONCEPTOS) + 1, meses.size, 2))       # última fila: sin clasificar
+    tabla[fila, mes - inicio] = np.array(list(acum.values()))
+    return Conciliacion(meses, tabla[:-1, :, 0], tabla[-1, :, 0], tabla.sum(axis=0)[:, 1],
+                        tabla[-1, :, 1], descartadas, muestra)
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# CLI
+# ═════════════════════════════════════════════════════════════════════════════
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("archivos", nargs="+", help="Cartolas / exportaciones CSV")
+    ap.add_argument("--reglas", default=None, help="JSON o CSV de reglas (por defecto: "
+                                                   "REGLAS_DEFAULT)")
+    ap.add_argument("--params", default=None, help="Parámetros de la proyección (ver cli.py)")
+    ap.add_argument("--out", default=None, help="Libro con la hoja Real vs Proyectado")
+    ap.add_argument("--formato-fecha", default=None, metavar="DMA|MDA|PATRÓN",
+                    help="Fechas con barras: DMA (por defecto), MDA (EE.UU.) o strptime")
+    ap.add_argument("--bloque", type=int, default=BLOQUE, help="Movimientos por bloque")
+    args = ap.parse_args(argv)
+
+    t0 = time.perf_counter()
+    try:
+        reglas = Reglas(leer_reglas(args.reglas) if args.reglas else None)
+        conc   = conciliar(args.archivos, reglas, args.bloque, args.formato_fecha)
+    except (OSError, ValueError) as e:
+        ap.error(str(e))
+
+    n, sin = int(conc.movimientos.sum()), int(conc.no_clasificados.sum())
+    print(f"{n:,} movimientos · {conc.meses.size} meses ({conc.meses[0]} – {conc.meses[-1]}) "
+          f"· {sin:,} sin clasificar · {conc.descartadas:,} filas descartadas "
+          f"· {time.perf_counter() - t0:.2f}s")
+    for path, fila in conc.muestra_descartadas:
+        print(f"  descartada ({path}): {fila}")
+    print(f"{'mes':<8} " + " ".join(f"{c:>12}" for c in CONCEPTOS) + f" {'sin clasif.':>12}")
+    for j, mes in enumerate(conc.meses):
+        print(f"{str(mes):<8} " + " ".join(f"{v:>12,.0f}" for v in conc.real[:, j])
+              + f" {conc.sin_clasificar[j]:>12,.0f}")
+
+    if args.out:
+        from cli import leer_params
+        from generar_flujo_caja import generar_libro
+        params = leer_params(args.params) if args.params else None
+        generar_libro(params, args.out, conciliacion=conc)
+        print(f"Archivo guardado: {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,200 @@
+"""
+Flujo de Caja consolidado de un portafolio (libro "Consolidado").
+
+Suma mes a mes las filas FC de N propiedades en un buffer preasignado
+(concepto × mes) y escribe un solo libro con el layout de build_flujo, con
+valores estáticos: no hay vínculos a los libros de cada propiedad. VAN, TIR y
+payback se calculan sobre el flujo combinado. A la derecha de TOTAL van
+columnas de detalle por propiedad, limitadas a las top-K por |flujo neto|.
+
+    python consolidado.py propiedades.csv consolidado.xlsx --top-k 10
+"""
+
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from exportar import COLUMNAS_FC
+from finanzas import con_nd
+from modelo import ModeloFlujo, NO_RECUPERADO, PARAMETROS_DEFAULT
+
+# Filas que se suman entre propiedades; adr y flujo_acum se derivan
+SUMABLES = ("noches", "ing_brutos", "comision", "ing_netos", "g_comunes", "servicios",
+            "fondo", "dividendo", "tot_egresos", "flujo_neto")
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# MODELO CONSOLIDADO
+# ═════════════════════════════════════════════════════════════════════════════
+class Consolidado(ModeloFlujo):
+    """
+    Flujo combinado de [(id, params)] (ver lote.leer_tabla).
+
+    `filas` y los KPIs heredados (van, tir_*, payback_*) se calculan sobre la
+    suma; `propiedades` guarda los totales y KPIs de cada propiedad para el
+    detalle. Las propiedades se evalúan en lotes de `lote` por horizonte, así
+    la memoria queda acotada por lote × horizonte y no por N × horizonte.
+
+    Horizontes distintos: el consolidado usa el mayor y una propiedad aporta 0
+    después de su último mes. La tasa del VAN es `tasa`, o si falta, la común a
+    todas o el promedio ponderado por inversión.
+    """
+
+    def __init__(self, tabla, lote=4096, tasa=None):
+        self.ids = [str(prop_id) for prop_id, _ in tabla]
+        if not self.ids:
+            raise ValueError("El portafolio no tiene propiedades")
+        lista = [{**PARAMETROS_DEFAULT, **params} for _, params in tabla]
+        cols  = {k: np.array([float(p[k]) for p in lista]) for k in PARAMETROS_DEFAULT}
+        n     = len(self.ids)
+
+        horizontes = cols["horizonte"].astype(int)
+        horizonte  = int(horizontes.max())
+        inversion  = cols["inversion"]
+        if tasa is None:
+            tasas = cols["tasa"]
+            tasa  = (tasas[0] if np.all(tasas == tasas[0])
+                     else np.average(tasas, weights=inversion) if inversion.sum() > 0
+                     else tasas.mean())
+
+        buffer = np.zeros((len(SUMABLES), horizonte))
+        self.propiedades = {k: np.empty(n) for k in
+                            (*COLUMNAS_FC, "van", "tir_anual", "payback_meses")}
+
+        for h in np.unique(horizontes):
+            filas_h = np.flatnonzero(horizontes == h)
+            for i in range(0, filas_h.size, lote):
+                sel    = filas_h[i:i + lote]
+                modelo = ModeloFlujo({k: v[sel] for k, v in cols.items()}, horizonte=int(h))
+                for fila, key in zip(buffer, SUMABLES):
+                    fila[:h] += modelo.filas[key].sum(axis=0)
+
+                tot = modelo.totales
+                for key in COLUMNAS_FC:
+                    self.propiedades[key][sel] = tot[key]
+                self.propiedades["van"][sel]           = modelo.van
+                self.propiedades["tir_anual"][sel]     = modelo.tir_anual
+                self.propiedades["payback_meses"][sel] = modelo.payback_meses
+
+        self.horizonte = horizonte
+        self.params = {
+            "horizonte": horizonte,
+            "gracia":    int(min(cols["gracia"].min(), horizonte)),
+            "inversion": float(inversion.sum()),
+            "tasa":      float(tasa),
+        }
+
+        filas = dict(zip(SUMABLES, buffer))
+        noches = filas["noches"]
+        filas["adr"] = np.divide(filas["ing_brutos"], noches,
+                                 out=np.zeros(horizonte), where=noches > 0)
+        filas["flujo_acum"] = np.cumsum(filas["flujo_neto"]) - self.params["inversion"]
+        self.filas = {k: filas[k] for k in COLUMNAS_FC}
+
+    @property
+    def n(self):
+        return len(self.ids)
+
+    def top(self, k=10):
+        """Índices de las `k` propiedades con mayor |flujo neto total|, de mayor a menor."""
+        peso = np.abs(self.propiedades["flujo_neto"])
+        k = min(max(k, 0), self.n)
+        if k == 0:
+            return np.array([], dtype=int)
+        idx = np.argpartition(-peso, k - 1)[:k] if k < self.n else np.arange(self.n)
+        return idx[np.argsort(-peso[idx], kind="stable")]
+
+    def detalle(self, k=10):
+        """
+        Columnas de detalle [(encabezado, {clave: valor})]: las top-k y, si
+        quedan propiedades, 'Otros' con su suma (ADR promedio; sin TIR ni payback).
+        """
+        top   = self.top(k)
+        resto = np.setdiff1d(np.arange(self.n), top)
+        prop  = self.propiedades
+
+        columnas = [(self.ids[i], {key: float(v[i]) for key, v in prop.items()}) for i in top]
+        if resto.size:
+            otros = {key: float(v[resto].sum()) for key, v in prop.items()}
+            otros.update(adr=float(prop["adr"][resto].mean()), tir_anual=None,
+                         payback_meses=None)
+            columnas.append((f"Otros ({resto.size})", otros))
+        return columnas
+
+    def resumen(self):
+        """KPIs del portafolio (hoja Resumen Consolidado)."""
+        tot     = self.totales
+        tir_m   = self.tir_mensual
+        payback = int(self.payback_meses)
+        return {
+            "propiedades":      self.n,
+            "horizonte":        self.horizonte,
+            "inversion":        self.params["inversion"],
+            "ing_netos_total":  float(tot["ing_netos"]),
+            "egresos_total":    float(tot["tot_egresos"]),
+            "flujo_neto_total": float(tot["flujo_neto"]),
+            "flujo_acum_final": float(tot["flujo_acum"]),
+            "tasa":             self.params["tasa"],
+            "tasa_mensual":     float(self.tasa_mensual),
+            "van":              float(self.van),
+            "van_suma":         float(self.propiedades["van"].sum()),
+            "tir_mensual":      con_nd(tir_m),
+            "tir_anual":        con_nd((1 + tir_m) ** 12 - 1),
+            "payback":          (NO_RECUPERADO if payback == self.horizonte
+                                 else f"{payback} meses"),
+        }
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# LIBRO
+# ═════════════════════════════════════════════════════════════════════════════
+def generar_consolidado(tabla, out, top_k=10, lote=4096, tasa=None):
+    """Escribe el libro Consolidado (+ Resumen Consolidado) en `out`; devuelve el modelo."""
+    import openpyxl
+    from generar_flujo_caja import (build_consolidado, build_resumen_consolidado,
+                                    escribir_valores_cacheados)
+
+    cons = Consolidado(tabla, lote=lote, tasa=tasa)
+
+    wb = openpyxl.Workbook()
+    wb.remove(wb.active)
+    cache = {"Consolidado": build_consolidado(wb, cons, top_k)}
+    build_resumen_consolidado(wb, cons)
+    wb.save(out)
+    escribir_valores_cacheados(out, cache)
+    return cons
+
+
+def main(argv=None):
+    from lote import leer_tabla
+    from parametros import numero
+
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("tabla", help="CSV o JSON con una fila de parámetros por propiedad")
+    ap.add_argument("out", help="Ruta del xlsx consolidado")
+    ap.add_argument("--top-k", type=int, default=10,
+                    help="Propiedades con columna de detalle (el resto va en 'Otros')")
+    ap.add_argument("--lote", type=int, default=4096,
+                    help="Propiedades por evaluación de ModeloFlujo")
+    ap.add_argument("--tasa", type=float, default=None,
+                    help="Tasa anual del VAN consolidado (por defecto: ponderada por inversión)")
+    args = ap.parse_args(argv)
+
+    tabla = [(prop_id, {k: numero(v) for k, v in params.items()})
+             for prop_id, params in leer_tabla(args.tabla)]
+
+    t0 = time.perf_counter()
+    cons = generar_consolidado(tabla, args.out, args.top_k, args.lote, args.tasa)
+    res  = cons.resumen()
+    print(f"{cons.n} propiedades consolidadas en {time.perf_counter() - t0:.2f} s")
+    tir = res["tir_anual"]
+    print(f"VAN {res['van']:,.0f} · TIR anual {tir if isinstance(tir, str) else f'{tir:.2%}'}"
+          f" · payback {res['payback']}")
+    print(f"Archivo guardado: {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
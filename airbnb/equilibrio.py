@@ -0,0 +1,170 @@
+"""
+Punto de equilibrio (goal seek) sobre los parámetros de P_ROW.
+
+Busca el valor de un parámetro en el que un KPI alcanza un objetivo:
+
+    resolver("adr", "van")                      ADR con el que VAN = 0
+    resolver("noches", "payback", objetivo=24)  noches/mes para recuperar en 24 meses
+
+Bisección vectorizada: los parámetros pueden traer arreglos 1-D (un valor por
+propiedad) y cada iteración es una sola evaluación de ModeloFlujo para todo
+el lote. Reemplaza al Goal Seek manual de Excel sobre el libro.
+
+    python equilibrio.py adr:van noches:payback=24 --out libro.xlsx
+    python equilibrio.py adr:van --tabla propiedades.csv
+"""
+
+import argparse
+
+import numpy as np
+
+from modelo import ModeloFlujo, PARAMETROS_DEFAULT, SIN_SOLUCION
+
+# KPI → (función sobre ModeloFlujo, sentido del objetivo)
+#   ">=": se alcanza con KPI ≥ objetivo;  "<=": con KPI ≤ objetivo (payback)
+KPIS = {
+    "van":              (lambda m: m.van,                      ">="),
+    "tir_mensual":      (lambda m: m.tir_mensual,              ">="),
+    "tir_anual":        (lambda m: m.tir_anual,                ">="),
+    "flujo_acum_final": (lambda m: m.filas["flujo_acum"][..., -1], ">="),
+    "payback":          (lambda m: m.payback_meses,            "<="),
+}
+
+# Intervalo de búsqueda por defecto de cada parámetro (None = horizonte)
+RANGOS = {
+    "gracia":    (0, None),
+    "adr":       (0, 10_000_000),
+    "noches":    (0, 31),
+    "crec_adr":  (-0.99, 5),
+    "comision":  (0, 1),
+    "g_comunes": (0, 100_000_000),
+    "servicios": (0, 100_000_000),
+    "fondo":     (0, 100_000_000),
+    "dividendo": (0, 100_000_000),
+    "inversion": (0, 10_000_000_000),
+    "tasa":      (-0.99, 10),
+}
+ENTEROS = {"gracia"}
+
+
+def _alcanza(kpi, objetivo, modelo):
+    """True donde el KPI cumple el objetivo; NaN (TIR N/D) nunca cumple."""
+    f, sentido = KPIS[kpi]
+    valor = f(modelo)
+    with np.errstate(invalid="ignore"):
+        return valor >= objetivo if sentido == ">=" else valor <= objetivo
+
+
+def resolver(parametro, kpi, objetivo=0.0, params=None, rango=None,
+             rtol=1e-10, max_iter=200):
+    """
+    Valor de `parametro` en el borde donde `kpi` alcanza `objetivo`.
+
+    Devuelve el extremo que cumple (KPI ≥ objetivo, o payback ≤ objetivo):
+    para VAN es el punto de equilibrio; para payback, el mínimo (o máximo,
+    según el sentido) que recupera a tiempo. NaN donde el rango no contiene
+    el borde. `params` admite arreglos 1-D (lote); el resultado tiene su forma.
+    `rango` = (lo, hi), escalares o arreglos, reemplaza a RANGOS[parametro].
+    """
+    if parametro not in RANGOS:
+        raise ValueError(f"Parámetro no resoluble: {parametro!r}")
+    if kpi not in KPIS:
+        raise ValueError(f"KPI desconocido: {kpi!r} (opciones: {sorted(KPIS)})")
+
+    params    = {**PARAMETROS_DEFAULT, **(params or {})}
+    horizonte = np.unique(params["horizonte"])
+    if horizonte.size > 1:
+        raise ValueError("El lote debe compartir horizonte (resolver por grupos)")
+    horizonte = int(horizonte[0])
+    entero    = parametro in ENTEROS
+
+    lo, hi = rango or RANGOS[parametro]
+    if hi is None:
+        hi = horizonte
+    forma = np.broadcast_shapes(*(np.shape(v) for v in params.values()),
+                                np.shape(lo), np.shape(hi))
+    a = np.broadcast_to(np.asarray(lo, dtype=float), forma).copy()
+    b = np.broadcast_to(np.asarray(hi, dtype=float), forma).copy()
+
+    def evaluar(x):
+        return np.broadcast_to(
+            _alcanza(kpi, objetivo, ModeloFlujo({**params, parametro: x}, horizonte)),
+            forma)
+
+    # Invariante: en `a` no se cumple, en `b` sí (se invierten si hace falta)
+    ok_a, ok_b = evaluar(a), evaluar(b)
+    valido = ok_a != ok_b
+    a, b = np.where(ok_a, b, a), np.where(ok_a, a, b)
+
+    for _ in range(max_iter):
+        ancho = np.abs(b - a)
+        vivo  = valido & (ancho > (1 if entero else rtol * np.maximum(1.0, np.abs(b))))
+        if not vivo.any():
+            break
+        mid = np.floor((a + b) / 2) if entero else (a + b) / 2
+        mid = np.where(vivo, mid, b)
+        cumple = evaluar(mid)
+        b = np.where(vivo & cumple, mid, b)
+        a = np.where(vivo & ~cumple, mid, a)
+
+    res = np.where(valido, b, np.nan)
+    return res if res.shape else float(res)
+
+
+def equilibrios(consultas, params=None):
+    """
+    Resultados para la hoja Resumen: [(parametro, kpi, objetivo, valor)].
+    `consultas` = [(parametro, kpi, objetivo)]; `params` escalares.
+    """
+    return [(parametro, kpi, objetivo, resolver(parametro, kpi, objetivo, params))
+            for parametro, kpi, objetivo in consultas]
+
+
+def leer_consulta(texto):
+    """"adr:van", "noches:payback=24" → (parametro, kpi, objetivo)."""
+    parametro, _, resto = texto.partition(":")
+    kpi, _, objetivo = resto.partition("=")
+    if not kpi:
+        raise ValueError(f"Consulta inválida: {texto!r} (formato parametro:kpi[=objetivo])")
+    return parametro, kpi, float(objetivo) if objetivo else 0.0
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("consultas", nargs="+", help="parametro:kpi[=objetivo]")
+    ap.add_argument("--tabla", default=None,
+                    help="CSV/JSON de propiedades (como lote.py): resuelve en lote")
+    ap.add_argument("--out", default=None, help="Escribe el libro con los resultados en Resumen")
+    args = ap.parse_args(argv)
+
+    consultas = [leer_consulta(c) for c in args.consultas]
+
+    if args.tabla:
+        from lote import leer_tabla
+        from parametros import numero
+        tabla = leer_tabla(args.tabla)
+        ids   = [prop_id for prop_id, _ in tabla]
+        claves = sorted({k for _, p in tabla for k in p})
+        params = {k: np.array([numero(p.get(k, PARAMETROS_DEFAULT[k])) for _, p in tabla],
+                              dtype=float)
+                  for k in claves}
+        res = [resolver(*c, params=params) for c in consultas]
+        print("id," + ",".join(f"{p}:{k}={o:g}" for p, k, o in consultas))
+        for i, prop_id in enumerate(ids):
+            print(prop_id + "," + ",".join(f"{np.broadcast_to(r, len(ids))[i]:.10g}"
+                                           for r in res))
+        return
+
+    res = equilibrios(consultas)
+    for parametro, kpi, objetivo, valor in res:
+        print(f"{parametro:10s} {kpi}={objetivo:g}: "
+              + (SIN_SOLUCION if np.isnan(valor) else f"{valor:,.6g}"))
+
+    if args.out:
+        from generar_flujo_caja import generar_libro
+        generar_libro(out=args.out, equilibrio=res)
+        print(f"Archivo guardado: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,656 @@
+"""
+Evaluador de fórmulas para los libros generados (recálculo sin Excel/LibreOffice).
+
+Cubre lo que usan build_flujo / build_resumen: + - * / ^ & %, comparaciones,
+IF, SUM, AVERAGE, NPV, IRR, IFERROR, COUNTIF y referencias entre hojas
+('Parámetros'!$B$n). Cada fórmula se compila una vez a una función Python
+(cache por texto, compartido entre libros); con sus referencias se arma el
+grafo de dependencias y se evalúa en orden topológico.
+
+Lee cualquier libro de este generador, también los editados a mano en las
+celdas amarillas. Modo incremental: cambiar() re-evalúa solo las celdas que
+dependen de lo modificado.
+
+    python evaluador.py libro.xlsx --escribir
+    python evaluador.py libro.xlsx --set "Parámetros!B6=42000" --mostrar Resumen!B34
+"""
+
+import argparse
+import fnmatch
+import functools
+import re
+from collections import defaultdict, deque
+
+import numpy as np
+import openpyxl
+from openpyxl.utils.cell import coordinate_to_tuple, get_column_letter
+
+from finanzas import tir, vna
+from generar_flujo_caja import ErrorExcel, escribir_celdas, escribir_valores_cacheados
+
+
+class _Error(Exception):
+    """Error de Excel durante la evaluación; IFERROR lo atrapa."""
+
+    def __init__(self, codigo):
+        super().__init__(codigo)
+        self.codigo = codigo
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# TOKENS Y PARSER
+# ═════════════════════════════════════════════════════════════════════════════
+_REF = r"\$?[A-Z]{1,3}\$?[0-9]+"
+_RE_TOKEN = re.compile(rf"""
+    (?P<esp>\s+)
+  | (?P<texto>"(?:[^"]|"")*")
+  | (?P<funcion>[A-Za-z_][A-Za-z0-9_.]*)(?=\()
+  | (?:(?:'(?P<hoja_q>(?:[^']|'')+)'|(?P<hoja>[A-Za-z_][A-Za-z0-9_.]*))!)?
+    (?P<ref>{_REF}(?::{_REF})?)
+  | (?P<numero>(?:[0-9]+\.?[0-9]*|\.[0-9]+)(?:[eE][+-]?[0-9]+)?)
+  | (?P<logico>TRUE|FALSE)\b
+  | (?P<error>\#(?:NULL!|DIV/0!|VALUE!|REF!|NAME\?|NUM!|N/A))
+  | (?P<op><=|>=|<>|[-+*/^&=<>(),%])
+""", re.X)
+
+
+def _tokens(formula):
+    pos, out = 0, []
+    while pos < len(formula):
+        m = _RE_TOKEN.match(formula, pos)
+        if not m or m.end() == pos:
+            raise ValueError(f"Fórmula no soportada: ={formula}  (en {formula[pos:]!r})")
+        pos = m.end()
+        tipo = m.lastgroup
+        if tipo == "esp":
+            continue
+        if tipo == "ref":
+            hoja = m.group("hoja_q")
+            hoja = hoja.replace("''", "'") if hoja else m.group("hoja")
+            out.append(("ref", (hoja, m.group("ref").replace("$", ""))))
+        else:
+            out.append((tipo, m.group(tipo)))
+    out.append(("fin", None))
+    return out
+
+
+def _celda(coord):
+    fila, col = coordinate_to_tuple(coord)
+    return fila, col
+
+
+class _Parser:
+    """
+    Descenso recursivo con la precedencia de Excel:
+    comparación < & < + - < * / < ^ < signo < %.
+    Produce un árbol de tuplas: ("const", x), ("ref", hoja, f, c), ("rango", …),
+    ("op", op, a, b), ("neg", a), ("pct", a), ("fn", nombre, [args]).
+    """
+
+    def __init__(self, formula, hoja):
+        self.toks = _tokens(formula)
+        self.i    = 0
+        self.hoja = hoja
+
+    def ver(self):
+        return self.toks[self.i]
+
+    def tomar(self, valor=None):
+        tok = self.toks[self.i]
+        if valor is not None and tok[1] != valor:
+            raise ValueError(f"Se esperaba {valor!r} y vino {tok[1]!r}")
+        self.i += 1
+        return tok
+
+    def parsear(self):
+        arbol = self.comparacion()
+        if self.ver()[0] != "fin":
+            raise ValueError(f"Sobra {self.ver()[1]!r} en la fórmula")
+        return arbol
+
+    def _binario(self, ops, siguiente):
+        a = siguiente()
+        while self.ver()[0] == "op" and self.ver()[1] in ops:
+            op = self.tomar()[1]
+            a = ("op", op, a, siguiente())
+        return a
+
+    def comparacion(self):
+        return self._binario(("=", "<>", "<", ">", "<=", ">="), self.concatenacion)
+
+    def concatenacion(self):
+        return self._binario(("&",), self.suma)
+
+    def suma(self):
+        return self._binario(("+", "-"), self.producto)
+
+    def producto(self):
+        return self._binario(("*", "/"), self.potencia)
+
+    def potencia(self):
+        return self._binario(("^",), self.signo)
+
+    def signo(self):
+        if self.ver() in (("op", "-"), ("op", "+")):
+            op = self.tomar()[1]
+            a = self.signo()
+            return ("neg", a) if op == "-" else a
+        return self.porcentaje()
+
+    def porcentaje(self):
+        a = self.primario()
+        while self.ver() == ("op", "%"):
+            self.tomar()
+            a = ("pct", a)
+        return a
+
+    def primario(self):
+        tipo, valor = self.tomar()
+        if tipo == "numero":
+            return ("const", float(valor))
+        if tipo == "texto":
+            return ("const", valor[1:-1].replace('""', '"'))
+        if tipo == "logico":
+            return ("const", valor == "TRUE")
+        if tipo == "error":
+            return ("error", valor)
+        if tipo == "ref":
+            hoja, ref = valor
+            hoja = hoja or self.hoja
+            if ":" in ref:
+                a, b = ref.split(":")
+                (f1, c1), (f2, c2) = _celda(a), _celda(b)
+                return ("rango", hoja, min(f1, f2), min(c1, c2), max(f1, f2), max(c1, c2))
+            return ("ref", hoja, *_celda(ref))
+        if tipo == "funcion":
+            nombre = valor.upper()
+            self.tomar("(")
+            args = []
+            if self.ver() != ("op", ")"):
+                args.append(self.comparacion())
+                while self.ver() == ("op", ","):
+                    self.tomar()
+                    args.append(self.comparacion())
+            self.tomar(")")
+            return ("fn", nombre, args)
+        if (tipo, valor) == ("op", "("):
+            a = self.comparacion()
+            self.tomar(")")
+            return a
+        raise ValueError(f"Token inesperado {valor!r}")
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# SEMÁNTICA DE EXCEL
+# ═════════════════════════════════════════════════════════════════════════════
+def _num(v):
+    if isinstance(v, ErrorExcel):
+        raise _Error(v)
+    if v is None:
+        return 0.0
+    if isinstance(v, (bool, int, float)):
+        return float(v)
+    try:
+        return float(v)
+    except ValueError:
+        raise _Error("#VALUE!") from None
+
+
+def _texto(v):
+    if isinstance(v, ErrorExcel):
+        raise _Error(v)
+    if v is None:
+        return ""
+    if isinstance(v, bool):
+        return "TRUE" if v else "FALSE"
+    if isinstance(v, (int, float)):
+        return str(int(v)) if float(v).is_integer() else format(v, ".15g")
+    return v
+
+
+def _orden(v):
+    """Clave de comparación de Excel: números < texto < lógicos."""
+    if isinstance(v, ErrorExcel):
+        raise _Error(v)
+    if isinstance(v, bool):
+        return (2, v)
+    if isinstance(v, str):
+        return (1, v.lower())
+    return (0, 0.0 if v is None else float(v))
+
+
+def _comparar(op, a, b):
+    if a is None:
+        a = "" if isinstance(b, str) else 0.0
+    if b is None:
+        b = "" if isinstance(a, str) else 0.0
+    a, b = _orden(a), _orden(b)
+    return {"=": a == b, "<>": a != b, "<": a < b,
+            ">": a > b, "<=": a <= b, ">=": a >= b}[op]
+
+
+def _potencia(a, b):
+    try:
+        r = a ** b
+    except ZeroDivisionError:
+        raise _Error("#DIV/0!") from None
+    if isinstance(r, complex):
+        raise _Error("#NUM!")
+    return r
+
+
+_OPS = {
+    "+": lambda a, b: _num(a) + _num(b),
+    "-": lambda a, b: _num(a) - _num(b),
+    "*": lambda a, b: _num(a) * _num(b),
+    "/": lambda a, b: _dividir(_num(a), _num(b)),
+    "^": lambda a, b: _potencia(_num(a), _num(b)),
+    "&": lambda a, b: _texto(a) + _texto(b),
+}
+
+
+def _dividir(a, b):
+    if b == 0:
+        raise _Error("#DIV/0!")
+    return a / b
+
+
+def _numeros(args, directos=True):
+    """
+    Números de los argumentos: en rangos se ignoran texto, lógicos y vacías
+    (como SUM/AVERAGE/NPV); los errores se propagan.
+    """
+    out = []
+    for es_rango, v in args:
+        if es_rango:
+            for x in v:
+                if isinstance(x, ErrorExcel):
+                    raise _Error(x)
+                if isinstance(x, (int, float)) and not isinstance(x, bool):
+                    out.append(float(x))
+        elif directos:
+            out.append(_num(v))
+    return out
+
+
+def _criterio(crit):
+    """Criterio de COUNTIF ("<0", ">=5", "casa", 3) → predicado."""
+    if not isinstance(crit, str):
+        objetivo = crit
+        return lambda x: x is not None and _comparar("=", x, objetivo)
+    m = re.match(r"(<=|>=|<>|<|>|=)?(.*)$", crit, re.S)
+    op, resto = m.group(1) or "=", m.group(2)
+    try:
+        objetivo = float(resto)
+    except ValueError:
+        objetivo = resto
+    if isinstance(objetivo, str) and op in ("=", "<>"):
+        patron = resto.lower()
+        iguala = lambda x: (isinstance(x, str)
+                            and fnmatch.fnmatchcase(x.lower(), patron))
+        return iguala if op == "=" else (lambda x: not iguala(x))
+
+    def pred(x):
+        if isinstance(x, ErrorExcel) or x is None:
+            return op == "<>"
+        if isinstance(objetivo, float) and not isinstance(x, (int, float)):
+            return op == "<>"
+        return _comparar(op, x, objetivo)
+    return pred
+
+
+def _sum(args):
+    return sum(_numeros(args))
+
+
+def _average(args):
+    xs = _numeros(args)
+    if not xs:
+        raise _Error("#DIV/0!")
+    return sum(xs) / len(xs)
+
+
+def _npv(args):
+    if len(args) < 2:
+        raise _Error("#VALUE!")
+    tasa = _num(_escalar(args[0]))
+    if tasa == -1:
+        raise _Error("#DIV/0!")
+    return float(vna(tasa, np.array(_numeros(args[1:]))))
+
+
+def _irr(args):
+    if not args or len(args) > 2:
+        raise _Error("#VALUE!")
+    flujos = _numeros(args[:1])
+    guess  = _num(_escalar(args[1])) if len(args) == 2 else 0.1
+    r = tir(np.array(flujos), guess=guess) if len(flujos) > 1 else np.nan
+    if np.isnan(r):
+        raise _Error("#NUM!")
+    return float(r)
+
+
+def _countif(args):
+    if len(args) != 2 or not args[0][0]:
+        raise _Error("#VALUE!")
+    pred = _criterio(_escalar(args[1]))
+    return float(sum(1 for x in args[0][1] if pred(x)))
+
+
+def _escalar(arg):
+    es_rango, v = arg
+    if es_rango:
+        if len(v) != 1:
+            raise _Error("#VALUE!")
+        return v[0]
+    return v
+
+
+FUNCIONES = {
+    "SUM":     _sum,
+    "AVERAGE": _average,
+    "NPV":     _npv,
+    "IRR":     _irr,
+    "COUNTIF": _countif,
+}
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# COMPILACIÓN
+# ═════════════════════════════════════════════════════════════════════════════
+def _compilar_arbol(nodo, deps):
+    """Árbol → función(leer, leer_rango); agrega las celdas referenciadas a `deps`."""
+    tipo = nodo[0]
+
+    if tipo == "const":
+        v = nodo[1]
+        return lambda leer, rango: v
+
+    if tipo == "error":
+        codigo = nodo[1]
+
+        def error(leer, rango):
+            raise _Error(codigo)
+        return error
+
+    if tipo == "ref":
+        clave = nodo[1:]
+        deps.add(clave)
+        return lambda leer, rango: leer(clave)
+
+    if tipo == "rango":
+        hoja, f1, c1, f2, c2 = nodo[1:]
+        claves = tuple((hoja, f, c) for f in range(f1, f2 + 1) for c in range(c1, c2 + 1))
+        deps.update(claves)
+        return lambda leer, rango: rango(claves)
+
+    if tipo == "neg":
+        a = _compilar_arbol(nodo[1], deps)
+        return lambda leer, rango: -_num(a(leer, rango))
+
+    if tipo == "pct":
+        a = _compilar_arbol(nodo[1], deps)
+        return lambda leer, rango: _num(a(leer, rango)) / 100
+
+    if tipo == "op":
+        op = nodo[1]
+        a = _compilar_arbol(nodo[2], deps)
+        b = _compilar_arbol(nodo[3], deps)
+        if op in _OPS:
+            f = _OPS[op]
+            return lambda leer, rango: f(a(leer, rango), b(leer, rango))
+        return lambda leer, rango: _comparar(op, a(leer, rango), b(leer, rango))
+
+    # ── Funciones ──
+    nombre, args = nodo[1], nodo[2]
+    fs = [_compilar_arbol(arg, deps) for arg in args]
+
+    if nombre == "IF":
+        if not 2 <= len(fs) <= 3:
+            raise ValueError("IF espera 2 o 3 argumentos")
+        cond, si = fs[0], fs[1]
+        no = fs[2] if len(fs) == 3 else (lambda leer, rango: False)
+
+        def si_(leer, rango):
+            c = cond(leer, rango)
+            if isinstance(c, str):
+                raise _Error("#VALUE!")
+            return si(leer, rango) if _num(c) != 0 else no(leer, rango)
+        return si_
+
+    if nombre == "IFERROR":
+        if len(fs) != 2:
+            raise ValueError("IFERROR espera 2 argumentos")
+        valor, alternativa = fs
+
+        def iferror(leer, rango):
+            try:
+                v = valor(leer, rango)
+            except _Error:
+                return alternativa(leer, rango)
+            return v
+        return iferror
+
+    if nombre not in FUNCIONES:
+        raise ValueError(f"Función no soportada: {nombre}")
+    f = FUNCIONES[nombre]
+    es_rango = [arg[0] == "rango" for arg in args]
+
+    def llamar(leer, rango):
+        return f([(r, g(leer, rango)) for r, g in zip(es_rango, fs)])
+    return llamar
+
+
+@functools.lru_cache(maxsize=65536)
+def compilar(formula, hoja):
+    """'=…' en `hoja` → (función, celdas referenciadas). Cacheado por texto."""
+    deps = set()
+    fn = _compilar_arbol(_Parser(formula.lstrip("="), hoja).parsear(), deps)
+    return fn, frozenset(deps)
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# EVALUADOR
+# ═════════════════════════════════════════════════════════════════════════════
+def _clave(ref, hoja=None):
+    """"Hoja!B6", "'Hoja X'!B6" o ("Hoja", "B6") → (hoja, fila, col)."""
+    if isinstance(ref, tuple):
+        hoja, ref = ref
+    elif "!" in ref:
+        hoja, ref = ref.rsplit("!", 1)
+        hoja = hoja[1:-1].replace("''", "'") if hoja.startswith("'") else hoja
+    return (hoja, *_celda(ref.replace("$", "")))
+
+
+class Evaluador:
+    """
+    Grafo de celdas de un libro. `celdas` = {(hoja, fila, col): valor}, donde
+    las fórmulas son textos que empiezan con "=".
+    """
+
+    def __init__(self, celdas):
+        self.valores      = {}
+        self.formulas     = {}
+        self.textos       = {}
+        self.dependientes = defaultdict(set)
+        for clave, v in celdas.items():
+            self._definir(clave, v)
+        self._ordenar()
+
+    @classmethod
+    def desde_libro(cls, path):
+        """Lee todas las hojas (valores y fórmulas) de un xlsx."""
+        wb = openpyxl.load_workbook(path, read_only=True)
+        celdas = {}
+        try:
+            for ws in wb.worksheets:
+                for fila in ws.iter_rows():
+                    for c in fila:
+                        v = c.value
+                        if v is None:
+                            continue
+                        celdas[ws.title, c.row, c.column] = getattr(v, "text", v)
+        finally:
+            wb.close()
+        return cls(celdas)
+
+    # ── Grafo ──
+    def _definir(self, clave, v):
+        if clave in self.formulas:
+            for dep in self.formulas.pop(clave)[1]:
+                self.dependientes[dep].discard(clave)
+            del self.textos[clave]
+        if isinstance(v, str) and v.startswith("=") and len(v) > 1:
+            fn, deps = compilar(v, clave[0])
+            self.formulas[clave] = (fn, deps)
+            self.textos[clave]   = v
+            for dep in deps:
+                self.dependientes[dep].add(clave)
+            self.valores.pop(clave, None)
+        else:
+            self.valores[clave] = v
+
+    def _ordenar(self):
+        """Orden topológico (Kahn) de las fórmulas; error si hay ciclos."""
+        pendientes = {k: sum(1 for d in deps if d in self.formulas)
+                      for k, (_, deps) in self.formulas.items()}
+        cola  = deque(k for k, n in pendientes.items() if n == 0)
+        orden = []
+        while cola:
+            k = cola.popleft()
+            orden.append(k)
+            for d in self.dependientes.get(k, ()):
+                pendientes[d] -= 1
+                if pendientes[d] == 0:
+                    cola.append(d)
+        if len(orden) != len(self.formulas):
+            hoja, f, c = next(k for k, n in pendientes.items() if n > 0)
+            raise ValueError(f"Referencia circular en {hoja}!{get_column_letter(c)}{f}")
+        self.orden    = orden
+        self.posicion = {k: i for i, k in enumerate(orden)}
+
+    # ── Evaluación ──
+    def _leer(self, clave):
+        v = self.valores.get(clave)
+        if isinstance(v, ErrorExcel):
+            raise _Error(v)
+        return v
+
+    def _leer_rango(self, claves):
+        get = self.valores.get
+        return [get(k) for k in claves]
+
+    def _evaluar(self, clave):
+        try:
+            v = self.formulas[clave][0](self._leer, self._leer_rango)
+        except _Error as e:
+            v = ErrorExcel(e.codigo)
+        except OverflowError:
+            v = ErrorExcel("#NUM!")
+        if isinstance(v, list):                  # rango suelto en una celda
+            v = ErrorExcel("#VALUE!")
+        elif isinstance(v, float) and not np.isfinite(v):
+            v = ErrorExcel("#NUM!")
+        self.valores[clave] = v
+
+    def calcular(self):
+        """Evalúa todas las fórmulas en orden topológico."""
+        for clave in self.orden:
+            self._evaluar(clave)
+        return self
+
+    def cambiar(self, cambios):
+        """
+        Modo incremental: `cambios` = {"Hoja!B6": valor}. Re-evalúa solo las
+        fórmulas aguas abajo y devuelve cuántas fueron. Un valor "=…" reemplaza
+        la fórmula de la celda (reordena el grafo).
+        """
+        claves = [_clave(ref) for ref in cambios]
+        formulas_nuevas = False
+        for clave, v in zip(claves, cambios.values()):
+            formulas_nuevas |= clave in self.formulas or (
+                isinstance(v, str) and v.startswith("="))
+            self._definir(clave, v)
+        if formulas_nuevas:
+            self._ordenar()
+
+        sucias, cola = set(), deque(claves)
+        while cola:
+            for d in self.dependientes.get(cola.popleft(), ()):
+                if d not in sucias:
+                    sucias.add(d)
+                    cola.append(d)
+        sucias.update(k for k in claves if k in self.formulas)
+        for clave in sorted(sucias, key=self.posicion.__getitem__):
+            self._evaluar(clave)
+        return len(sucias)
+
+    # ── Resultados ──
+    def valor(self, ref, hoja=None):
+        return self.valores.get(_clave(ref, hoja))
+
+    def resultados(self):
+        """{hoja: {celda: valor}} de las fórmulas (formato de escribir_valores_cacheados)."""
+        out = defaultdict(dict)
+        for (hoja, f, c) in self.formulas:
+            v = self.valores.get((hoja, f, c))
+            if v is not None:
+                out[hoja][f"{get_column_letter(c)}{f}"] = v
+        return dict(out)
+
+    def escribir(self, path):
+        """Guarda los valores calculados como cache de cada fórmula del xlsx."""
+        escribir_valores_cacheados(path, self.resultados())
+
+
+def recalcular(path, cambios=None):
+    """
+    Recalcula el libro en `path` y escribe los valores. `cambios`
+    ({"Hoja!B6": valor}) se guardan primero en las celdas del xlsx, sobre su
+    XML (escribir_celdas): el libro no pasa por openpyxl y conserva las
+    fórmulas compartidas y el layout del backend stream.
+    """
+    if cambios:
+        por_hoja = defaultdict(dict)
+        for ref, v in cambios.items():
+            hoja, fila, col = _clave(ref)
+            por_hoja[hoja][f"{get_column_letter(col)}{fila}"] = v
+        escribir_celdas(path, por_hoja)
+    ev = Evaluador.desde_libro(path).calcular()
+    ev.escribir(path)
+    return ev
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("libros", nargs="+")
+    ap.add_argument("--set", action="append", default=[], metavar="HOJA!CELDA=VALOR",
+                    help="Cambia una celda (en memoria; con --escribir también en el xlsx)")
+    ap.add_argument("--mostrar", action="append", default=[], metavar="HOJA!CELDA")
+    ap.add_argument("--escribir", action="store_true",
+                    help="Guarda los cambios y los valores calculados en cada xlsx")
+    args = ap.parse_args(argv)
+
+    cambios = {}
+    for s in args.set:
+        ref, _, v = s.partition("=")
+        try:
+            cambios[ref] = float(v)
+        except ValueError:
+            cambios[ref] = v
+    mostrar = args.mostrar or ["Resumen!B34", "Resumen!B35", "Resumen!B37"]
+
+    for path in args.libros:
+        if args.escribir:
+            ev = recalcular(path, cambios)
+        else:
+            ev = Evaluador.desde_libro(path).calcular()
+            if cambios:
+                n = ev.cambiar(cambios)
+                print(f"{path}: {n} celdas re-evaluadas")
+        for ref in mostrar:
+            print(f"{path}  {ref} = {ev.valor(ref)}")
+
+
+if __name__ == "__main__":
+    main()
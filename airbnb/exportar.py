@@ -0,0 +1,183 @@
+"""
+Exportación columnar del flujo mensual y los KPIs (Parquet / Arrow IPC / CSV).
+
+    <base>_flujo.<ext>   formato largo: una fila por propiedad × mes, con las
+                         filas de FC (adr, noches, ingresos, egresos, flujo…)
+    <base>_kpis.<ext>    una fila por propiedad: parámetros + KPIs de Resumen
+
+Los valores salen de ModeloFlujo, sin leer el xlsx. Parquet y Arrow requieren
+pyarrow (dependencia opcional); CSV no necesita nada extra. leer() abre Arrow
+IPC y Parquet con memory map, así un consumidor lee columnas sin copiar el
+archivo a memoria.
+"""
+
+import csv
+import os
+
+import numpy as np
+
+from modelo import ModeloFlujo, PARAMETROS_DEFAULT
+
+FORMATOS = {"parquet": ".parquet", "arrow": ".arrow", "csv": ".csv"}
+
+# Columnas FC del formato largo (mismas claves que FC en generar_flujo_caja)
+COLUMNAS_FC = ("adr", "noches", "ing_brutos", "comision", "ing_netos", "g_comunes",
+               "servicios", "fondo", "dividendo", "tot_egresos", "flujo_neto",
+               "flujo_acum")
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet                   # noqa: F401  (registra pyarrow.parquet)
+    except ImportError:
+        raise RuntimeError("Parquet/Arrow requieren pyarrow: pip install pyarrow "
+                           "(o use formato='csv')") from None
+    return pyarrow
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# TABLAS  (dict columna → ndarray)
+# ═════════════════════════════════════════════════════════════════════════════
+def tabla_flujo(modelo, ids):
+    """Formato largo: (propiedad, mes, periodo, en_gracia, FC…) por propiedad × mes."""
+    from generar_flujo_caja import START_DATE
+
+    h   = modelo.horizonte
+    n   = len(ids)
+    mes = np.arange(1, h + 1)
+    gracia = np.asarray(modelo.params["gracia"], dtype=float).reshape(-1, 1)
+
+    tabla = {
+        "propiedad": np.repeat(np.asarray(ids, dtype=str), h),
+        "mes":       np.tile(mes, n),
+        "periodo":   np.tile((np.datetime64(START_DATE, "M") + (mes - 1))
+                             .astype("datetime64[D]"), n),
+        "en_gracia": np.broadcast_to(mes <= gracia, (n, h)).ravel(),
+    }
+    for key in COLUMNAS_FC:
+        tabla[key] = np.broadcast_to(modelo.filas[key], (n, h)).ravel()
+    return tabla
+
+
+def tabla_kpis(modelo, ids):
+    """Una fila por propiedad: parámetros + KPIs (NaN donde Resumen dice "N/D")."""
+    n   = len(ids)
+    tot = modelo.totales
+
+    def col(x):
+        return np.broadcast_to(np.asarray(x, dtype=float), (n,)).copy()
+
+    tabla = {"propiedad": np.asarray(ids, dtype=str)}
+    tabla.update({k: col(modelo.params[k]) for k in PARAMETROS_DEFAULT})
+    tabla.update({
+        "ing_netos_total":  col(tot["ing_netos"]),
+        "egresos_total":    col(tot["tot_egresos"]),
+        "flujo_neto_total": col(tot["flujo_neto"]),
+        "flujo_acum_final": col(tot["flujo_acum"]),
+        "tasa_mensual":     col(modelo.tasa_mensual),
+        "van":              col(modelo.van),
+        "tir_mensual":      col(modelo.tir_mensual),
+        "tir_anual":        col(modelo.tir_anual),
+        "payback_meses":    col(modelo.payback_meses),
+        "payback_mes":      col(modelo.payback_mes),
+    })
+    return tabla
+
+
+def _concatenar(tablas):
+    return {k: np.concatenate([t[k] for t in tablas]) for k in tablas[0]}
+
+
+def tablas_lote(tabla):
+    """
+    (flujo, kpis) para [(id, params)] (ver lote.leer_tabla): un ModeloFlujo en
+    lote por horizonte distinto.
+    """
+    grupos = {}
+    for prop_id, params in tabla:
+        p = {**PARAMETROS_DEFAULT, **params}
+        grupos.setdefault(int(p["horizonte"]), []).append((prop_id, p))
+
+    flujos, kpis = [], []
+    for h, filas in sorted(grupos.items()):
+        ids = [prop_id for prop_id, _ in filas]
+        lote = {k: np.array([float(p[k]) for _, p in filas]) for k in PARAMETROS_DEFAULT}
+        modelo = ModeloFlujo(lote, horizonte=h)
+        flujos.append(tabla_flujo(modelo, ids))
+        kpis.append(tabla_kpis(modelo, ids))
+    return _concatenar(flujos), _concatenar(kpis)
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# ESCRITURA / LECTURA
+# ═════════════════════════════════════════════════════════════════════════════
+def escribir(tabla, path, formato=None):
+    """Escribe la tabla columnar; el formato se deduce de la extensión si falta."""
+    formato = formato or os.path.splitext(path)[1].lstrip(".")
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato desconocido: {formato!r} (opciones: {sorted(FORMATOS)})")
+
+    if formato == "csv":
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            w = csv.writer(f)
+            w.writerow(tabla)
+            columnas = [np.datetime_as_string(v) if v.dtype.kind == "M" else v
+                        for v in tabla.values()]
+            w.writerows(zip(*(c.tolist() for c in columnas)))
+        return path
+
+    pa = _pyarrow()
+    t = pa.table(tabla)
+    if formato == "parquet":
+        pa.parquet.write_table(t, path, compression="zstd")
+    else:
+        with pa.OSFile(path, "wb") as sink, pa.ipc.new_file(sink, t.schema) as w:
+            w.write_table(t)
+    return path
+
+
+def leer(path):
+    """
+    Arrow IPC / Parquet → pyarrow.Table leída con memory map (sin copia);
+    CSV → dict columna → ndarray.
+    """
+    formato = os.path.splitext(path)[1].lstrip(".")
+    if formato == "csv":
+        with open(path, newline="", encoding="utf-8") as f:
+            filas = csv.reader(f)
+            columnas = next(filas)
+            datos = list(zip(*filas)) or [()] * len(columnas)
+        out = {}
+        for k, valores in zip(columnas, datos):
+            if valores and set(valores) <= {"True", "False"}:
+                out[k] = np.array(valores) == "True"
+                continue
+            try:
+                out[k] = np.array(valores, dtype=float)
+            except ValueError:
+                out[k] = np.array(valores)
+        return out
+
+    pa = _pyarrow()
+    if formato == "parquet":
+        return pa.parquet.read_table(path, memory_map=True)
+    with pa.memory_map(path, "r") as src:
+        return pa.ipc.open_file(src).read_all()
+
+
+def exportar(flujo, kpis, base, formato="parquet"):
+    """Escribe <base>_flujo y <base>_kpis; devuelve las rutas."""
+    ext = FORMATOS.get(formato)
+    if ext is None:
+        raise ValueError(f"Formato desconocido: {formato!r} (opciones: {sorted(FORMATOS)})")
+    return [escribir(flujo, f"{base}_flujo{ext}", formato),
+            escribir(kpis,  f"{base}_kpis{ext}",  formato)]
+
+
+def exportar_modelo(modelo, base, formato="parquet", ids=None):
+    """Exporta un ModeloFlujo (escalar o en lote) con `ids` por propiedad."""
+    if ids is None:
+        n = int(np.prod(modelo.filas["flujo_neto"].shape[:-1]))
+        ids = [os.path.basename(base)] if n == 1 else [str(i) for i in range(1, n + 1)]
+    return exportar(tabla_flujo(modelo, ids), tabla_kpis(modelo, ids), base, formato)
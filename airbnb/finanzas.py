@@ -0,0 +1,186 @@
+"""
+Matemática financiera vectorizada con la semántica de Excel.
+
+    vna(tasa, flujos)   = NPV(tasa, v1..vn)   flujos a fin de período, t=1..n
+    tir(flujos)         = IRR(v0..vn)         NaN donde Excel mostraría "N/D"
+    payback_countif     = COUNTIF(acum,"<0")  (fórmula de Resumen)
+    payback_mes         = primer mes con acumulado ≥ 0
+
+Todas operan sobre el último eje, así un lote de N flujos se resuelve de una
+vez (forma (N, n)); no hay bucle por flujo.
+"""
+
+import numpy as np
+
+from parametros import ND
+
+
+def tasa_mensual(tasa_anual):
+    """Tasa mensual equivalente: (1+tasa)^(1/12)-1."""
+    return (1 + np.asarray(tasa_anual, dtype=float)) ** (1 / 12) - 1
+
+
+def con_nd(x):
+    """Escalar: NaN → "N/D" (como IFERROR(...,"N/D")); si no, float."""
+    x = float(x)
+    return ND if np.isnan(x) else x
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# VNA
+# ═════════════════════════════════════════════════════════════════════════════
+def vna(tasa, flujos):
+    """
+    NPV de Excel: Σ v_t / (1+tasa)^t, t = 1..n sobre el último eje.
+    `tasa` es escalar o tiene la forma de los ejes previos de `flujos`.
+    """
+    flujos = np.asarray(flujos, dtype=float)
+    x = 1 / (1 + np.asarray(tasa, dtype=float))
+    # Horner: (((v_n x + v_{n-1}) x + …) x + v_1) x
+    acc = np.zeros(np.broadcast_shapes(x.shape, flujos.shape[:-1]))
+    for t in range(flujos.shape[-1] - 1, -1, -1):
+        acc = (acc + flujos[..., t]) * x
+    return acc
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# TIR
+# ═════════════════════════════════════════════════════════════════════════════
+def _polinomio(c, x):
+    """
+    f(x) = Σ c_t x^t y f'(x); c (m, n+1), x (m,) o (m, k). Por Horner (un paso
+    por coeficiente) salvo en lotes chicos con muchos períodos, donde conviene
+    la tabla de potencias x^t completa.
+    """
+    if x.ndim == 2:
+        c = c[:, None, :]
+    n = c.shape[-1]
+    if x.size * n <= 2**18 and n > 64:
+        t  = np.arange(n)
+        xp = x[..., None] ** np.maximum(t - 1, 0)          # x^(t-1), t ≥ 1
+        # 0 · x^t = 0 aunque x^t desborde (flujos con ceros al final), como en Horner
+        xp = np.where(c != 0, xp, 0.0)
+        df = np.sum(c[..., 1:] * t[1:] * xp[..., 1:], axis=-1)
+        return np.sum(c * xp * np.where(t > 0, x[..., None], 1.0), axis=-1), df
+    f  = np.zeros(x.shape)
+    df = np.zeros(x.shape)
+    for t in range(c.shape[-1] - 1, -1, -1):
+        df = df * x + f
+        f  = f * x + c[..., t]
+    return f, df
+
+
+def _newton(c, x, max_iter, tol):
+    """
+    Newton sobre x = 1/(1+r) sólo en las filas que aún no convergen. Un paso
+    que saldría de x > 0 (r ≤ -1) se amortigua a la mitad de x.
+    """
+    ok   = np.zeros(x.shape, dtype=bool)
+    vivo = np.arange(x.size)
+    for _ in range(max_iter):
+        if not vivo.size:
+            break
+        xv = x[vivo]
+        f, df = _polinomio(c[vivo], xv)
+        with np.errstate(all="ignore"):
+            paso = f / df
+        nuevo = np.where(xv - paso > 0, xv - paso, 0.5 * xv)
+        sano  = np.isfinite(nuevo)
+        x[vivo] = np.where(sano, nuevo, xv)
+        conv = sano & (np.abs(nuevo - xv) <= tol * nuevo)
+        ok[vivo[conv]] = True
+        vivo = vivo[sano & ~conv]
+    return x, ok
+
+
+def _biseccion(c, x0, iteraciones=80, puntos=96):
+    """
+    Raíz más cercana a x0 en una grilla logarítmica de x ∈ (1e-6, 1e2),
+    refinada por bisección. NaN donde f no cambia de signo.
+    """
+    m = c.shape[0]
+    grilla = np.geomspace(1e-6, 1e2, puntos)
+    f, _ = _polinomio(c, np.broadcast_to(grilla, (m, puntos)).copy())
+    cambio = np.signbit(f[:, :-1]) != np.signbit(f[:, 1:])
+
+    res = np.full(m, np.nan)
+    hay = cambio.any(axis=1)
+    if not hay.any():
+        return res
+
+    # Intervalo con cambio de signo más cercano a x0 (como el guess de Excel)
+    centro = np.sqrt(grilla[:-1] * grilla[1:])
+    dist   = np.where(cambio, np.abs(np.log(centro) - np.log(x0)[:, None]), np.inf)
+    k      = np.argmin(dist, axis=1)[hay]
+    filas  = np.flatnonzero(hay)
+    lo, hi = grilla[k], grilla[k + 1]
+    f_lo   = f[filas, k]
+    cc     = c[filas]
+
+    for _ in range(iteraciones):
+        mid = 0.5 * (lo + hi)
+        f_mid, _ = _polinomio(cc, mid)
+        izq = np.signbit(f_mid) == np.signbit(f_lo)
+        lo   = np.where(izq, mid, lo)
+        f_lo = np.where(izq, f_mid, f_lo)
+        hi   = np.where(izq, hi, mid)
+
+    res[filas] = 0.5 * (lo + hi)
+    return res
+
+
+def tir(flujos, guess=0.1, max_iter=20, tol=1e-12):
+    """
+    IRR de Excel sobre el último eje de `flujos` (t = 0..n), para lotes.
+
+    Newton desde `guess` (como Excel) sobre el valor presente, en x = 1/(1+r).
+    Las filas que no convergen reintentan sobre el valor futuro, en y = 1+r
+    (mejor condicionado cuando r < 0), y las que aún quedan van a bisección
+    sobre el intervalo con cambio de signo más cercano al guess.
+    Devuelve NaN (el "N/D" de IFERROR(IRR(...))) cuando no hay raíz con r > -1.
+    Las filas sin un flujo positivo y uno negativo no tienen raíz (#NUM! en
+    Excel): quedan en NaN sin pasar por ningún método.
+    """
+    flujos = np.asarray(flujos, dtype=float)
+    forma  = flujos.shape[:-1]
+    c = flujos.reshape(-1, flujos.shape[-1])
+    res = np.full(c.shape[0], np.nan)
+    con_signo = (c.max(axis=1, initial=-np.inf) > 0) & (c.min(axis=1, initial=np.inf) < 0)
+    if not con_signo.any():
+        return res.reshape(forma)
+    if not con_signo.all():
+        c = c[con_signo]
+
+    # x^t desborda en horizontes largos: esas filas no convergen y caen al
+    # siguiente método, no hace falta avisar
+    with np.errstate(over="ignore", invalid="ignore", divide="ignore"):
+        x0 = np.full(c.shape[0], 1 / (1 + guess))
+        x, ok = _newton(c, x0.copy(), max_iter, tol)
+        if not ok.all():
+            malas = np.flatnonzero(~ok)
+            y, ok_fv = _newton(c[malas, ::-1], 1 / x0[malas], max_iter, tol)
+            x[malas] = 1 / y
+            malas = malas[~ok_fv]
+            if malas.size:
+                x[malas] = _biseccion(c[malas], x0[malas])
+        r = 1 / x - 1
+    res[con_signo] = np.where(np.isfinite(r) & (r > -1), r, np.nan)
+    return res.reshape(forma)
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# PAYBACK
+# ═════════════════════════════════════════════════════════════════════════════
+def payback_countif(acum):
+    """Meses con acumulado < 0: la fórmula COUNTIF de la hoja Resumen."""
+    return np.sum(np.asarray(acum) < 0, axis=-1)
+
+
+def payback_mes(acum):
+    """
+    Primer mes (1..n) en que el acumulado llega a ≥ 0; NaN si no se recupera.
+    A diferencia de COUNTIF, no cuenta meses negativos posteriores al cruce.
+    """
+    cruce = np.asarray(acum) >= 0
+    mes = np.argmax(cruce, axis=-1) + 1.0
+    return np.where(cruce.any(axis=-1), mes, np.nan)
@@ -2,17 +2,37 @@
 Genera un Excel de Flujo de Caja para un Airbnb.
 
 Layout Flujo de Caja: MESES = COLUMNAS | CONCEPTOS = FILAS
-Hojas: Parámetros | Flujo de Caja Mensual | Resumen
+Hojas: Parámetros | Flujo de Caja Mensual | Resumen  (+ Riesgo y Sensibilidad opcionales)
+Libro de portafolio: Consolidado | Resumen Consolidado  (ver consolidado.py)
 """
 
 import openpyxl
 from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+from openpyxl.styles.cell_style import StyleArray
 from openpyxl.utils import get_column_letter
+from xml.etree import ElementTree
+from xml.sax.saxutils import escape
+from copy import copy
+import codecs
+import contextlib
 import datetime
+import functools
+import hashlib
+import io
+import os
+import re
+import shutil
+import tempfile
+import weakref
+import zipfile
+
+from modelo import ModeloFlujo, PARAMETROS_DEFAULT, SIN_SOLUCION
 
 # ── Constantes ────────────────────────────────────────────────────────────────
+# Valores por defecto; el layout real se toma de los parámetros (ver layout())
 HORIZONTE     = 36
-MESES_GRACIA  = 6   # solo para colorear; la lógica usa la celda de Parámetros
+MESES_GRACIA  = 6
+MAX_HORIZONTE = 16_382   # límite de columnas de Excel (A + meses + TOTAL)
 
 C_DARK    = "1A1A2E"
 C_ACCENT  = "C0392B"   # rojo oscuro (gracia)
@@ -48,16 +68,38 @@ def aln(h="center", v="center", wrap=False):
     return Alignment(horizontal=h, vertical=v, wrap_text=wrap)
 
 
-def style_cell(cell, bg=C_WHITE, fg=C_DARK, bold=False, size=10,
-               h="right", wrap=False, num_fmt=None, italic=False):
-    cell.fill  = fill(bg)
+def _aplicar_estilo(cell, bg, fg, bold, size, h, wrap, num_fmt, italic, border):
+    """Construye y asigna los objetos de estilo (camino lento, uno por rol)."""
+    if bg is not None:
+        cell.fill = fill(bg)
     cell.font  = fnt(bold=bold, color=fg, size=size, italic=italic)
     cell.alignment = aln(h=h, wrap=wrap)
-    cell.border = border_thin()
+    if border:
+        cell.border = border_thin()
     if num_fmt:
         cell.number_format = num_fmt
 
 
+# Registro de estilos: libro → {rol: StyleArray}. Cada combinación (rol visual)
+# se construye una sola vez por libro; las celdas siguientes copian los índices
+# ya registrados en vez de crear y deduplicar Font/Fill/Border nuevos.
+_ESTILOS = weakref.WeakKeyDictionary()
+
+
+def style_cell(cell, bg=C_WHITE, fg=C_DARK, bold=False, size=10,
+               h="right", wrap=False, num_fmt=None, italic=False, border=True):
+    """bg=None deja la celda sin relleno; border=False sin borde."""
+    rol = (bg, fg, bold, size, h, wrap, num_fmt, italic, border)
+    registro = _ESTILOS.setdefault(cell.parent.parent, {})
+    estilo = registro.get(rol)
+    if estilo is None:
+        cell._style = StyleArray()
+        _aplicar_estilo(cell, *rol)
+        registro[rol] = copy(cell._style)
+    else:
+        cell._style = copy(estilo)
+
+
 # ── Referencias a Parámetros ──────────────────────────────────────────────────
 # Filas reales en hoja Parámetros (se calculan en build_parametros)
 P_ROW = {
@@ -88,9 +130,6 @@ def mc(m):
     return get_column_letter(m + 1)      # m=1→B, m=36→AK
 
 
-FIRST_COL   = mc(1)                      # "B"
-LAST_COL    = mc(HORIZONTE)              # "AK"
-TOTAL_COL   = get_column_letter(HORIZONTE + 2)   # "AL"
 FC_SHEET    = "'Flujo de Caja Mensual'"
 
 # Filas de la hoja FC
@@ -109,11 +148,259 @@ FC = {
     "flujo_acum":  18,
 }
 
+IRR_ROW = 50   # fila helper de TIR en Resumen
+
+
+# ── Layout: columnas, rangos y etiquetas según (horizonte, gracia) ────────────
+class Layout:
+    """Se obtiene con layout() / layout_de(); se calcula una vez por (horizonte, gracia)."""
+
+    def __init__(self, horizonte, gracia):
+        self.horizonte = horizonte
+        self.gracia    = gracia
+
+        # Flujo de Caja: mes m → cols[m-1]  (B en adelante) + columna TOTAL
+        self.cols      = tuple(mc(m) for m in range(1, horizonte + 1))
+        self.first_col = self.cols[0]                        # "B"
+        self.last_col  = self.cols[-1]                       # "AK" con 36 meses
+        self.total_col = get_column_letter(horizonte + 2)    # "AL" con 36 meses
+
+        self.fn_range   = f"{FC_SHEET}!{self.first_col}17:{self.last_col}17"
+        self.acum_range = f"{FC_SHEET}!{self.first_col}18:{self.last_col}18"
+        self.acum_final = f"{FC_SHEET}!{self.last_col}18"
+
+        # Helper TIR en Resumen: t=0 → B, t=1..H → C..
+        self.irr_cols  = tuple(get_column_letter(t + 2) for t in range(horizonte + 1))
+        self.irr_range = f"{self.irr_cols[0]}{IRR_ROW}:{self.irr_cols[-1]}{IRR_ROW}"
+
+    @property
+    def meses(self):
+        return range(1, self.horizonte + 1)
+
+    def en_gracia(self, m):
+        return m <= self.gracia
+
+
+@functools.lru_cache(maxsize=None)
+def layout(horizonte=HORIZONTE, gracia=MESES_GRACIA):
+    if not 1 <= horizonte <= MAX_HORIZONTE:
+        raise ValueError(f"Horizonte fuera de rango (1..{MAX_HORIZONTE}): {horizonte}")
+    if not 0 <= gracia <= horizonte:
+        raise ValueError(f"Meses de gracia fuera de rango (0..{horizonte}): {gracia}")
+    return Layout(horizonte, gracia)
+
+
+def layout_de(params):
+    """Layout para un dict de parámetros (usa 'horizonte' y 'gracia')."""
+    return layout(int(params["horizonte"]), int(params["gracia"]))
+
+
+# Secciones (filas sin datos)
+FC_SECTION_ROWS = {
+    4:  ("INGRESOS",               C_BLUE),
+    10: ("EGRESOS FIJOS",          "7B241C"),
+    16: ("RESULTADO",              "1A5276"),
+}
+
+# Filas de datos: (fila, label, es_total/bold, formato)
+FC_DATA_ROWS = [
+    (5,  "ADR  (CLP / noche)",              False, CLP),
+    (6,  "Noches del mes",                   False, "0"),
+    (7,  "Ingresos Brutos  (CLP)",           False, CLP),
+    (8,  "( - ) Comisión admin / Airbnb",    False, CLP),
+    (9,  "INGRESOS NETOS  (CLP)",            True,  CLP),
+    (11, "Gastos Comunes",                    False, CLP),
+    (12, "Servicios  (luz, agua, internet)", False, CLP),
+    (13, "Fondo de Mantención",              False, CLP),
+    (14, "Dividendo / Arriendo",             False, CLP),
+    (15, "TOTAL EGRESOS",                    True,  CLP),
+    (17, "FLUJO NETO MENSUAL  (CLP)",        True,  CLP),
+    (18, "FLUJO ACUMULADO  (CLP)",           True,  CLP),
+]
+
+INCOME_ROWS  = {5, 6, 7, 8, 9}
+RESULT_ROWS  = {9, 15, 17, 18}
+FC_KEY       = {r: k for k, r in FC.items()}
+
+START_DATE = datetime.date(2025, 1, 1)
+
+
+def periodo(m):
+    """Etiqueta 'Ene 2025' … del mes m."""
+    month_num = ((START_DATE.month + m - 2) % 12) + 1
+    year_num  = START_DATE.year + (START_DATE.month + m - 2) // 12
+    return datetime.date(year_num, month_num, 1).strftime("%b %Y")
+
+
+def fc_colores(row_num, m, lay):
+    """(fondo, fuente) de la celda fila/mes del Flujo de Caja."""
+    in_grace = lay.en_gracia(m)
+
+    # Color de fondo
+    if in_grace and row_num in INCOME_ROWS:
+        bg = C_RED_L
+    elif row_num in RESULT_ROWS:
+        bg = C_GREEN_L if not in_grace else C_RED_L
+    elif row_num % 2 == 0:
+        bg = C_GRAY
+    else:
+        bg = C_WHITE
+
+    # Color de fuente
+    if row_num == 18:
+        fg = "1A5276"
+    elif row_num == 17:
+        fg = "145A32" if not in_grace else "7B241C"
+    elif row_num == 9:
+        fg = "145A32" if not in_grace else "7B241C"
+    else:
+        fg = C_DARK
+
+    return bg, fg
+
+
+def fc_formula(row_num, m):
+    """Fórmula de la celda fila/mes del Flujo de Caja."""
+    col = mc(m)
+    year_idx = (m - 1) // 12
+
+    if row_num == 5:    # ADR con crecimiento
+        return (f"=IF({m}<={p('gracia')},0,"
+                f"{p('adr')}*(1+{p('crec_adr')})^{year_idx})")
+    elif row_num == 6:  # Noches
+        return f"=IF({m}<={p('gracia')},0,{p('noches')})"
+    elif row_num == 7:  # Ingresos brutos
+        return f"={col}5*{col}6"
+    elif row_num == 8:  # Comisión
+        return f"={col}7*{p('comision')}"
+    elif row_num == 9:  # Ingresos netos
+        return f"={col}7-{col}8"
+    elif row_num == 11: # Gastos comunes
+        return f"={p('g_comunes')}"
+    elif row_num == 12: # Servicios
+        return f"={p('servicios')}"
+    elif row_num == 13: # Fondo
+        return f"={p('fondo')}"
+    elif row_num == 14: # Dividendo (0 durante gracia)
+        return f"=IF({m}<={p('gracia')},0,{p('dividendo')})"
+    elif row_num == 15: # Total egresos
+        return f"=SUM({col}11:{col}14)"
+    elif row_num == 17: # Flujo neto
+        return f"={col}9-{col}15"
+    elif row_num == 18: # Flujo acumulado
+        if m == 1:
+            return f"=-{p('inversion')}+{col}17"
+        return f"={mc(m-1)}18+{col}17"
+
+
+def fc_total_formula(row_num, lay):
+    """Fórmula de la columna TOTAL / FINAL."""
+    if row_num == 5:           # ADR promedio
+        return f"=AVERAGE({lay.first_col}5:{lay.last_col}5)"
+    elif row_num == 18:        # Acumulado: último valor
+        return f"={lay.last_col}18"
+    else:                      # Suma de todos los meses
+        return f"=SUM({lay.first_col}{row_num}:{lay.last_col}{row_num})"
+
+
+def fc_real(reales, row_num, m):
+    """Valor real (ver reservas.py) de la celda fila/mes, o None si se proyecta."""
+    fila = (reales or {}).get(FC_KEY.get(row_num))
+    if fila is None or fila[m - 1] != fila[m - 1]:       # NaN: mes proyectado
+        return None
+    return float(fila[m - 1])
+
+
+# ── Modo formulas="compartidas" ───────────────────────────────────────────────
+# Cada fila se escribe como fórmula compartida de Excel (<f t="shared">) anclada
+# en el primer mes; las demás celdas solo referencian el ancla. El índice de año
+# y la prueba de gracia salen de filas helper bajo la tabla, no de literales.
+FORMULAS = ("celda", "compartidas")
+
+FC_HELPER_ROWS = {
+    "mes":    20,    # m (constante)
+    "anio":   21,    # (m - 1) // 12  (constante)
+    "gracia": 22,    # m <= gracia    (fórmula)
+}
+
+# Marcador de celda seguidora: "=§B5" comparte la fórmula del ancla B5.
+# Solo existe entre wb.save y escribir_valores_cacheados (ver _compartir_xml).
+_SEGUIDORA = "=§"
+
+
+def fc_ancla(row_num):
+    """Mes donde se ancla la fórmula compartida (el acumulado parte en el mes 2)."""
+    return 2 if row_num == 18 else 1
+
+
+def fc_formula_compartida(row_num, m):
+    """Fórmula del ancla (con refs. relativas a las filas helper) o marcador de seguidora."""
+    ancla = fc_ancla(row_num)
+    if m > ancla:
+        return f"{_SEGUIDORA}{mc(ancla)}{row_num}"
+
+    col    = mc(m)
+    gracia = f"{col}${FC_HELPER_ROWS['gracia']}"
+    if row_num == 5:
+        return (f"=IF({gracia},0,"
+                f"{p('adr')}*(1+{p('crec_adr')})^{col}${FC_HELPER_ROWS['anio']})")
+    elif row_num == 6:
+        return f"=IF({gracia},0,{p('noches')})"
+    elif row_num == 14:
+        return f"=IF({gracia},0,{p('dividendo')})"
+    elif row_num == FC_HELPER_ROWS["gracia"]:
+        return f"={col}${FC_HELPER_ROWS['mes']}<={p('gracia')}"
+    return fc_formula(row_num, m)
+
+
+def grupos_compartidos(lay):
+    """{celda ancla: rango} de las fórmulas compartidas del Flujo de Caja."""
+    grupos = {}
+    for row_num in [r for r, *_ in FC_DATA_ROWS] + [FC_HELPER_ROWS["gracia"]]:
+        ancla = fc_ancla(row_num)
+        if ancla < lay.horizonte:
+            grupos[f"{mc(ancla)}{row_num}"] = f"{mc(ancla)}{row_num}:{lay.last_col}{row_num}"
+    return grupos
+
+
+def fc_helpers(lay):
+    """[(fila, etiqueta, [valor por mes])] de las filas helper."""
+    return [
+        (FC_HELPER_ROWS["mes"],    "Helper mes →",  list(lay.meses)),
+        (FC_HELPER_ROWS["anio"],   "Helper año →",  [(m - 1) // 12 for m in lay.meses]),
+        (FC_HELPER_ROWS["gracia"], "Helper gracia →",
+         [fc_formula_compartida(FC_HELPER_ROWS["gracia"], m) for m in lay.meses]),
+    ]
+
 
 # ═════════════════════════════════════════════════════════════════════════════
 # HOJA 1 – PARÁMETROS
 # ═════════════════════════════════════════════════════════════════════════════
-def build_parametros(wb):
+PARAM_SECCIONES = [
+    ("HORIZONTE Y OPERACIÓN", [
+        ("horizonte", "Horizonte (meses)",                None),
+        ("gracia",    "Meses de gracia (sin ingresos)",   None),
+        ("adr",       "ADR promedio (CLP / noche)",       CLP),
+        ("noches",    "Noches promedio por mes",          None),
+        ("crec_adr",  "Crecimiento anual ADR",            PCT),
+    ]),
+    ("COSTOS OPERATIVOS (CLP / mes)", [
+        ("comision",  "Comisión administración / Airbnb", PCT),
+        ("g_comunes", "Gastos comunes",                   CLP),
+        ("servicios", "Servicios  (luz, agua, internet)", CLP),
+        ("fondo",     "Fondo de mantención",              CLP),
+        ("dividendo", "Dividendo / arriendo",             CLP),
+    ]),
+    ("INVERSIÓN Y EVALUACIÓN", [
+        ("inversion", "Inversión inicial  (amoblado)",    CLP),
+        ("tasa",      "Tasa de descuento anual",          PCT),
+    ]),
+]
+# clave → (etiqueta, formato)
+PARAM_INFO = {key: (label, fmt) for _, items in PARAM_SECCIONES for key, label, fmt in items}
+
+
+def build_parametros(wb, params=None):
     ws = wb.create_sheet("Parámetros")
     ws.sheet_view.showGridLines = False
 
@@ -126,43 +413,20 @@ def build_parametros(wb):
     ws.merge_cells("A1:B1")
     c = ws["A1"]
     c.value = "PARÁMETROS  –  FLUJO DE CAJA AIRBNB"
-    c.fill  = fill(C_DARK)
-    c.font  = fnt(bold=True, color=C_WHITE, size=14)
-    c.alignment = aln()
-
-    secciones = [
-        ("HORIZONTE Y OPERACIÓN", [
-            ("Horizonte (meses)",               36,        None),
-            ("Meses de gracia (sin ingresos)",  6,         None),
-            ("ADR promedio (CLP / noche)",       38_000,    CLP),
-            ("Noches promedio por mes",          21,        None),
-            ("Crecimiento anual ADR",            0.03,      PCT),
-        ]),
-        ("COSTOS OPERATIVOS (CLP / mes)", [
-            ("Comisión administración / Airbnb", 0.18,     PCT),
-            ("Gastos comunes",                   90_000,   CLP),
-            ("Servicios  (luz, agua, internet)", 60_000,   CLP),
-            ("Fondo de mantención",              40_000,   CLP),
-            ("Dividendo / arriendo",             274_000,  CLP),
-        ]),
-        ("INVERSIÓN Y EVALUACIÓN", [
-            ("Inversión inicial  (amoblado)",    3_500_000, CLP),
-            ("Tasa de descuento anual",          0.12,      PCT),
-        ]),
-    ]
+    style_cell(c, bg=C_DARK, fg=C_WHITE, bold=True, size=14, h="center", border=False)
+
+    params = {**PARAMETROS_DEFAULT, **(params or {})}
 
     row = 3
-    for titulo, items in secciones:
+    for titulo, items in PARAM_SECCIONES:
         ws.row_dimensions[row].height = 22
         ws.merge_cells(f"A{row}:B{row}")
         c = ws[f"A{row}"]
         c.value = titulo
-        c.fill  = fill(C_BLUE)
-        c.font  = fnt(bold=True, color=C_WHITE, size=10)
-        c.alignment = aln(h="left")
+        style_cell(c, bg=C_BLUE, fg=C_WHITE, bold=True, size=10, h="left", border=False)
         row += 1
 
-        for label, valor, fmt in items:
+        for key, label, fmt in items:
             ws.row_dimensions[row].height = 20
             bg = C_GRAY if row % 2 == 0 else C_WHITE
 
@@ -171,11 +435,8 @@ def build_parametros(wb):
             style_cell(cA, bg=bg, h="left")
 
             cB = ws[f"B{row}"]
-            cB.value = valor
-            cB.fill  = fill(C_YELLOW)
-            cB.font  = fnt(bold=True, color=C_BLUE, size=11)
-            cB.alignment = aln(h="right")
-            cB.border = border_thin()
+            cB.value = params[key]
+            style_cell(cB, bg=C_YELLOW, fg=C_BLUE, bold=True, size=11, h="right")
             if fmt:
                 cB.number_format = fmt
             row += 1
@@ -187,130 +448,88 @@ def build_parametros(wb):
     ws.merge_cells(f"A{row}:B{row}")
     c = ws[f"A{row}"]
     c.value = "Las celdas en amarillo son editables – el resto se recalcula automáticamente."
-    c.font  = fnt(italic=True, color="888888", size=9)
-    c.alignment = aln(h="left", wrap=True)
+    style_cell(c, bg=None, fg="888888", size=9, italic=True, h="left", wrap=True, border=False)
 
 
 # ═════════════════════════════════════════════════════════════════════════════
 # HOJA 2 – FLUJO DE CAJA MENSUAL  (meses = columnas)
 # ═════════════════════════════════════════════════════════════════════════════
-def build_flujo(wb):
-    ws = wb.create_sheet("Flujo de Caja Mensual")
-    ws.sheet_view.showGridLines = False
-
+def _marco_flujo(ws, lay, titulo, ultima=None):
+    """
+    Anchos, título, encabezados de mes (filas 2-3) y filas de sección.
+    `ultima` extiende las filas de sección a columnas a la derecha de TOTAL.
+    """
     # ── Anchos ──
     ws.column_dimensions["A"].width = 32
-    for m in range(1, HORIZONTE + 1):
-        ws.column_dimensions[mc(m)].width = 11
-    ws.column_dimensions[TOTAL_COL].width = 15
+    for col in lay.cols:
+        ws.column_dimensions[col].width = 11
+    ws.column_dimensions[lay.total_col].width = 15
 
     # ── Fila 1: Título ──
-    last_col = TOTAL_COL
-    ws.merge_cells(f"A1:{last_col}1")
+    ws.merge_cells(f"A1:{lay.total_col}1")
     c = ws["A1"]
-    c.value = "FLUJO DE CAJA MENSUAL  –  AIRBNB"
-    c.fill  = fill(C_DARK)
-    c.font  = fnt(bold=True, color=C_WHITE, size=14)
-    c.alignment = aln()
+    c.value = titulo
+    style_cell(c, bg=C_DARK, fg=C_WHITE, bold=True, size=14, h="center", border=False)
     ws.row_dimensions[1].height = 38
 
     # ── Fila 2: "Mes N" / "TOTAL" ──
     ws.row_dimensions[2].height = 28
     c = ws["A2"]
     c.value = "Concepto"
-    c.fill  = fill(C_DARK)
-    c.font  = fnt(bold=True, color=C_WHITE, size=10)
-    c.alignment = aln(h="left")
-    c.border = border_thin()
-
-    start_date = datetime.date(2025, 1, 1)
+    style_cell(c, bg=C_DARK, fg=C_WHITE, bold=True, size=10, h="left")
 
-    for m in range(1, HORIZONTE + 1):
-        col = mc(m)
-        in_grace = m <= MESES_GRACIA
-        hdr_bg   = C_ACCENT if in_grace else C_BLUE
+    for m, col in zip(lay.meses, lay.cols):
+        hdr_bg = C_ACCENT if lay.en_gracia(m) else C_BLUE
 
         c2 = ws[f"{col}2"]
         c2.value = f"Mes {m}"
-        c2.fill  = fill(hdr_bg)
-        c2.font  = fnt(bold=True, color=C_WHITE, size=9)
-        c2.alignment = aln()
-        c2.border = border_thin()
+        style_cell(c2, bg=hdr_bg, fg=C_WHITE, bold=True, size=9, h="center")
 
     # Total col header
-    ct = ws[f"{TOTAL_COL}2"]
+    ct = ws[f"{lay.total_col}2"]
     ct.value = "TOTAL / FINAL"
-    ct.fill  = fill(C_INDIGO)
-    ct.font  = fnt(bold=True, color=C_WHITE, size=9)
-    ct.alignment = aln()
-    ct.border = border_thin()
+    style_cell(ct, bg=C_INDIGO, fg=C_WHITE, bold=True, size=9, h="center")
 
     # ── Fila 3: período (Ene 2025 …) ──
     ws.row_dimensions[3].height = 20
     c = ws["A3"]
     c.value = "Período"
-    c.fill  = fill("2C3E50")
-    c.font  = fnt(bold=True, color=C_WHITE, size=9)
-    c.alignment = aln(h="left")
-    c.border = border_thin()
-
-    for m in range(1, HORIZONTE + 1):
-        month_num = ((start_date.month + m - 2) % 12) + 1
-        year_num  = start_date.year + (start_date.month + m - 2) // 12
-        period    = datetime.date(year_num, month_num, 1).strftime("%b %Y")
-        c3 = ws[f"{mc(m)}3"]
-        c3.value = period
-        c3.fill  = fill("2C3E50")
-        c3.font  = fnt(color=C_WHITE, size=8)
-        c3.alignment = aln()
-        c3.border = border_thin()
-
-    ct3 = ws[f"{TOTAL_COL}3"]
-    ct3.value = "36 meses"
-    ct3.fill  = fill("2C3E50")
-    ct3.font  = fnt(color=C_WHITE, size=8)
-    ct3.alignment = aln()
-    ct3.border = border_thin()
-
-    # ── Secciones (filas sin datos) ──
-    section_rows = {
-        4:  ("INGRESOS",               C_BLUE),
-        10: ("EGRESOS FIJOS",          "7B241C"),
-        16: ("RESULTADO",              "1A5276"),
-    }
+    style_cell(c, bg="2C3E50", fg=C_WHITE, bold=True, size=9, h="left")
 
-    # ── Filas de datos ──
-    # (fila, label, es_total/bold, formato)
-    data_rows = [
-        (5,  "ADR  (CLP / noche)",              False, CLP),
-        (6,  "Noches del mes",                   False, "0"),
-        (7,  "Ingresos Brutos  (CLP)",           False, CLP),
-        (8,  "( - ) Comisión admin / Airbnb",    False, CLP),
-        (9,  "INGRESOS NETOS  (CLP)",            True,  CLP),
-        (11, "Gastos Comunes",                    False, CLP),
-        (12, "Servicios  (luz, agua, internet)", False, CLP),
-        (13, "Fondo de Mantención",              False, CLP),
-        (14, "Dividendo / Arriendo",             False, CLP),
-        (15, "TOTAL EGRESOS",                    True,  CLP),
-        (17, "FLUJO NETO MENSUAL  (CLP)",        True,  CLP),
-        (18, "FLUJO ACUMULADO  (CLP)",           True,  CLP),
-    ]
+    for m, col in zip(lay.meses, lay.cols):
+        c3 = ws[f"{col}3"]
+        c3.value = periodo(m)
+        style_cell(c3, bg="2C3E50", fg=C_WHITE, size=8, h="center")
+
+    ct3 = ws[f"{lay.total_col}3"]
+    ct3.value = f"{lay.horizonte} meses"
+    style_cell(ct3, bg="2C3E50", fg=C_WHITE, size=8, h="center")
 
     # Render secciones
-    for row_num, (titulo, color) in section_rows.items():
+    for row_num, (titulo, color) in FC_SECTION_ROWS.items():
         ws.row_dimensions[row_num].height = 22
-        ws.merge_cells(f"A{row_num}:{TOTAL_COL}{row_num}")
+        ws.merge_cells(f"A{row_num}:{ultima or lay.total_col}{row_num}")
         c = ws[f"A{row_num}"]
         c.value = titulo
-        c.fill  = fill(color)
-        c.font  = fnt(bold=True, color=C_WHITE, size=10)
-        c.alignment = aln(h="left")
+        style_cell(c, bg=color, fg=C_WHITE, bold=True, size=10, h="left", border=False)
+
+
+def build_flujo(wb, modelo=None, lay=None, compartidas=False, reales=None):
+    """
+    Si se entrega `modelo`, devuelve {celda: valor} para cachear en el xlsx.
+    `compartidas` escribe el modo formulas="compartidas" (ver fc_formula_compartida).
+    `reales` escribe ADR / Noches / Dividendo dados por mes como valores (en amarillo).
+    """
+    formula = fc_formula_compartida if compartidas else fc_formula
+    lay = lay or layout()
+    ws = wb.create_sheet("Flujo de Caja Mensual")
+    ws.sheet_view.showGridLines = False
+    _marco_flujo(ws, lay, "FLUJO DE CAJA MENSUAL  –  AIRBNB")
 
     # Render filas de datos
-    INCOME_ROWS  = {5, 6, 7, 8, 9}
-    RESULT_ROWS  = {9, 15, 17, 18}
+    cache = {}
 
-    for row_num, label, is_bold, num_fmt in data_rows:
+    for row_num, label, is_bold, num_fmt in FC_DATA_ROWS:
         ws.row_dimensions[row_num].height = 20
 
         # Etiqueta (col A)
@@ -320,83 +539,66 @@ def build_flujo(wb):
         style_cell(cA, bg=lbl_bg, bold=is_bold, h="left", num_fmt=None)
 
         # Columnas de meses
-        for m in range(1, HORIZONTE + 1):
-            col = mc(m)
+        for m, col in zip(lay.meses, lay.cols):
             cell = ws[f"{col}{row_num}"]
-            in_grace = m <= MESES_GRACIA
-
-            # Color de fondo
-            if in_grace and row_num in INCOME_ROWS:
-                bg = C_RED_L
-            elif row_num in RESULT_ROWS:
-                bg = C_GREEN_L if not in_grace else C_RED_L
-            elif row_num % 2 == 0:
-                bg = C_GRAY
-            else:
-                bg = C_WHITE
-
-            # Color de fuente
-            if row_num == 18:
-                fg = "1A5276"
-            elif row_num == 17:
-                fg = "145A32" if not in_grace else "7B241C"
-            elif row_num == 9:
-                fg = "145A32" if not in_grace else "7B241C"
-            else:
-                fg = C_DARK
-
+            bg, fg = fc_colores(row_num, m, lay)
+            real = fc_real(reales, row_num, m)
+            if real is not None:
+                bg = C_YELLOW
             style_cell(cell, bg=bg, fg=fg, bold=is_bold, size=9, num_fmt=num_fmt)
+            cell.value = formula(row_num, m) if real is None else real
 
-            # Formulas
-            year_idx = (m - 1) // 12
-
-            if row_num == 5:    # ADR con crecimiento
-                cell.value = (f"=IF({m}<={p('gracia')},0,"
-                              f"{p('adr')}*(1+{p('crec_adr')})^{year_idx})")
-            elif row_num == 6:  # Noches
-                cell.value = f"=IF({m}<={p('gracia')},0,{p('noches')})"
-            elif row_num == 7:  # Ingresos brutos
-                cell.value = f"={col}5*{col}6"
-            elif row_num == 8:  # Comisión
-                cell.value = f"={col}7*{p('comision')}"
-            elif row_num == 9:  # Ingresos netos
-                cell.value = f"={col}7-{col}8"
-            elif row_num == 11: # Gastos comunes
-                cell.value = f"={p('g_comunes')}"
-            elif row_num == 12: # Servicios
-                cell.value = f"={p('servicios')}"
-            elif row_num == 13: # Fondo
-                cell.value = f"={p('fondo')}"
-            elif row_num == 14: # Dividendo (0 durante gracia)
-                cell.value = f"=IF({m}<={p('gracia')},0,{p('dividendo')})"
-            elif row_num == 15: # Total egresos
-                cell.value = f"=SUM({col}11:{col}14)"
-            elif row_num == 17: # Flujo neto
-                cell.value = f"={col}9-{col}15"
-            elif row_num == 18: # Flujo acumulado
-                if m == 1:
-                    cell.value = f"=-{p('inversion')}+{col}17"
-                else:
-                    cell.value = f"={mc(m-1)}18+{col}17"
+            if modelo is not None:
+                cache[cell.coordinate] = modelo.filas[FC_KEY[row_num]][m - 1]
 
         # Columna TOTAL
-        tc = ws[f"{TOTAL_COL}{row_num}"]
+        tc = ws[f"{lay.total_col}{row_num}"]
         style_cell(tc, bg=C_BLUE_L, bold=True, num_fmt=num_fmt)
-        if row_num == 5:           # ADR promedio
-            tc.value = f"=AVERAGE({FIRST_COL}5:{LAST_COL}5)"
-        elif row_num == 18:        # Acumulado: último valor
-            tc.value = f"={LAST_COL}18"
-        else:                      # Suma de todos los meses
-            tc.value = f"=SUM({FIRST_COL}{row_num}:{LAST_COL}{row_num})"
+        tc.value = fc_total_formula(row_num, lay)
+
+        if modelo is not None:
+            cache[tc.coordinate] = modelo.totales[FC_KEY[row_num]]
+
+    # Filas helper del modo compartidas
+    if compartidas:
+        for row_num, label, valores in fc_helpers(lay):
+            ws.row_dimensions[row_num].height = 14
+            c = ws[f"A{row_num}"]
+            c.value = label
+            style_cell(c, bg=None, fg="AAAAAA", size=8, italic=True, h="left", border=False)
+            for col, v in zip(lay.cols, valores):
+                ws[f"{col}{row_num}"].value = v
+        if modelo is not None:
+            gracia = modelo.params["gracia"]
+            for m, col in zip(lay.meses, lay.cols):
+                cache[f"{col}{FC_HELPER_ROWS['gracia']}"] = bool(m <= gracia)
 
     # Inmovilizar: columna A + filas 1-3
     ws.freeze_panes = "B4"
 
+    return cache
+
 
 # ═════════════════════════════════════════════════════════════════════════════
 # HOJA 3 – RESUMEN EJECUTIVO
 # ═════════════════════════════════════════════════════════════════════════════
-def build_resumen(wb):
+# Descripción del objetivo de cada KPI de equilibrio.resolver
+EQUILIBRIO_KPI = {
+    "van":              lambda o: f"VAN = {o:,.0f}".replace(",", "."),
+    "tir_mensual":      lambda o: f"TIR mensual = {o:.2%}",
+    "tir_anual":        lambda o: f"TIR anual = {o:.1%}",
+    "flujo_acum_final": lambda o: f"flujo acum. final = {o:,.0f}".replace(",", "."),
+    "payback":          lambda o: f"recuperar en {o:g} meses",
+}
+
+
+def build_resumen(wb, modelo=None, lay=None, equilibrio=None):
+    """
+    Si se entrega `modelo`, devuelve {celda: valor} para cachear en el xlsx.
+    `equilibrio` ([(parametro, kpi, objetivo, valor)] de equilibrio.equilibrios)
+    agrega la sección PUNTO DE EQUILIBRIO con valores estáticos.
+    """
+    lay = lay or layout()
     ws = wb.create_sheet("Resumen")
     ws.sheet_view.showGridLines = False
 
@@ -408,86 +610,81 @@ def build_resumen(wb):
     ws.merge_cells("A1:B1")
     c = ws["A1"]
     c.value = "RESUMEN EJECUTIVO  –  FLUJO DE CAJA AIRBNB"
-    c.fill  = fill(C_DARK)
-    c.font  = fnt(bold=True, color=C_WHITE, size=14)
-    c.alignment = aln()
+    style_cell(c, bg=C_DARK, fg=C_WHITE, bold=True, size=14, h="center", border=False)
     ws.row_dimensions[1].height = 40
 
     tasa_mensual = f"(1+{p('tasa')})^(1/12)-1"
 
-    # ── Rangos del FC ──
-    fn_range   = f"{FC_SHEET}!{FIRST_COL}17:{LAST_COL}17"  # Flujo neto 36 meses
-    acum_final = f"{FC_SHEET}!{LAST_COL}18"                 # Último acumulado
-
-    # IRR helper: fila 50 col A (t=0) + cols B..AK (t=1..36)
-    irr_range  = f"A50:{get_column_letter(HORIZONTE + 1)}50"   # A50:AK50
-
     kpis = [
         ("PARÁMETROS CLAVE", [
-            ("Inversión inicial (amoblado)",          f"={p('inversion')}",   CLP),
-            ("Horizonte de análisis",                 f"={p('horizonte')}",   "0\" meses\""),
-            ("Meses de gracia (sin ingresos)",        f"={p('gracia')}",      "0"),
-            ("ADR inicial (CLP / noche)",             f"={p('adr')}",         CLP),
-            ("Noches promedio / mes",                 f"={p('noches')}",      "0"),
-            ("Crecimiento anual ADR",                 f"={p('crec_adr')}",    PCT),
-            ("Comisión admin / Airbnb",               f"={p('comision')}",    PCT),
+            ("Inversión inicial (amoblado)",          f"={p('inversion')}",   CLP,   "inversion"),
+            ("Horizonte de análisis",                 f"={p('horizonte')}",   "0\" meses\"", "horizonte"),
+            ("Meses de gracia (sin ingresos)",        f"={p('gracia')}",      "0",   "gracia"),
+            ("ADR inicial (CLP / noche)",             f"={p('adr')}",         CLP,   "adr"),
+            ("Noches promedio / mes",                 f"={p('noches')}",      "0",   "noches"),
+            ("Crecimiento anual ADR",                 f"={p('crec_adr')}",    PCT,   "crec_adr"),
+            ("Comisión admin / Airbnb",               f"={p('comision')}",    PCT,   "comision"),
         ]),
         ("INGRESOS ESPERADOS (mensual, sin gracia)", [
             ("Ingreso bruto mensual",
-             f"={p('adr')}*{p('noches')}", CLP),
+             f"={p('adr')}*{p('noches')}", CLP, "ing_bruto_mes"),
             ("Comisión mensual",
-             f"={p('adr')}*{p('noches')}*{p('comision')}", CLP),
+             f"={p('adr')}*{p('noches')}*{p('comision')}", CLP, "comision_mes"),
             ("Ingreso neto mensual",
-             f"={p('adr')}*{p('noches')}*(1-{p('comision')})", CLP),
+             f"={p('adr')}*{p('noches')}*(1-{p('comision')})", CLP, "ing_neto_mes"),
         ]),
         ("EGRESOS FIJOS MENSUALES", [
-            ("Gastos comunes",                f"={p('g_comunes')}",  CLP),
-            ("Servicios (luz, agua, internet)",f"={p('servicios')}", CLP),
-            ("Fondo de mantención",           f"={p('fondo')}",      CLP),
-            ("Dividendo / arriendo",          f"={p('dividendo')}",   CLP),
+            ("Gastos comunes",                f"={p('g_comunes')}",  CLP, "g_comunes"),
+            ("Servicios (luz, agua, internet)",f"={p('servicios')}", CLP, "servicios"),
+            ("Fondo de mantención",           f"={p('fondo')}",      CLP, "fondo"),
+            ("Dividendo / arriendo",          f"={p('dividendo')}",   CLP, "dividendo"),
             ("Total egresos fijos / mes",
              f"={p('g_comunes')}+{p('servicios')}+{p('fondo')}+{p('dividendo')}",
-             CLP),
+             CLP, "egresos_mes"),
             ("Margen neto mensual esperado",
              f"={p('adr')}*{p('noches')}*(1-{p('comision')})"
              f"-({p('g_comunes')}+{p('servicios')}+{p('fondo')}+{p('dividendo')})",
-             CLP),
+             CLP, "margen_mes"),
         ]),
-        ("TOTALES  (36 meses)", [
-            ("Ingresos netos totales",    f"={FC_SHEET}!{TOTAL_COL}9",  CLP),
-            ("Total egresos",             f"={FC_SHEET}!{TOTAL_COL}15", CLP),
-            ("Flujo neto total",          f"={FC_SHEET}!{TOTAL_COL}17", CLP),
-            ("Flujo acumulado final",     acum_final,                   CLP),
+        (f"TOTALES  ({lay.horizonte} meses)", [
+            ("Ingresos netos totales",    f"={FC_SHEET}!{lay.total_col}9",  CLP, "ing_netos_total"),
+            ("Total egresos",             f"={FC_SHEET}!{lay.total_col}15", CLP, "egresos_total"),
+            ("Flujo neto total",          f"={FC_SHEET}!{lay.total_col}17", CLP, "flujo_neto_total"),
+            ("Flujo acumulado final",     f"={lay.acum_final}",         CLP, "flujo_acum_final"),
         ]),
         ("INDICADORES FINANCIEROS", [
-            ("Tasa de descuento anual",   f"={p('tasa')}",         PCT),
-            ("Tasa de descuento mensual", f"={tasa_mensual}",       PCT3),
+            ("Tasa de descuento anual",   f"={p('tasa')}",         PCT,  "tasa"),
+            ("Tasa de descuento mensual", f"={tasa_mensual}",       PCT3, "tasa_mensual"),
             ("VAN  (Valor Actual Neto)",
-             f"=NPV({tasa_mensual},{fn_range})-{p('inversion')}",   CLP),
+             f"=NPV({tasa_mensual},{lay.fn_range})-{p('inversion')}",   CLP,  "van"),
             ("TIR mensual",
-             f"=IFERROR(IRR({irr_range}),\"N/D\")",                 "0.00%"),
+             f"=IFERROR(IRR({lay.irr_range}),\"N/D\")",                 "0.00%", "tir_mensual"),
             ("TIR anual equiv.",
-             f"=IFERROR((1+IRR({irr_range}))^12-1,\"N/D\")",        PCT),
+             f"=IFERROR((1+IRR({lay.irr_range}))^12-1,\"N/D\")",        PCT,  "tir_anual"),
             ("Payback (meses aprox.)",
-             f"=IFERROR(IF(COUNTIF({FC_SHEET}!{FIRST_COL}18:{LAST_COL}18,\"<0\")={HORIZONTE},"
+             f"=IFERROR(IF(COUNTIF({lay.acum_range},\"<0\")={lay.horizonte},"
              f"\"No recuperado en el horizonte\","
-             f"COUNTIF({FC_SHEET}!{FIRST_COL}18:{LAST_COL}18,\"<0\")&\" meses\"),\"N/D\")",
-             "@"),
+             f"COUNTIF({lay.acum_range},\"<0\")&\" meses\"),\"N/D\")",
+             "@", "payback"),
         ]),
     ]
 
-    row = 3
-    for titulo, items in kpis:
+    valores = modelo.resumen() if modelo is not None else None
+    cache   = {}
+
+    def seccion(row, titulo):
         ws.row_dimensions[row].height = 22
         ws.merge_cells(f"A{row}:B{row}")
         c = ws[f"A{row}"]
         c.value = titulo
-        c.fill  = fill(C_BLUE)
-        c.font  = fnt(bold=True, color=C_WHITE, size=10)
-        c.alignment = aln(h="left")
+        style_cell(c, bg=C_BLUE, fg=C_WHITE, bold=True, size=10, h="left", border=False)
+
+    row = 3
+    for titulo, items in kpis:
+        seccion(row, titulo)
         row += 1
 
-        for label, formula, num_fmt in items:
+        for label, formula, num_fmt, key in items:
             ws.row_dimensions[row].height = 20
             bg = C_GRAY if row % 2 == 0 else C_WHITE
 
@@ -497,41 +694,55 @@ def build_resumen(wb):
 
             cB = ws[f"B{row}"]
             cB.value = formula
-            cB.fill  = fill(bg)
-            cB.font  = fnt(bold=True, color=C_DARK, size=11)
-            cB.alignment = aln(h="right")
-            cB.border = border_thin()
+            style_cell(cB, bg=bg, fg=C_DARK, bold=True, size=11, h="right")
             if num_fmt and num_fmt != "@":
                 cB.number_format = num_fmt
+            if valores is not None:
+                cache[cB.coordinate] = valores[key]
             row += 1
 
         row += 1   # espacio entre secciones
 
-    # ── Fila 50: helper para IRR [-Inv, FN_1 .. FN_36] ──
-    # t=0 → col A; t=1..36 → cols B..AK
-    ws.row_dimensions[50].height = 14
-    lbl = ws["A50"]
+    # ── Punto de equilibrio (goal seek, valores estáticos) ──
+    if equilibrio:
+        if row + len(equilibrio) + 4 >= IRR_ROW:
+            raise ValueError(f"Resumen admite hasta {IRR_ROW - row - 5} puntos de equilibrio")
+        seccion(row, "PUNTO DE EQUILIBRIO  (no se recalcula)")
+        row += 1
+        for parametro, kpi, objetivo, valor in equilibrio:
+            ws.row_dimensions[row].height = 30
+            bg = C_GRAY if row % 2 == 0 else C_WHITE
+            label, fmt = PARAM_INFO[parametro]
+
+            cA = ws[f"A{row}"]
+            cA.value = f"{label}  para  {EQUILIBRIO_KPI[kpi](objetivo)}"
+            style_cell(cA, bg=bg, h="left", wrap=True)
+
+            cB = ws[f"B{row}"]
+            if valor != valor:                                   # NaN
+                cB.value = SIN_SOLUCION
+                style_cell(cB, bg=C_RED_L, fg=C_DARK, bold=True, size=9, h="right")
+            else:
+                cB.value = float(valor)
+                style_cell(cB, bg=bg, fg=C_BLUE, bold=True, size=11, h="right",
+                           num_fmt=fmt or ("0" if float(valor).is_integer() else "0.00"))
+            row += 1
+        row += 1
+
+    # ── Fila helper para IRR [-Inv, FN_1 .. FN_H] ──
+    # t=0 → col B; t=1..H → cols C..
+    ws.row_dimensions[IRR_ROW].height = 14
+    lbl = ws[f"A{IRR_ROW}"]
     lbl.value = "Helper TIR →"
-    lbl.font  = fnt(italic=True, color="AAAAAA", size=8)
-    lbl.alignment = aln(h="left")
-
-    ws["B50"].value = f"=-{p('inversion')}"          # t = 0
-    for m in range(1, HORIZONTE + 1):
-        col_helper = get_column_letter(m + 2)         # t=1→C, t=36→AL
-        fc_m_col   = mc(m)                            # FC sheet col for month m
-        ws[f"{col_helper}50"].value = f"={FC_SHEET}!{fc_m_col}17"
-
-    # Actualizar irr_range para incluir t=0 en col B y t=36 en col AL
-    # B50 = t=0 (-inv), C50..AL50 = t=1..t=36  → range B50:AL50 (37 celdas)
-    irr_range_real = f"B50:{get_column_letter(HORIZONTE + 2)}50"   # B50:AL50
-
-    # Corregir las fórmulas TIR que usan irr_range
-    # Buscar y actualizar las celdas de TIR en la hoja
-    for r in range(1, 50):
-        for col_idx in [2]:  # col B
-            cell = ws.cell(row=r, column=col_idx)
-            if cell.value and isinstance(cell.value, str) and irr_range in cell.value:
-                cell.value = cell.value.replace(irr_range, irr_range_real)
+    style_cell(lbl, bg=None, fg="AAAAAA", size=8, italic=True, h="left", border=False)
+
+    ws[f"{lay.irr_cols[0]}{IRR_ROW}"].value = f"=-{p('inversion')}"      # t = 0
+    for col_helper, fc_m_col in zip(lay.irr_cols[1:], lay.cols):        # t = 1..H
+        ws[f"{col_helper}{IRR_ROW}"].value = f"={FC_SHEET}!{fc_m_col}17"
+
+    if modelo is not None:
+        for col_helper, flujo in zip(lay.irr_cols, modelo.flujos_tir):
+            cache[f"{col_helper}{IRR_ROW}"] = flujo
 
     # Nota al pie
     row += 2
@@ -539,26 +750,878 @@ def build_resumen(wb):
     ws.merge_cells(f"A{row}:B{row}")
     c = ws[f"A{row}"]
     c.value = ("Nota: VAN > 0 indica que el proyecto supera la rentabilidad mínima exigida. "
-               "TIR se calcula con la inversión inicial en t=0 y flujos netos mensuales t=1..36.")
-    c.font  = fnt(italic=True, color="888888", size=9)
-    c.alignment = aln(h="left", wrap=True)
+               f"TIR se calcula con la inversión inicial en t=0 y flujos netos mensuales t=1..{lay.horizonte}.")
+    style_cell(c, bg=None, fg="888888", size=9, italic=True, h="left", wrap=True, border=False)
+
+    return cache
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# HOJA 4 – RIESGO  (Monte Carlo, valores estáticos)
+# ═════════════════════════════════════════════════════════════════════════════
+def build_riesgo(wb, res):
+    """`res` es el resultado de riesgo.simular()."""
+    ws = wb.create_sheet("Riesgo")
+    ws.sheet_view.showGridLines = False
+
+    ws.column_dimensions["A"].width = 38
+    for col in "BCDE":
+        ws.column_dimensions[col].width = 18
+
+    ws.merge_cells("A1:E1")
+    c = ws["A1"]
+    c.value = "ANÁLISIS DE RIESGO  –  MONTE CARLO"
+    style_cell(c, bg=C_DARK, fg=C_WHITE, bold=True, size=14, h="center", border=False)
+    ws.row_dimensions[1].height = 40
+
+    def seccion(row, titulo):
+        ws.row_dimensions[row].height = 22
+        ws.merge_cells(f"A{row}:E{row}")
+        c = ws[f"A{row}"]
+        c.value = titulo
+        style_cell(c, bg=C_BLUE, fg=C_WHITE, bold=True, size=10, h="left", border=False)
+
+    # ── Supuestos ──
+    row = 3
+    seccion(row, f"SUPUESTOS  ({res['n']:,} escenarios)".replace(",", "."))
+    row += 1
+    for key, dist in res["distribuciones"].items():
+        bg = C_GRAY if row % 2 == 0 else C_WHITE
+        cA = ws[f"A{row}"]
+        cA.value = key
+        style_cell(cA, bg=bg, h="left")
+        tipo, *args = dist if isinstance(dist, (tuple, list)) else ("fijo", dist)
+        for i, v in enumerate([tipo, *args]):
+            cell = ws.cell(row=row, column=i + 2, value=v)
+            style_cell(cell, bg=bg)
+        row += 1
+
+    # ── Percentiles ──
+    row += 1
+    seccion(row, "RESULTADOS")
+    row += 1
+    for i, h in enumerate(["Indicador", "P5", "P50", "P95", "Media"]):
+        cell = ws.cell(row=row, column=i + 1, value=h)
+        style_cell(cell, bg=C_DARK, fg=C_WHITE, bold=True, h="left" if i == 0 else "center")
+    row += 1
+
+    filas = [
+        ("VAN  (CLP)",             "van",              CLP),
+        ("TIR anual equiv.",       "tir_anual",        PCT),
+        ("Flujo acumulado final",  "flujo_acum_final", CLP),
+        ("Payback (meses)",        "payback",          "0"),
+    ]
+    for label, key, num_fmt in filas:
+        bg = C_GRAY if row % 2 == 0 else C_WHITE
+        cA = ws[f"A{row}"]
+        cA.value = label
+        style_cell(cA, bg=bg, h="left", bold=True)
+        valores = [res["percentiles"][key][q] for q in (5, 50, 95)] + [res["media"][key]]
+        for i, v in enumerate(valores):
+            if key == "payback" and i < 3 and v >= res["horizonte"]:
+                v = "No recuperado"
+            cell = ws.cell(row=row, column=i + 2, value=v)
+            style_cell(cell, bg=bg, num_fmt=num_fmt)
+        row += 1
+
+    # ── Probabilidades ──
+    row += 1
+    seccion(row, "PROBABILIDADES")
+    row += 1
+    for label, key in [("P(VAN < 0)",                     "prob_van_negativo"),
+                       ("P(no recuperado en horizonte)",  "prob_no_recuperado"),
+                       ("P(TIR no calculable – N/D)",     "prob_tir_nd")]:
+        bg = C_GRAY if row % 2 == 0 else C_WHITE
+        cA = ws[f"A{row}"]
+        cA.value = label
+        style_cell(cA, bg=bg, h="left")
+        cB = ws[f"B{row}"]
+        cB.value = res[key]
+        style_cell(cB, bg=C_RED_L if key == "prob_van_negativo" and res[key] > 0.05 else bg,
+                   bold=True, num_fmt=PCT)
+        row += 1
+
+    row += 1
+    ws.merge_cells(f"A{row}:E{row}")
+    c = ws[f"A{row}"]
+    c.value = ("Valores estáticos generados por simulación; no se recalculan al editar "
+               "Parámetros. Percentiles aproximados por histograma.")
+    style_cell(c, bg=None, fg="888888", size=9, italic=True, h="left", wrap=True, border=False)
+    ws.row_dimensions[row].height = 30
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# HOJA 5 – SENSIBILIDAD  (grillas 2-D y tornado, valores estáticos)
+# ═════════════════════════════════════════════════════════════════════════════
+def build_sensibilidad(wb, res):
+    """`res` es el resultado de sensibilidad.analizar()."""
+    ws = wb.create_sheet("Sensibilidad")
+    ws.sheet_view.showGridLines = False
+
+    ancho = max([6] + [len(g["valores_y"]) + 1 for g in res["grillas"]])
+    ultima = get_column_letter(ancho)
+    ws.column_dimensions["A"].width = 34
+    for i in range(2, ancho + 1):
+        ws.column_dimensions[get_column_letter(i)].width = 13
+
+    ws.merge_cells(f"A1:{ultima}1")
+    c = ws["A1"]
+    c.value = "ANÁLISIS DE SENSIBILIDAD  –  VAN / TIR"
+    style_cell(c, bg=C_DARK, fg=C_WHITE, bold=True, size=14, h="center", border=False)
+    ws.row_dimensions[1].height = 40
+
+    def seccion(row, titulo):
+        ws.row_dimensions[row].height = 22
+        ws.merge_cells(f"A{row}:{ultima}{row}")
+        c = ws[f"A{row}"]
+        c.value = titulo
+        style_cell(c, bg=C_BLUE, fg=C_WHITE, bold=True, size=10, h="left", border=False)
+
+    def fmt_de(key):
+        return PARAM_INFO[key][1] or "0.##"
+
+    row = 3
+
+    # ── Grillas: x en filas, y en columnas ──
+    for g in res["grillas"]:
+        x, y = g["x"], g["y"]
+        for kpi, titulo, num_fmt in [("van",       "VAN (CLP)",        CLP),
+                                     ("tir_anual", "TIR anual equiv.", PCT)]:
+            seccion(row, f"{titulo}  –  {PARAM_INFO[x][0]}  ×  {PARAM_INFO[y][0]}")
+            row += 1
+
+            cell = ws.cell(row=row, column=1, value=f"{x} ↓   {y} →")
+            style_cell(cell, bg=C_DARK, fg=C_WHITE, bold=True, h="left")
+            for j, vy in enumerate(g["valores_y"]):
+                cell = ws.cell(row=row, column=j + 2, value=vy)
+                style_cell(cell, bg=C_DARK, fg=C_WHITE, bold=True, size=9, h="center",
+                           num_fmt=fmt_de(y))
+            row += 1
+
+            for i, vx in enumerate(g["valores_x"]):
+                cell = ws.cell(row=row, column=1, value=vx)
+                style_cell(cell, bg=C_BLUE_L, bold=True, h="center", num_fmt=fmt_de(x))
+                for j, vy in enumerate(g["valores_y"]):
+                    v = g[kpi][i][j]
+                    es_base = [i, j] == g["base"]
+                    # Color según el VAN de la celda (VAN ≥ 0 ⇔ TIR ≥ tasa)
+                    bg = C_GREEN_L if g["van"][i][j] >= 0 else C_RED_L
+                    if v != v:                                   # TIR NaN → N/D
+                        cell = ws.cell(row=row, column=j + 2, value="N/D")
+                        style_cell(cell, bg=C_GRAY, size=9, h="center", bold=es_base)
+                    else:
+                        cell = ws.cell(row=row, column=j + 2, value=v)
+                        style_cell(cell, bg=bg, size=9, num_fmt=num_fmt, bold=es_base)
+                row += 1
+            row += 1
+
+    # ── Tornado: rango de VAN por parámetro ──
+    pct = f"{res['delta_tornado']:.0%}"
+    seccion(row, f"TORNADO  –  VAN ante ±{pct} en cada parámetro (VAN base "
+                 f"{res['van_base']:,.0f})".replace(",", "."))
+    row += 1
+    for i, h in enumerate(["Parámetro", "Bajo", "Alto", "VAN bajo", "VAN alto", "Rango VAN"]):
+        cell = ws.cell(row=row, column=i + 1, value=h)
+        style_cell(cell, bg=C_DARK, fg=C_WHITE, bold=True, h="left" if i == 0 else "center")
+    row += 1
+
+    for f in res["tornado"]:
+        bg = C_GRAY if row % 2 == 0 else C_WHITE
+        label, fmt = PARAM_INFO[f["parametro"]]
+        cell = ws.cell(row=row, column=1, value=label)
+        style_cell(cell, bg=bg, h="left", bold=True)
+        for col, v in [(2, f["bajo"]), (3, f["alto"])]:
+            cell = ws.cell(row=row, column=col, value=v)
+            style_cell(cell, bg=bg, num_fmt=fmt or "0.##")
+        for col, v in [(4, f["van_bajo"]), (5, f["van_alto"])]:
+            cell = ws.cell(row=row, column=col, value=v)
+            style_cell(cell, bg=C_GREEN_L if v >= 0 else C_RED_L, num_fmt=CLP)
+        cell = ws.cell(row=row, column=6, value=abs(f["van_alto"] - f["van_bajo"]))
+        style_cell(cell, bg=bg, bold=True, num_fmt=CLP)
+        row += 1
+
+    row += 1
+    ws.merge_cells(f"A{row}:{ultima}{row}")
+    c = ws[f"A{row}"]
+    c.value = ("Valores estáticos; no se recalculan al editar Parámetros. Verde: VAN ≥ 0 "
+               "(TIR ≥ tasa de descuento); rojo: VAN < 0. En negrita, el caso base.")
+    style_cell(c, bg=None, fg="888888", size=9, italic=True, h="left", wrap=True, border=False)
+    ws.row_dimensions[row].height = 30
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# HOJA 6 – CONSOLIDADO  (portafolio, valores estáticos)
+# ═════════════════════════════════════════════════════════════════════════════
+CONSOLIDADO_KPI_ROWS = [
+    (21, "VAN  (CLP)",                     CLP,  "van"),
+    (22, "TIR anual equiv.",               PCT,  "tir_anual"),
+    (23, "Payback (meses con acum. < 0)",  "0",  "payback_meses"),
+]
+
+
+def build_consolidado(wb, cons, top_k=10):
+    """
+    `cons` es un consolidado.Consolidado. Mismo layout que build_flujo con los
+    valores sumados; a la derecha de TOTAL, una columna por propiedad top-K
+    (totales del horizonte) y 'Otros' con el resto. Devuelve el cache de TOTAL.
+    """
+    lay     = layout(cons.horizonte, cons.params["gracia"])
+    detalle = cons.detalle(top_k)
+    col0    = lay.horizonte + 4                  # TOTAL + una columna separadora
+    ultima  = get_column_letter(col0 + len(detalle) - 1) if detalle else None
+
+    ws = wb.create_sheet("Consolidado")
+    ws.sheet_view.showGridLines = False
+    _marco_flujo(ws, lay, f"FLUJO DE CAJA CONSOLIDADO  –  {cons.n} PROPIEDADES", ultima)
+
+    # ── Encabezados del detalle ──
+    flujo_total = float(cons.totales["flujo_neto"])
+    if detalle:
+        ws.column_dimensions[get_column_letter(col0 - 1)].width = 2
+        ws.merge_cells(start_row=1, start_column=col0, end_row=1, end_column=col0 + len(detalle) - 1)
+        c = ws.cell(row=1, column=col0, value=f"DETALLE  (top {min(top_k, cons.n)} por |flujo neto|)")
+        style_cell(c, bg=C_INDIGO, fg=C_WHITE, bold=True, size=10, h="center", border=False)
+    for j, (nombre, valores) in enumerate(detalle):
+        col = col0 + j
+        ws.column_dimensions[get_column_letter(col)].width = 15
+        c = ws.cell(row=2, column=col, value=nombre)
+        style_cell(c, bg=C_INDIGO, fg=C_WHITE, bold=True, size=9, h="center", wrap=True)
+        c = ws.cell(row=3, column=col,
+                    value=valores["flujo_neto"] / flujo_total if flujo_total else 0.0)
+        style_cell(c, bg="2C3E50", fg=C_WHITE, size=8, h="center", num_fmt=PCT)
+
+    # ── Filas de datos ──
+    cache = {}
+    for row_num, label, is_bold, num_fmt in FC_DATA_ROWS:
+        ws.row_dimensions[row_num].height = 20
+        key = FC_KEY[row_num]
+
+        cA = ws[f"A{row_num}"]
+        cA.value = "ADR medio ponderado  (CLP / noche)" if row_num == 5 else label
+        style_cell(cA, bg=C_BLUE_L if is_bold else C_WHITE, bold=is_bold, h="left")
+
+        for m, col, v in zip(lay.meses, lay.cols, cons.filas[key].tolist()):
+            cell = ws[f"{col}{row_num}"]
+            bg, fg = fc_colores(row_num, m, lay)
+            style_cell(cell, bg=bg, fg=fg, bold=is_bold, size=9, num_fmt=num_fmt)
+            cell.value = v
+
+        tc = ws[f"{lay.total_col}{row_num}"]
+        style_cell(tc, bg=C_BLUE_L, bold=True, num_fmt=num_fmt)
+        tc.value = fc_total_formula(row_num, lay)
+        cache[tc.coordinate] = float(cons.totales[key])
+
+        for j, (_, valores) in enumerate(detalle):
+            cell = ws.cell(row=row_num, column=col0 + j, value=float(valores[key]))
+            style_cell(cell, bg=C_GREEN_L if row_num in RESULT_ROWS else C_WHITE,
+                       bold=is_bold, size=9, num_fmt=num_fmt)
+
+    # ── Indicadores: portafolio en TOTAL, cada propiedad en su columna ──
+    ws.row_dimensions[20].height = 22
+    ws.merge_cells(f"A20:{ultima or lay.total_col}20")
+    c = ws["A20"]
+    c.value = "INDICADORES  (flujo combinado en TOTAL)"
+    style_cell(c, bg="1A5276", fg=C_WHITE, bold=True, size=10, h="left", border=False)
+
+    portafolio = {"van": cons.van, "tir_anual": cons.tir_anual,
+                  "payback_meses": cons.payback_meses}
+    for row_num, label, num_fmt, key in CONSOLIDADO_KPI_ROWS:
+        ws.row_dimensions[row_num].height = 20
+        cA = ws[f"A{row_num}"]
+        cA.value = label
+        style_cell(cA, bg=C_BLUE_L, bold=True, h="left")
+        celdas = [(ws[f"{lay.total_col}{row_num}"], portafolio[key], True)]
+        celdas += [(ws.cell(row=row_num, column=col0 + j), valores[key], False)
+                   for j, (_, valores) in enumerate(detalle)]
+        for cell, v, es_total in celdas:
+            if v is None:
+                style_cell(cell, bg=C_GRAY, size=9)
+            elif v != v:                                         # TIR NaN → N/D
+                cell.value = "N/D"
+                style_cell(cell, bg=C_GRAY, size=9, h="center", bold=es_total)
+            else:
+                cell.value = float(v)
+                style_cell(cell, bg=C_BLUE_L if es_total else C_WHITE, bold=es_total,
+                           size=10 if es_total else 9, num_fmt=num_fmt)
+
+    ws.freeze_panes = "B4"
+    return cache
+
+
+def build_resumen_consolidado(wb, cons):
+    """KPIs del portafolio sobre el flujo combinado (valores estáticos)."""
+    ws = wb.create_sheet("Resumen Consolidado")
+    ws.sheet_view.showGridLines = False
+
+    ws.column_dimensions["A"].width = 38
+    ws.column_dimensions["B"].width = 24
+
+    ws.merge_cells("A1:B1")
+    c = ws["A1"]
+    c.value = "RESUMEN  –  PORTAFOLIO CONSOLIDADO"
+    style_cell(c, bg=C_DARK, fg=C_WHITE, bold=True, size=14, h="center", border=False)
+    ws.row_dimensions[1].height = 40
+
+    valores = cons.resumen()
+    kpis = [
+        ("PORTAFOLIO", [
+            ("Propiedades",                    "0",             "propiedades"),
+            ("Horizonte (el mayor)",           "0\" meses\"",  "horizonte"),
+            ("Inversión inicial total",        CLP,             "inversion"),
+        ]),
+        (f"TOTALES  ({cons.horizonte} meses)", [
+            ("Ingresos netos totales",         CLP,             "ing_netos_total"),
+            ("Total egresos",                  CLP,             "egresos_total"),
+            ("Flujo neto total",               CLP,             "flujo_neto_total"),
+            ("Flujo acumulado final",          CLP,             "flujo_acum_final"),
+        ]),
+        ("INDICADORES FINANCIEROS  (flujo combinado)", [
+            ("Tasa de descuento anual",        PCT,             "tasa"),
+            ("Tasa de descuento mensual",      PCT3,            "tasa_mensual"),
+            ("VAN  (Valor Actual Neto)",       CLP,             "van"),
+            ("Suma de VAN por propiedad",      CLP,             "van_suma"),
+            ("TIR mensual",                    "0.00%",         "tir_mensual"),
+            ("TIR anual equiv.",               PCT,             "tir_anual"),
+            ("Payback (meses aprox.)",         "@",             "payback"),
+        ]),
+    ]
+
+    row = 3
+    for titulo, items in kpis:
+        ws.row_dimensions[row].height = 22
+        ws.merge_cells(f"A{row}:B{row}")
+        c = ws[f"A{row}"]
+        c.value = titulo
+        style_cell(c, bg=C_BLUE, fg=C_WHITE, bold=True, size=10, h="left", border=False)
+        row += 1
+
+        for label, num_fmt, key in items:
+            ws.row_dimensions[row].height = 20
+            bg = C_GRAY if row % 2 == 0 else C_WHITE
+
+            cA = ws[f"A{row}"]
+            cA.value = label
+            style_cell(cA, bg=bg, h="left")
+
+            cB = ws[f"B{row}"]
+            cB.value = valores[key]
+            style_cell(cB, bg=bg, fg=C_DARK, bold=True, size=11, h="right",
+                       num_fmt=None if num_fmt == "@" else num_fmt)
+            row += 1
+        row += 1
+
+    ws.row_dimensions[row].height = 48
+    ws.merge_cells(f"A{row}:B{row}")
+    c = ws[f"A{row}"]
+    c.value = ("Nota: valores estáticos calculados al consolidar. VAN, TIR y payback usan el "
+               "flujo combinado (inversión total en t=0); la suma de VAN por propiedad usa la "
+               "tasa de cada una.")
+    style_cell(c, bg=None, fg="888888", size=9, italic=True, h="left", wrap=True, border=False)
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# HOJA 7 – REAL VS PROYECTADO  (conciliacion.py)
+# ═════════════════════════════════════════════════════════════════════════════
+# (clave FC, etiqueta, es_ingreso): Δ a favor = real - proyectado en ingresos,
+# proyectado - real en egresos
+REAL_VS_PROY = [
+    ("ing_netos",  "Ingresos netos",        True),
+    ("g_comunes",  "Gastos comunes",        False),
+    ("servicios",  "Servicios",             False),
+    ("fondo",      "Fondo de mantención",   False),
+    ("dividendo",  "Dividendo / arriendo",  False),
+    ("flujo_neto", "Flujo neto",            True),
+]
+DELTA = '#,##0;[Red]-#,##0'
+
+
+def build_real_vs_proyectado(wb, conc, modelo=None, lay=None):
+    """
+    Real (conciliacion.Conciliacion) contra la proyección de build_flujo, un
+    mes por fila. Proyectado y Δ son fórmulas sobre el Flujo de Caja; si se
+    entrega `modelo`, devuelve {celda: valor} para cachear.
+    """
+    lay = lay or layout()
+    ws = wb.create_sheet("Real vs Proyectado")
+    ws.sheet_view.showGridLines = False
+
+    meses = conc.meses_modelo(lay.horizonte)
+    bloques = [(key, label, ingreso, 3 + 3 * i) for i, (key, label, ingreso)
+               in enumerate(REAL_VS_PROY)]
+    col_sin = 3 + 3 * len(REAL_VS_PROY)
+    ultima  = get_column_letter(col_sin + 1)
+
+    ws.column_dimensions["A"].width = 12
+    ws.column_dimensions["B"].width = 7
+    for c in range(3, col_sin + 2):
+        ws.column_dimensions[get_column_letter(c)].width = 13
+
+    ws.merge_cells(f"A1:{ultima}1")
+    c = ws["A1"]
+    c.value = "REAL VS PROYECTADO  –  CONCILIACIÓN BANCARIA"
+    style_cell(c, bg=C_DARK, fg=C_WHITE, bold=True, size=14, h="center", border=False)
+    ws.row_dimensions[1].height = 38
+
+    # ── Encabezados (filas 3-4) ──
+    for col, texto in [(1, "Período"), (2, "Mes"), (col_sin, "Sin clasificar"),
+                       (col_sin + 1, "Movimientos")]:
+        letra = get_column_letter(col)
+        ws.merge_cells(f"{letra}3:{letra}4")
+        cell = ws.cell(row=3, column=col, value=texto)
+        style_cell(cell, bg=C_DARK, fg=C_WHITE, bold=True, size=9, wrap=True)
+    for key, label, _, c0 in bloques:
+        ws.merge_cells(f"{get_column_letter(c0)}3:{get_column_letter(c0 + 2)}3")
+        cell = ws.cell(row=3, column=c0, value=label)
+        style_cell(cell, bg=C_INDIGO if key == "flujo_neto" else C_BLUE, fg=C_WHITE,
+                   bold=True, size=9)
+        for i, texto in enumerate(("Real", "Proyectado", "Δ a favor")):
+            cell = ws.cell(row=4, column=c0 + i, value=texto)
+            style_cell(cell, bg="2C3E50", fg=C_WHITE, bold=True, size=8)
+    ws.row_dimensions[3].height = 22
+    ws.row_dimensions[4].height = 18
+
+    cache = {}
+    suma  = {}                                  # columna → total, para cachear TOTAL
+    row = 5
+    for m, j in meses:
+        bg = C_GRAY if row % 2 == 0 else C_WHITE
+        style_cell(ws.cell(row=row, column=1, value=periodo(m)), bg=bg, size=9, h="left")
+        style_cell(ws.cell(row=row, column=2, value=m), bg=bg, size=9)
+
+        valores = {}
+        for key, _, ingreso, c0 in bloques:
+            real, proy, delta = (get_column_letter(c0 + i) for i in range(3))
+            if key == "flujo_neto":
+                egresos = "+".join(f"{get_column_letter(c)}{row}"
+                                   for _, _, es_ing, c in bloques[:-1] if not es_ing)
+                ws[f"{real}{row}"].value = f"={get_column_letter(bloques[0][3])}{row}-({egresos})"
+                v_real = float(conc.flujo_neto[j])
+            else:
+                v_real = float(conc.fila(key)[j])
+                ws[f"{real}{row}"].value = v_real
+            ws[f"{proy}{row}"].value  = f"={FC_SHEET}!{mc(m)}{FC[key]}"
+            ws[f"{delta}{row}"].value = (f"={real}{row}-{proy}{row}" if ingreso
+                                         else f"={proy}{row}-{real}{row}")
+            style_cell(ws[f"{real}{row}"], bg=bg, size=9, num_fmt=CLP)
+            style_cell(ws[f"{proy}{row}"], bg=bg, size=9, num_fmt=CLP)
+            style_cell(ws[f"{delta}{row}"], bg=bg, bold=True, size=9, num_fmt=DELTA)
+
+            if modelo is not None:
+                v_proy = float(modelo.filas[key][m - 1])
+                valores[real]  = v_real
+                valores[proy]  = v_proy
+                valores[delta] = v_real - v_proy if ingreso else v_proy - v_real
+                if key == "flujo_neto":
+                    cache[f"{real}{row}"] = v_real
+                cache[f"{proy}{row}"]  = v_proy
+                cache[f"{delta}{row}"] = valores[delta]
+
+        valores[get_column_letter(col_sin)]     = float(conc.sin_clasificar[j])
+        valores[get_column_letter(col_sin + 1)] = int(conc.movimientos[j])
+        style_cell(ws.cell(row=row, column=col_sin, value=valores[get_column_letter(col_sin)]),
+                   bg=bg, size=9, num_fmt=DELTA)
+        style_cell(ws.cell(row=row, column=col_sin + 1,
+                           value=valores[get_column_letter(col_sin + 1)]),
+                   bg=bg, size=9, num_fmt="#,##0")
+        for letra, v in valores.items():
+            suma[letra] = suma.get(letra, 0) + v
+        row += 1
+
+    # ── Totales ──
+    if meses:
+        cell = ws.cell(row=row, column=1, value="TOTAL")
+        style_cell(cell, bg=C_BLUE_L, bold=True, h="left")
+        style_cell(ws.cell(row=row, column=2), bg=C_BLUE_L)
+        for c in range(3, col_sin + 2):
+            letra = get_column_letter(c)
+            cell = ws.cell(row=row, column=c, value=f"=SUM({letra}5:{letra}{row - 1})")
+            num_fmt = ("#,##0" if c == col_sin + 1
+                       else DELTA if c == col_sin or (c - 3) % 3 == 2 else CLP)
+            style_cell(cell, bg=C_BLUE_L, bold=True, size=9, num_fmt=num_fmt)
+            if modelo is not None:
+                cache[f"{letra}{row}"] = suma[letra]
+        row += 1
+
+    row += 1
+    ws.merge_cells(f"A{row}:{ultima}{row}")
+    c = ws[f"A{row}"]
+    c.value = ("Real: movimientos bancarios clasificados por reglas (valores estáticos). "
+               "Proyectado: celdas del Flujo de Caja. Δ a favor > 0 es mejor que lo "
+               "proyectado (más ingreso o menos gasto)." if meses else
+               "Ningún mes de la conciliación cae dentro del horizonte del Flujo de Caja.")
+    style_cell(c, bg=None, fg="888888", size=9, italic=True, h="left", wrap=True, border=False)
+    ws.row_dimensions[row].height = 30
+
+    ws.freeze_panes = "C5"
+    return cache
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# VALORES CACHEADOS  (<v> junto a cada <f>, para lectores data_only=True)
+# ═════════════════════════════════════════════════════════════════════════════
+NS_MAIN = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+NS_REL  = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+NS_PKG  = "http://schemas.openxmlformats.org/package/2006/relationships"
+
+# Celda con fórmula; si ya trae <v> (libro guardado por Excel) se reemplaza
+_RE_FORMULA_CELL = re.compile(
+    r'<c r="([A-Z]+[0-9]+)"([^>]*)>(<f[^>]*/>|<f[^>]*>[^<]*</f>)(?:<v\s*/>|<v>[^<]*</v>)?</c>')
+_RE_TIPO = re.compile(r'\s+t="[^"]*"')
+BLOQUE_XML = 64 * 2**10           # bytes de XML de hoja por paso de la reescritura
+
+
+class ErrorExcel(str):
+    """Valor de error de Excel ("#NUM!", "#DIV/0!"…); se cachea con t="e"."""
+
+
+def _sheet_paths(zf):
+    """Título de hoja → ruta del XML dentro del zip."""
+    wb_xml = ElementTree.fromstring(zf.read("xl/workbook.xml"))
+    rels   = ElementTree.fromstring(zf.read("xl/_rels/workbook.xml.rels"))
+    target = {r.get("Id"): r.get("Target") for r in rels.iter(f"{{{NS_PKG}}}Relationship")}
+    paths = {}
+    for sh in wb_xml.iter(f"{{{NS_MAIN}}}sheet"):
+        t = target[sh.get(f"{{{NS_REL}}}id")]
+        paths[sh.get("name")] = t.lstrip("/") if t.startswith("/") else f"xl/{t}"
+    return paths
+
+
+def _cachear_xml(xml, valores):
+    def sub(match):
+        ref, attrs, formula = match.groups()
+        if ref not in valores:
+            return match.group(0)
+        v = valores[ref]
+        attrs = _RE_TIPO.sub("", attrs)
+        if isinstance(v, ErrorExcel):
+            return f'<c r="{ref}"{attrs} t="e">{formula}<v>{escape(v)}</v></c>'
+        if isinstance(v, str):
+            return f'<c r="{ref}"{attrs} t="str">{formula}<v>{escape(v)}</v></c>'
+        if isinstance(v, bool):
+            return f'<c r="{ref}"{attrs} t="b">{formula}<v>{int(v)}</v></c>'
+        return f'<c r="{ref}"{attrs}>{formula}<v>{float(v)!r}</v></c>'
+    return _RE_FORMULA_CELL.sub(sub, xml)
+
+
+def _compartir_xml(xml, grupos):
+    """Anclas → <f t="shared" ref si>texto</f>; marcadores "§ancla" → <f t="shared" si/>."""
+    si = {ancla: i for i, ancla in enumerate(grupos)}
+    seguidora = "<f>" + escape(_SEGUIDORA[1:])
+
+    def sub(match):
+        ref, _, formula = match.groups()
+        if ref in grupos:
+            nueva = f'<f t="shared" ref="{grupos[ref]}" si="{si[ref]}">' + formula[3:]
+        elif formula.startswith(seguidora):
+            nueva = f'<f t="shared" si="{si[formula[len(seguidora):-4]]}"/>'
+        else:
+            return match.group(0)
+        return match.group(0).replace(formula, nueva, 1)
+    return _RE_FORMULA_CELL.sub(sub, xml)
+
+
+_RE_CELDA = re.compile(r'<c r="([A-Z]+[0-9]+)"((?:\s+[\w:]+="[^"]*")*)\s*(?:/>|>.*?</c>)', re.S)
+
+
+def _celdas_xml(xml, valores, escritas):
+    """Reemplaza el contenido de las celdas de `valores` (constante o "=fórmula")."""
+    def sub(match):
+        ref, attrs = match.groups()
+        if ref not in valores:
+            return match.group(0)
+        escritas.add(ref)
+        v = valores[ref]
+        attrs = _RE_TIPO.sub("", attrs)
+        if v is None:
+            return f'<c r="{ref}"{attrs}/>'
+        if isinstance(v, str) and v.startswith("="):
+            return f'<c r="{ref}"{attrs}><f>{escape(v[1:])}</f></c>'
+        if isinstance(v, str):
+            return f'<c r="{ref}"{attrs} t="inlineStr"><is><t>{escape(v)}</t></is></c>'
+        if isinstance(v, bool):
+            return f'<c r="{ref}"{attrs} t="b"><v>{int(v)}</v></c>'
+        return f'<c r="{ref}"{attrs}><v>{float(v)!r}</v></c>'
+    return _RE_CELDA.sub(sub, xml)
+
+
+def _reescribir_hoja(zin, zout, item, pasos):
+    """
+    Copia la hoja por bloques de BLOQUE_XML bytes, cortando tras el último </c>
+    de cada bloque: ninguna celda queda partida y la hoja nunca está entera en
+    memoria. `pasos` son funciones xml → xml que se aplican a cada bloque.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    resto = ""
+    with zin.open(item) as src, zout.open(item, "w") as dst:
+        while True:
+            bloque = src.read(BLOQUE_XML)
+            xml = resto + decoder.decode(bloque, final=not bloque)
+            corte = xml.rfind("</c>")
+            corte = len(xml) if not bloque else corte + 4 if corte >= 0 else 0
+            xml, resto = xml[:corte], xml[corte:]
+            for paso in pasos:
+                xml = paso(xml)
+            dst.write(xml.encode("utf-8"))
+            if not bloque:
+                break
+
+
+def _reescribir_zip(src, dst, pasos):
+    with zipfile.ZipFile(src) as zin, zipfile.ZipFile(dst, "w", zipfile.ZIP_DEFLATED) as zout:
+        por_ruta = {ruta: hoja for hoja, ruta in _sheet_paths(zin).items() if pasos.get(hoja)}
+        for item in zin.infolist():
+            hoja = por_ruta.get(item.filename)
+            if hoja is None:
+                zout.writestr(item, zin.read(item.filename))
+            else:
+                _reescribir_hoja(zin, zout, item, pasos[hoja])
+
+
+def _reescribir(path, pasos, verificar=None):
+    """
+    Aplica `pasos` ({hoja: [xml → xml]}) a las hojas del xlsx en `path` o en un
+    buffer. `verificar()` corre antes de reemplazar el original y puede abortar.
+    """
+    if not isinstance(path, (str, os.PathLike)):
+        path.seek(0)
+        nuevo = io.BytesIO()
+        _reescribir_zip(path, nuevo, pasos)
+        if verificar is not None:
+            verificar()
+        path.seek(0)
+        path.truncate()
+        path.write(nuevo.getbuffer())
+        return
+
+    fd, tmp = tempfile.mkstemp(suffix=".xlsx", dir=os.path.dirname(os.path.abspath(path)))
+    os.close(fd)
+    try:
+        _reescribir_zip(path, tmp, pasos)
+        if verificar is not None:
+            verificar()
+        shutil.move(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def escribir_valores_cacheados(path, cache, compartidas=None):
+    """
+    Reescribe el xlsx en `path` agregando el resultado cacheado de cada fórmula.
+    `cache` = {título de hoja: {celda: valor}}; las celdas sin valor quedan igual.
+    `compartidas` = {título de hoja: {ancla: rango}} convierte antes esas filas
+    en fórmulas compartidas (ver grupos_compartidos).
+    `path` puede ser un buffer (io.BytesIO): se reescribe en memoria.
+    """
+    pasos = {}
+    for hoja, grupos in (compartidas or {}).items():
+        if grupos:
+            pasos.setdefault(hoja, []).append(functools.partial(_compartir_xml, grupos=grupos))
+    for hoja, valores in cache.items():
+        if valores:
+            pasos.setdefault(hoja, []).append(functools.partial(_cachear_xml, valores=valores))
+    _reescribir(path, pasos)
+
+
+def escribir_celdas(path, cambios):
+    """
+    Cambia celdas del xlsx en `path` sin pasar por openpyxl: el resto del XML
+    (fórmulas compartidas, estilos, layout del backend stream) queda intacto.
+    `cambios` = {título de hoja: {celda: valor}}; un texto "=…" es una fórmula
+    y su valor cacheado se descarta. ValueError, sin tocar el archivo, si una
+    celda no existe en la hoja (habría que insertarla en su fila) o la hoja
+    no está en el libro.
+    """
+    escritas = {hoja: set() for hoja in cambios}
+
+    def verificar():
+        faltan = sorted(f"{hoja}!{ref}" for hoja, valores in cambios.items()
+                        for ref in set(valores) - escritas[hoja])
+        if faltan:
+            raise ValueError(f"Celdas inexistentes en el xlsx: {faltan}")
+
+    _reescribir(path, {hoja: [functools.partial(_celdas_xml, valores=valores,
+                                                escritas=escritas[hoja])]
+                       for hoja, valores in cambios.items() if valores}, verificar)
 
 
 # ═════════════════════════════════════════════════════════════════════════════
 # MAIN
 # ═════════════════════════════════════════════════════════════════════════════
-def main():
+OUT_DEFAULT = "flujo_caja_airbnb.xlsx"     # relativo al directorio de trabajo
+
+# Subir al cambiar la salida sin tocar el código fuente (p.ej. versión de openpyxl)
+GENERADOR_VERSION = "1"
+_MODULOS_GENERADOR = ("generar_flujo_caja.py", "modelo.py", "finanzas.py", "parametros.py",
+                      "stream.py")
+
+
+@functools.lru_cache(maxsize=None)
+def _huella_fuente():
+    """SHA-256 del código de los módulos que determinan el xlsx."""
+    h = hashlib.sha256()
+    base = os.path.dirname(os.path.abspath(__file__))
+    for nombre in _MODULOS_GENERADOR:
+        with open(os.path.join(base, nombre), "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+
+def clave_libro(params=None, cachear_valores=True, riesgo=None, backend="openpyxl",
+                equilibrio=None, sensibilidad=None, formulas="celda", reales=None,
+                conciliacion=None):
+    """Clave de cache: parámetros + layout + opciones + versión del generador."""
+    from cache_libros import huella
+
+    params = {**PARAMETROS_DEFAULT, **(params or {})}
+    lay    = layout_de(params)
+    return huella({
+        "params":         {k: float(v) for k, v in params.items()},
+        "layout":         [lay.horizonte, lay.gracia, IRR_ROW, START_DATE.isoformat()],
+        "opciones":       [cachear_valores, backend, formulas],
+        "riesgo":         riesgo,
+        "equilibrio":     equilibrio,
+        "sensibilidad":   sensibilidad,
+        "reales":         {k: [float(v) for v in fila] for k, fila in (reales or {}).items()},
+        "conciliacion":   None if conciliacion is None else [
+            str(conciliacion.meses[0]), conciliacion.real.tolist(),
+            conciliacion.sin_clasificar.tolist(), conciliacion.movimientos.tolist()],
+        "version":        [GENERADOR_VERSION, _huella_fuente(), openpyxl.__version__],
+    })
+
+
+def sin_medir(nombre):
+    """Etapa sin instrumentar (ver perfil.Perfil.etapa)."""
+    return contextlib.nullcontext()
+
+
+def _construir_libro(params, out, cachear_valores, riesgo, equilibrio, sensibilidad,
+                     formulas="celda", medir=sin_medir, reales=None, conciliacion=None):
+    lay    = layout_de(params)
+    compartidas = formulas == "compartidas"
+    with medir("modelo"):
+        modelo = (ModeloFlujo(params, horizonte=lay.horizonte, reales=reales)
+                  if cachear_valores else None)
+
     wb = openpyxl.Workbook()
     wb.remove(wb.active)
 
-    build_parametros(wb)
-    build_flujo(wb)
-    build_resumen(wb)
-
-    out = "/home/user/flujo-de-caja/airbnb/flujo_caja_airbnb.xlsx"
-    wb.save(out)
+    with medir("build_parametros"):
+        build_parametros(wb, params)
+    with medir("build_flujo"):
+        cache_fc = build_flujo(wb, modelo, lay, compartidas, reales)
+    with medir("build_resumen"):
+        cache_resumen = build_resumen(wb, modelo, lay, equilibrio)
+    cache = {"Flujo de Caja Mensual": cache_fc, "Resumen": cache_resumen}
+    if riesgo is not None:
+        with medir("build_riesgo"):
+            build_riesgo(wb, riesgo)
+    if sensibilidad is not None:
+        with medir("build_sensibilidad"):
+            build_sensibilidad(wb, sensibilidad)
+    if conciliacion is not None:
+        with medir("build_real_vs_proyectado"):
+            cache["Real vs Proyectado"] = build_real_vs_proyectado(wb, conciliacion, modelo,
+                                                                   lay)
+
+    with medir("wb.save"):
+        wb.save(out)
+    grupos = {"Flujo de Caja Mensual": grupos_compartidos(lay)} if compartidas else None
+    if modelo is not None or grupos:
+        with medir("valores_cacheados"):
+            escribir_valores_cacheados(out, cache if modelo is not None else {}, grupos)
+
+
+def generar_libro(params=None, out=OUT_DEFAULT, cachear_valores=True, riesgo=None,
+                  backend="openpyxl", cache_libros=None, equilibrio=None,
+                  sensibilidad=None, formulas="celda", medir=sin_medir, reales=None,
+                  conciliacion=None):
+    """
+    Construye las hojas para `params` y guarda el xlsx en `out` (ruta o buffer
+    binario, p.ej. io.BytesIO; el cache de libros requiere una ruta).
+    `riesgo` (resultado de riesgo.simular) agrega la hoja Riesgo tras Resumen.
+    `equilibrio` (resultado de equilibrio.equilibrios) se escribe en Resumen.
+    `sensibilidad` (resultado de sensibilidad.analizar) agrega la hoja Sensibilidad.
+    backend="stream" usa openpyxl write_only (memoria plana en horizontes largos).
+    formulas="compartidas" escribe cada fila del Flujo de Caja como una fórmula
+    compartida anclada en el primer mes, con filas helper de año y gracia.
+    `cache_libros` (cache_libros.CacheLibros) reutiliza un libro idéntico ya generado.
+    `medir(nombre)` devuelve un context manager por etapa (ver perfil.py).
+    `reales` ({"adr", "noches", "dividendo"} → (horizonte,), ver reservas.py y
+    hipoteca.py) fija esas filas donde no son NaN; el resto sigue las fórmulas.
+    `conciliacion` (conciliacion.conciliar) agrega la hoja Real vs Proyectado.
+    """
+    if backend not in ("openpyxl", "stream"):
+        raise ValueError(f"Backend desconocido: {backend!r}")
+    if formulas not in FORMULAS:
+        raise ValueError(f"Modo de fórmulas desconocido: {formulas!r} (opciones: {FORMULAS})")
+    if reales and formulas == "compartidas":
+        raise ValueError("formulas='compartidas' no admite filas dadas por mes (reales): "
+                         "dejan de ser una sola fórmula por fila")
+    params = {**PARAMETROS_DEFAULT, **(params or {})}
+
+    if cache_libros is not None:
+        clave = clave_libro(params, cachear_valores, riesgo, backend, equilibrio,
+                            sensibilidad, formulas, reales, conciliacion)
+        if cache_libros.obtener(clave, out):
+            return out
+        cache_libros.liberar(out)
+
+    if backend == "stream":
+        from stream import generar_libro_stream
+        generar_libro_stream(params, out, cachear_valores, riesgo, equilibrio,
+                             sensibilidad, formulas, medir, reales, conciliacion)
+    else:
+        _construir_libro(params, out, cachear_valores, riesgo, equilibrio, sensibilidad,
+                         formulas, medir, reales, conciliacion)
+
+    if cache_libros is not None:
+        cache_libros.guardar(clave, out)
+    return out
+
+
+def main(params=None, cachear_valores=True, backend="openpyxl", cache_dir=None,
+         exportar=None, formulas="celda", perfil=None, cprofile=None, out=OUT_DEFAULT,
+         reales=None, conciliacion=None):
+    """`exportar` ("parquet", "arrow" o "csv") escribe además el flujo y los KPIs
+    en formato columnar junto al xlsx (ver exportar.py). `perfil` (ruta JSON)
+    genera el libro instrumentado por etapa, sin cache (ver perfil.py).
+    `reales`: filas ADR / Noches / Dividendo dadas por mes (ver reservas.py y
+    hipoteca.py); `conciliacion`:
+    hoja Real vs Proyectado (ver conciliacion.py)."""
+    if perfil is not None:
+        import json
+        from perfil import imprimir, perfilar
+        registro = perfilar(params, out, backend, formulas, cachear_valores,
+                            cprofile=cprofile)
+        with open(perfil, "w", encoding="utf-8") as f:
+            json.dump(registro, f, ensure_ascii=False, indent=2)
+        imprimir(registro)
+        print(f"Perfil guardado: {perfil}")
+        return
+
+    cache_libros = None
+    if cache_dir is not None:
+        from cache_libros import CacheLibros
+        cache_libros = CacheLibros(cache_dir)
+
+    out = generar_libro(params, out, cachear_valores, backend=backend,
+                        cache_libros=cache_libros, formulas=formulas, reales=reales,
+                        conciliacion=conciliacion)
     print(f"Archivo guardado: {out}")
+    if cache_libros is not None:
+        print(f"Cache: {cache_libros.estadisticas()}")
+
+    if exportar is not None:
+        from exportar import exportar_modelo
+        params = {**PARAMETROS_DEFAULT, **(params or {})}
+        modelo = ModeloFlujo(params, horizonte=layout_de(params).horizonte, reales=reales)
+        for path in exportar_modelo(modelo, os.path.splitext(out)[0], exportar):
+            print(f"Archivo guardado: {path}")
 
 
 if __name__ == "__main__":
-    main()
+    # CLI completo (parámetros, salida, formato, --summary): ver cli.py
+    import sys
+    from cli import main as cli
+    sys.exit(cli())
@@ -0,0 +1,207 @@
+"""
+Crédito hipotecario en UF (amortización francesa) para la fila Dividendo.
+
+El dividendo en CLP de cada mes es la cuota fija en UF (más seguros) por el
+valor de la UF del mes. La serie diaria de UF se carga una vez en SerieUF, un
+índice mensual precalculado (valor del día de pago de cada mes): la consulta
+por mes es aritmética de índices, sin búsquedas. Pasado el último dato la UF
+se proyecta con la inflación anual dada.
+
+Todo está vectorizado sobre créditos: principal, tasa, plazo, seguros y primer
+mes pueden ser arreglos y `dividendos` devuelve (créditos, horizonte), que
+ModeloFlujo recibe como fila dividendo (`reales`). Un análisis de refinanciamiento
+de miles de combinaciones crédito × propiedad es una sola evaluación.
+
+    python hipoteca.py --uf uf.csv --principal 3000 --tasa 0.045 --plazo 300
+    python hipoteca.py --uf uf.csv --principal 3000 --tasas 0.04 0.045 0.05 --plazos 240 300
+    python hipoteca.py --principal 3000 --tasa 0.045 --plazo 300 --out libro.xlsx
+
+La tasa es anual con interés mensual tasa / 12, como en los simuladores de
+crédito hipotecario.
+"""
+
+import argparse
+import csv
+import sys
+
+import numpy as np
+
+from modelo import ModeloFlujo, PARAMETROS_DEFAULT
+from reservas import _fechas, _montos
+
+UF_DEFAULT        = 39_000        # CLP, sin serie (--uf)
+INFLACION_DEFAULT = 0.03          # anual, para proyectar la UF tras el último dato
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# SERIE UF  (índice mensual)
+# ═════════════════════════════════════════════════════════════════════════════
+class SerieUF:
+    """
+    UF del día `dia` de cada mes, de `mes0` en adelante. `[mes]` y `mensual()`
+    indexan por aritmética sobre `valores`; los meses anteriores a `mes0`
+    toman el primer dato y los posteriores al último crecen a `inflacion`
+    anual desde él.
+    """
+
+    def __init__(self, fechas, valores, dia=1, inflacion=INFLACION_DEFAULT):
+        fechas  = np.asarray(fechas, dtype="datetime64[D]")
+        valores = np.asarray(valores, dtype=float)
+        orden   = np.argsort(fechas, kind="stable")
+        fechas, valores = fechas[orden], valores[orden]
+        if not fechas.size:
+            raise ValueError("La serie UF está vacía")
+
+        self.mes0      = fechas[0].astype("datetime64[M]")
+        self.inflacion = inflacion
+        meses = np.arange(self.mes0, fechas[-1].astype("datetime64[M]") + 1)
+        pago  = meses.astype("datetime64[D]") + (dia - 1)
+        # Último dato publicado a la fecha de pago (el primero si la serie parte después)
+        i = np.maximum(np.searchsorted(fechas, pago, side="right") - 1, 0)
+        self.valores = valores[i]
+
+    @classmethod
+    def constante(cls, valor=UF_DEFAULT, desde="2025-01", inflacion=INFLACION_DEFAULT):
+        """Serie de un solo dato: `valor` en `desde`, proyectada con `inflacion`."""
+        return cls([np.datetime64(desde, "D")], [valor], inflacion=inflacion)
+
+    def __getitem__(self, mes):
+        return float(self.mensual(mes, 1)[0])
+
+    def mensual(self, inicio, n):
+        """
+        UF de los `n` meses desde `inicio` (AAAA-MM, date o datetime64). Una
+        serie que parte después de `inicio` (exportación desde mediados de año)
+        se completa hacia atrás con su primer dato, como en __init__.
+        """
+        k = int(np.datetime64(inicio, "M") - self.mes0) + np.arange(n)
+        ultimo = self.valores.size - 1
+        proy   = self.valores[-1] * (1 + self.inflacion) ** ((k - ultimo) / 12)
+        return np.where(k <= ultimo, self.valores[np.clip(k, 0, ultimo)], proy)
+
+
+def leer_uf(path, dia=1, inflacion=INFLACION_DEFAULT):
+    """SerieUF desde un CSV fecha;valor (o fecha,valor), con o sin encabezado."""
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        primera = f.readline()
+        f.seek(0)
+        filas = [r for r in csv.reader(f, delimiter=";" if ";" in primera else ",")
+                 if len(r) >= 2 and r[0].strip()]
+    if filas and not any(ch.isdigit() for ch in filas[0][0]):
+        filas = filas[1:]                                   # encabezado
+    return SerieUF(_fechas([r[0].strip() for r in filas]),
+                   _montos([r[1].strip() for r in filas]), dia, inflacion)
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# AMORTIZACIÓN FRANCESA  (vectorizada sobre créditos)
+# ═════════════════════════════════════════════════════════════════════════════
+def cuota_uf(principal, tasa, plazo):
+    """Cuota fija en UF: P·i / (1 - (1+i)^-n), i = tasa / 12; P / n con tasa 0."""
+    principal, i, plazo = (np.asarray(v, dtype=float) for v in (principal, tasa, plazo))
+    i = i / 12
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cuota = principal * i / (1 - (1 + i) ** -plazo)
+    return np.where(i == 0, principal / plazo, cuota)
+
+
+def dividendos(principal, tasa, plazo, uf, horizonte, primer_mes=1, seguros_uf=0.0,
+               inicio=None):
+    """
+    Dividendo en CLP por mes del modelo (forma (..., horizonte)): la cuota
+    `k` se paga en el mes primer_mes + k - 1 con la UF de ese mes (`uf`,
+    SerieUF; mes 1 = `inicio`, por defecto START_DATE). Antes del primer
+    mes y después de la última cuota es 0.
+    """
+    if inicio is None:
+        from generar_flujo_caja import START_DATE as inicio
+    primer_mes = np.asarray(primer_mes, dtype=np.int64)[..., None]
+    m = np.arange(1, horizonte + 1)
+    k = m - primer_mes + 1                                    # número de cuota
+    cuota = cuota_uf(principal, tasa, plazo)[..., None] + np.asarray(seguros_uf)[..., None]
+    vigente = (k >= 1) & (k <= np.asarray(plazo, dtype=float)[..., None])
+    return np.where(vigente, cuota, 0.0) * uf.mensual(inicio, horizonte)
+
+
+def params_credito(params, principal, tasa, plazo, uf, primer_mes=None, seguros_uf=0.0,
+                   inicio=None):
+    """
+    (params, reales) para ModeloFlujo / generar_libro: la fila dividendo sale
+    del crédito (por defecto la primera cuota va en el mes siguiente a la
+    gracia) y el parámetro dividendo queda en la primera cuota en CLP, que es
+    lo que muestran Parámetros y Resumen.
+    """
+    if inicio is None:
+        from generar_flujo_caja import START_DATE as inicio
+    params = {**PARAMETROS_DEFAULT, **(params or {})}
+    if primer_mes is None:
+        primer_mes = np.asarray(params["gracia"], dtype=np.int64) + 1
+    horizonte = int(np.max(params["horizonte"]))
+    div = dividendos(principal, tasa, plazo, uf, horizonte, primer_mes, seguros_uf, inicio)
+
+    mes_uf  = np.clip(np.asarray(primer_mes, dtype=np.int64) - 1, 0, horizonte - 1)
+    primera = ((cuota_uf(principal, tasa, plazo) + np.asarray(seguros_uf))
+               * uf.mensual(inicio, horizonte)[mes_uf])
+    params["dividendo"] = primera if primera.ndim else float(primera)
+    return params, {"dividendo": div}
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# CLI
+# ═════════════════════════════════════════════════════════════════════════════
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--uf", default=None, help="CSV diario fecha;valor de la UF")
+    ap.add_argument("--uf-valor", type=float, default=UF_DEFAULT,
+                    help="UF constante si no hay --uf (proyectada con --inflacion)")
+    ap.add_argument("--inflacion", type=float, default=INFLACION_DEFAULT)
+    ap.add_argument("--dia-pago", type=int, default=1, help="Día del mes de la UF de pago")
+    ap.add_argument("--principal", type=float, required=True, help="Monto del crédito en UF")
+    ap.add_argument("--tasa", type=float, default=None, help="Tasa anual")
+    ap.add_argument("--plazo", type=int, default=None, help="Plazo en meses")
+    ap.add_argument("--tasas", type=float, nargs="+", default=None,
+                    help="Grilla de tasas (refinanciamiento)")
+    ap.add_argument("--plazos", type=int, nargs="+", default=None, help="Grilla de plazos")
+    ap.add_argument("--seguros-uf", type=float, default=0.0, help="Seguros mensuales en UF")
+    ap.add_argument("--horizonte", type=int, default=None)
+    ap.add_argument("--out", default=None, help="Libro con la fila Dividendo del crédito")
+    args = ap.parse_args(argv)
+
+    tasas  = args.tasas or ([args.tasa] if args.tasa is not None else None)
+    plazos = args.plazos or ([args.plazo] if args.plazo is not None else None)
+    if not tasas or not plazos:
+        ap.error("indique --tasa/--tasas y --plazo/--plazos")
+    try:
+        uf = (leer_uf(args.uf, args.dia_pago, args.inflacion) if args.uf
+              else SerieUF.constante(args.uf_valor, inflacion=args.inflacion))
+    except (OSError, ValueError) as e:
+        ap.error(str(e))
+
+    params = {"horizonte": args.horizonte} if args.horizonte else {}
+    t, n = np.meshgrid(np.array(tasas, dtype=float), np.array(plazos, dtype=float),
+                       indexing="ij")
+    params, reales = params_credito(params, args.principal, t.ravel(), n.ravel(), uf,
+                                    seguros_uf=args.seguros_uf)
+    modelo = ModeloFlujo(params, reales=reales)
+
+    cuotas = cuota_uf(args.principal, t.ravel(), n.ravel())
+    print(f"{'tasa':>7} {'plazo':>6} {'cuota UF':>10} {'1er div. CLP':>14} "
+          f"{'VAN':>14} {'TIR anual':>10}")
+    for j in range(t.size):
+        tir = modelo.tir_anual[j]
+        print(f"{t.ravel()[j]:>7.2%} {int(n.ravel()[j]):>6} {cuotas[j]:>10.3f} "
+              f"{params['dividendo'][j]:>14,.0f} {modelo.van[j]:>14,.0f} "
+              f"{'N/D' if np.isnan(tir) else f'{tir:.2%}':>10}")
+
+    if args.out:
+        if t.size != 1:
+            ap.error("--out requiere un solo crédito (--tasa y --plazo)")
+        from generar_flujo_caja import generar_libro
+        unico = {k: float(np.ravel(v)[0]) for k, v in params.items()}
+        generar_libro(unico, args.out, reales={"dividendo": reales["dividendo"][0]})
+        print(f"Archivo guardado: {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,198 @@
+"""
+Lectura en lote de los Parámetros editados en un directorio de libros.
+
+Abre cada xlsx en modo read_only y recorre solo las filas de P_ROW en la hoja
+Parámetros (columnas A:B), sin cargar el resto del libro. Los archivos se
+reparten en un ProcessPoolExecutor y el resultado es una tabla columnar: una
+fila por archivo, una columna (arreglo NumPy) por parámetro.
+
+    python ingesta.py archivo/ --csv parametros.csv --informe informe.csv --kpis
+
+El CSV de parámetros (id + claves de P_ROW, solo los libros leídos) sirve de
+entrada para lote.py / equilibrio.py --tabla. Los errores y los KPIs van en
+el informe aparte: una fila por archivo, también los ilegibles.
+"""
+
+import argparse
+import csv
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from modelo import ModeloFlujo, PARAMETROS_DEFAULT
+
+HOJA = "Parámetros"
+
+
+# ── Un archivo ────────────────────────────────────────────────────────────────
+def leer_parametros(path):
+    """
+    {clave: valor} desde las celdas de P_ROW. Verifica la etiqueta de la
+    columna A (una fila insertada desplazaría todo) y evalúa las celdas que
+    el analista dejó como fórmula sobre otras celdas de Parámetros.
+    """
+    import openpyxl
+    from generar_flujo_caja import P_ROW, PARAM_INFO
+
+    wb = openpyxl.load_workbook(path, read_only=True, data_only=False)
+    try:
+        if HOJA not in wb.sheetnames:
+            raise ValueError(f"Falta la hoja {HOJA!r}")
+        filas = wb[HOJA].iter_rows(min_row=min(P_ROW.values()), max_row=max(P_ROW.values()),
+                                   min_col=1, max_col=2, values_only=True)
+        celdas = dict(enumerate(filas, start=min(P_ROW.values())))
+    finally:
+        wb.close()
+
+    params, formulas = {}, {}
+    for key, row in P_ROW.items():
+        label, valor = celdas.get(row, (None, None))
+        if label != PARAM_INFO[key][0]:
+            raise ValueError(f"Fila {row}: se esperaba {PARAM_INFO[key][0]!r}, hay {label!r}")
+        if isinstance(valor, str) and valor.startswith("="):
+            formulas[key] = valor
+        elif isinstance(valor, (int, float)) and not isinstance(valor, bool):
+            params[key] = valor
+        else:
+            raise ValueError(f"{key} ({HOJA}!B{row}): valor no numérico {valor!r}")
+
+    if formulas:
+        from evaluador import Evaluador
+        ev = Evaluador({(HOJA, row, 2): v for row, (_, v) in celdas.items()}).calcular()
+        for key, formula in formulas.items():
+            valor = ev.valor((HOJA, f"B{P_ROW[key]}"))
+            if not isinstance(valor, (int, float)) or isinstance(valor, (bool, str)):
+                raise ValueError(f"{key}: la fórmula {formula} no da un número ({valor!r})")
+            params[key] = valor
+    return params
+
+
+def _leer(path):
+    """Corre en el proceso hijo; nunca lanza, reporta el error como texto."""
+    try:
+        return path, leer_parametros(path), None
+    except Exception as e:
+        return path, None, f"{type(e).__name__}: {e}"
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# DIRECTORIO
+# ═════════════════════════════════════════════════════════════════════════════
+def archivos(directorio, patron="*.xlsx"):
+    """Libros del directorio (recursivo), sin los ~$ de bloqueo de Excel."""
+    paths = glob.glob(os.path.join(directorio, "**", patron), recursive=True)
+    return sorted(p for p in paths if not os.path.basename(p).startswith("~$"))
+
+
+def leer_directorio(directorio, patron="*.xlsx", workers=None, chunksize=16):
+    """
+    Tabla columnar {"archivo": [...], "error": [...], clave: ndarray} con una
+    fila por libro. Los libros ilegibles quedan con NaN y su error como texto.
+    """
+    paths = archivos(directorio, patron)
+    tabla = {"archivo": paths, "error": [None] * len(paths)}
+    tabla.update({k: np.full(len(paths), np.nan) for k in PARAMETROS_DEFAULT})
+
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        for i, (_, params, error) in enumerate(ex.map(_leer, paths, chunksize=chunksize)):
+            if error is not None:
+                tabla["error"][i] = error
+                continue
+            for k, v in params.items():
+                tabla[k][i] = v
+    return tabla
+
+
+def kpis(tabla):
+    """
+    VAN, TIR anual y payback (COUNTIF) por fila de `tabla`, con ModeloFlujo en
+    lote: un lote por horizonte distinto. NaN en las filas con error.
+    """
+    n   = len(tabla["archivo"])
+    out = {k: np.full(n, np.nan) for k in ("van", "tir_anual", "payback_meses")}
+    ok  = np.array([e is None for e in tabla["error"]], dtype=bool)
+    horizontes = tabla["horizonte"]
+    for h in np.unique(horizontes[ok]):
+        filas = np.flatnonzero(ok & (horizontes == h))
+        modelo = ModeloFlujo({k: tabla[k][filas] for k in PARAMETROS_DEFAULT},
+                             horizonte=int(h))
+        out["van"][filas]           = modelo.van
+        out["tir_anual"][filas]     = modelo.tir_anual
+        out["payback_meses"][filas] = modelo.payback_meses
+    return out
+
+
+def _id(archivo):
+    return os.path.splitext(os.path.basename(archivo))[0]
+
+
+def _celda(v):
+    return "" if np.isnan(v) else f"{v:.12g}"
+
+
+def escribir_csv(tabla, path):
+    """
+    CSV con `id` (nombre del archivo) + parámetros, apto para lote.leer_tabla.
+    Los libros con error quedan fuera: una celda vacía tomaría el default.
+    """
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(["id", *PARAMETROS_DEFAULT])
+        for i, archivo in enumerate(tabla["archivo"]):
+            if tabla["error"][i] is None:
+                w.writerow([_id(archivo), *(_celda(tabla[k][i]) for k in PARAMETROS_DEFAULT)])
+
+
+def escribir_informe(tabla, path, extra=None):
+    """CSV con `id`, archivo, error y las columnas de `extra` (KPIs) por libro."""
+    extra = extra or {}
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(["id", "archivo", "error", *extra])
+        for i, archivo in enumerate(tabla["archivo"]):
+            w.writerow([_id(archivo), archivo, tabla["error"][i] or "",
+                        *(_celda(v[i]) for v in extra.values())])
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("directorio")
+    ap.add_argument("--patron", default="*.xlsx")
+    ap.add_argument("--workers", type=int, default=None,
+                    help="Procesos (por defecto: os.cpu_count())")
+    ap.add_argument("--chunksize", type=int, default=16, help="Archivos por envío")
+    ap.add_argument("--csv", default=None, help="Escribe la tabla de parámetros en CSV")
+    ap.add_argument("--informe", default=None,
+                    help="Escribe errores (y KPIs con --kpis) por archivo en CSV")
+    ap.add_argument("--kpis", action="store_true",
+                    help="Agrega VAN, TIR anual y payback al informe")
+    args = ap.parse_args(argv)
+    if args.kpis and not args.informe:
+        ap.error("--kpis requiere --informe")
+
+    t0 = time.perf_counter()
+    tabla = leer_directorio(args.directorio, args.patron, args.workers, args.chunksize)
+    seg = time.perf_counter() - t0
+    extra = kpis(tabla) if args.kpis else None
+
+    errores = [(a, e) for a, e in zip(tabla["archivo"], tabla["error"]) if e]
+    for archivo, error in errores:
+        print(f"{archivo}: {error}", file=sys.stderr)
+    print(f"{len(tabla['archivo']) - len(errores)}/{len(tabla['archivo'])} libros leídos "
+          f"en {seg:.2f} s")
+
+    if args.csv:
+        escribir_csv(tabla, args.csv)
+        print(f"Tabla guardada: {args.csv}")
+    if args.informe:
+        escribir_informe(tabla, args.informe, extra)
+        print(f"Informe guardado: {args.informe}")
+    return 1 if errores else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
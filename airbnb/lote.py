@@ -0,0 +1,176 @@
+"""
+Generación en lote: un libro de Flujo de Caja por propiedad.
+
+Lee una tabla CSV o JSON (una fila de parámetros por propiedad, columnas con
+las claves de P_ROW más un identificador `id`) y reparte build_parametros /
+build_flujo / build_resumen en un ProcessPoolExecutor.
+
+    python lote.py propiedades.csv salida/ --workers 8 --chunksize 16
+"""
+
+import argparse
+import csv
+import json
+import os
+import re
+import sys
+import time
+
+from parametros import PARAMETROS_DEFAULT, numero
+
+COL_ID = "id"
+
+
+# ── Tabla de parámetros ───────────────────────────────────────────────────────
+def leer_tabla(path):
+    """
+    Devuelve [(id, params)] desde un CSV o un JSON (lista de objetos).
+    Las claves ausentes o vacías toman el valor de PARAMETROS_DEFAULT; los
+    valores se convierten a número en el worker, para que un dato inválido
+    quede como fallo de esa propiedad y no aborte el lote.
+    """
+    if path.lower().endswith(".json"):
+        with open(path, encoding="utf-8") as f:
+            filas = json.load(f)
+    else:
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            filas = list(csv.DictReader(f))
+
+    tabla = []
+    for i, fila in enumerate(filas, start=1):
+        desconocidas = set(fila) - set(PARAMETROS_DEFAULT) - {COL_ID}
+        if desconocidas:
+            raise ValueError(f"Fila {i}: columnas desconocidas {sorted(desconocidas)}")
+        params = {k: v for k, v in fila.items()
+                  if k != COL_ID and v not in (None, "")}
+        tabla.append((str(fila.get(COL_ID) or i), params))
+    return tabla
+
+
+def nombre_archivo(prop_id):
+    return "flujo_caja_" + re.sub(r"[^\w.-]+", "_", prop_id) + ".xlsx"
+
+
+# ── Worker ────────────────────────────────────────────────────────────────────
+_CACHES = {}        # por proceso hijo: una CacheLibros por configuración
+
+
+def _cache(cache_cfg):
+    """La misma CacheLibros para todas las tareas del proceso (lleva el total en bytes)."""
+    cache = _CACHES.get(cache_cfg)
+    if cache is None:
+        from cache_libros import CacheLibros
+        cache = _CACHES[cache_cfg] = CacheLibros(*cache_cfg)
+    return cache
+
+
+def _generar(tarea):
+    """Corre en el proceso hijo; nunca lanza, reporta el error como texto."""
+    from generar_flujo_caja import generar_libro
+
+    prop_id, params, out, cache_cfg = tarea
+    cache = _cache(cache_cfg) if cache_cfg is not None else None
+    hits  = cache.hits if cache is not None else 0
+
+    try:
+        generar_libro({k: numero(v) for k, v in params.items()}, out,
+                      cache_libros=cache)
+    except Exception as e:
+        return prop_id, None, f"{type(e).__name__}: {e}", False
+    return prop_id, out, None, bool(cache and cache.hits > hits)
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# LOTE
+# ═════════════════════════════════════════════════════════════════════════════
+def generar_lote(tabla, out_dir, workers=None, chunksize=1, progreso=None,
+                 cache_dir=None, cache_max_bytes=512 * 2**20):
+    """
+    Genera un xlsx por fila de `tabla` ([(id, params)]) en `out_dir`.
+
+    Devuelve un reporte {"total", "ok", "fallos": [{id, error}], "cache", "segundos"}.
+    `progreso(hechos, total, prop_id, error)` se llama por cada libro terminado.
+    Con `cache_dir`, los libros idénticos se reutilizan (ver cache_libros).
+    """
+    from concurrent.futures import ProcessPoolExecutor      # diferido: cli.py importa lote
+
+    os.makedirs(out_dir, exist_ok=True)
+    cache_cfg = (cache_dir, cache_max_bytes) if cache_dir else None
+    tareas = [(prop_id, params, os.path.join(out_dir, nombre_archivo(prop_id)), cache_cfg)
+              for prop_id, params in tabla]
+
+    t0 = time.perf_counter()
+    ok, fallos = [], []
+    hits = 0
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        resultados = ex.map(_generar, tareas, chunksize=chunksize)
+        for hechos, (prop_id, out, error, hit) in enumerate(resultados, start=1):
+            if error is None:
+                ok.append({"id": prop_id, "archivo": out})
+            else:
+                fallos.append({"id": prop_id, "error": error})
+            hits += hit
+            if progreso is not None:
+                progreso(hechos, len(tareas), prop_id, error)
+
+    return {
+        "total":    len(tareas),
+        "ok":       ok,
+        "fallos":   fallos,
+        "cache":    {"hits": hits, "misses": len(ok) - hits} if cache_cfg else None,
+        "segundos": round(time.perf_counter() - t0, 3),
+    }
+
+
+def _progreso_stderr(hechos, total, prop_id, error):
+    estado = "ERROR " + error if error else "ok"
+    print(f"[{hechos}/{total}] {prop_id}: {estado}", file=sys.stderr)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("tabla", help="CSV o JSON con una fila de parámetros por propiedad")
+    ap.add_argument("out_dir", help="Directorio de salida")
+    ap.add_argument("--workers", type=int, default=None,
+                    help="Procesos (por defecto: os.cpu_count())")
+    ap.add_argument("--chunksize", type=int, default=1,
+                    help="Propiedades por envío a cada proceso")
+    ap.add_argument("--cache-dir", default=None,
+                    help="Directorio de cache de libros (reutiliza libros idénticos)")
+    ap.add_argument("--cache-max-mb", type=float, default=512,
+                    help="Tamaño máximo del cache antes de desalojar (LRU)")
+    ap.add_argument("--exportar", choices=("parquet", "arrow", "csv"), default=None,
+                    help="Escribe además out_dir/portafolio_{flujo,kpis}.<ext> (formato largo)")
+    ap.add_argument("--reporte", default=None,
+                    help="Ruta del reporte JSON (por defecto out_dir/reporte_lote.json)")
+    args = ap.parse_args(argv)
+
+    tabla = leer_tabla(args.tabla)
+    reporte = generar_lote(tabla, args.out_dir,
+                           workers=args.workers, chunksize=args.chunksize,
+                           progreso=_progreso_stderr, cache_dir=args.cache_dir,
+                           cache_max_bytes=int(args.cache_max_mb * 2**20))
+
+    path = args.reporte or os.path.join(args.out_dir, "reporte_lote.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(reporte, f, ensure_ascii=False, indent=2)
+
+    print(f"{len(reporte['ok'])}/{reporte['total']} libros en {reporte['segundos']} s "
+          f"– {len(reporte['fallos'])} fallos (reporte: {path})")
+    if reporte["cache"]:
+        print(f"Cache: {reporte['cache']['hits']} hits, {reporte['cache']['misses']} misses")
+
+    if args.exportar:
+        from exportar import exportar, tablas_lote
+        generados = {r["id"] for r in reporte["ok"]}
+        validas = [(prop_id, {k: numero(v) for k, v in params.items()})
+                   for prop_id, params in tabla if prop_id in generados]
+        if validas:
+            base = os.path.join(args.out_dir, "portafolio")
+            for path in exportar(*tablas_lote(validas), base, args.exportar):
+                print(f"Exportado: {path}")
+    return 1 if reporte["fallos"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,161 @@
+"""
+Modelo numérico del Flujo de Caja Airbnb (NumPy).
+
+Replica las fórmulas de build_flujo / build_resumen sobre arreglos, de modo que
+los valores existan sin recalcular el libro en Excel o LibreOffice.
+
+Los parámetros pueden ser escalares o arreglos 1-D (lote de propiedades o
+escenarios): cada fila del flujo tiene forma (..., horizonte).
+"""
+
+import numpy as np
+
+from finanzas import con_nd, payback_countif, payback_mes, tasa_mensual, tir, vna
+from parametros import NO_RECUPERADO, PARAMETROS_DEFAULT, SIN_SOLUCION    # noqa: F401
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# MODELO
+# ═════════════════════════════════════════════════════════════════════════════
+class ModeloFlujo:
+    """
+    Flujo de caja mensual y KPIs calculados en memoria.
+
+    `filas` usa las mismas claves que FC en generar_flujo_caja; `totales`
+    replica la columna TOTAL / FINAL y `resumen()` las celdas de Resumen.
+    `reales` ({"adr", "noches", "dividendo"} → (..., horizonte), ver
+    reservas.py y hipoteca.py) reemplaza esas filas en los meses con dato;
+    NaN deja la proyección.
+    """
+
+    def __init__(self, params=None, horizonte=None, reales=None):
+        p = dict(PARAMETROS_DEFAULT)
+        p.update(params or {})
+        self.params = p
+
+        if horizonte is None:
+            horizonte = int(np.max(p["horizonte"]))
+        self.horizonte = horizonte
+
+        def col(key):
+            # Escalar → (1,), lote (n,) → (n, 1): broadcasting contra los meses
+            return np.asarray(p[key], dtype=float)[..., None]
+
+        m        = np.arange(1, horizonte + 1)
+        year_idx = (m - 1) // 12
+        gracia   = m <= col("gracia")
+
+        shape = np.broadcast_shapes(*(col(k).shape for k in p), (horizonte,))
+        zeros = np.zeros(shape)
+
+        def real(key, proyeccion):
+            # Meses con dato real (reservas.py) en vez de la proyección
+            if key not in (reales or {}):
+                return proyeccion
+            fila = np.asarray(reales[key], dtype=float)
+            return np.where(np.isnan(fila), proyeccion, fila)
+
+        adr        = real("adr", zeros + np.where(gracia, 0.0,
+                                                  col("adr") * (1 + col("crec_adr")) ** year_idx))
+        noches     = real("noches", zeros + np.where(gracia, 0.0, col("noches")))
+        ing_brutos = adr * noches
+        comision   = ing_brutos * col("comision")
+        ing_netos  = ing_brutos - comision
+
+        g_comunes  = zeros + col("g_comunes")
+        servicios  = zeros + col("servicios")
+        fondo      = zeros + col("fondo")
+        dividendo  = real("dividendo", zeros + np.where(gracia, 0.0, col("dividendo")))
+        egresos    = g_comunes + servicios + fondo + dividendo
+
+        flujo_neto = ing_netos - egresos
+        flujo_acum = np.cumsum(flujo_neto, axis=-1) - col("inversion")
+
+        self.filas = {
+            "adr":         adr,
+            "noches":      noches,
+            "ing_brutos":  ing_brutos,
+            "comision":    comision,
+            "ing_netos":   ing_netos,
+            "g_comunes":   g_comunes,
+            "servicios":   servicios,
+            "fondo":       fondo,
+            "dividendo":   dividendo,
+            "tot_egresos": egresos,
+            "flujo_neto":  flujo_neto,
+            "flujo_acum":  flujo_acum,
+        }
+
+    # ── Columna TOTAL / FINAL ──
+    @property
+    def totales(self):
+        tot = {k: v.sum(axis=-1) for k, v in self.filas.items()}
+        tot["adr"]        = self.filas["adr"].mean(axis=-1)
+        tot["flujo_acum"] = self.filas["flujo_acum"][..., -1]
+        return tot
+
+    # ── Indicadores ──
+    @property
+    def flujos_tir(self):
+        """[-Inversión, FN_1 .. FN_H]  (fila helper de Resumen)."""
+        inv = np.asarray(self.params["inversion"], dtype=float)
+        fn  = self.filas["flujo_neto"]
+        t0  = np.broadcast_to(-inv, fn.shape[:-1])[..., None]
+        return np.concatenate([t0, fn], axis=-1)
+
+    @property
+    def tasa_mensual(self):
+        return tasa_mensual(self.params["tasa"])
+
+    @property
+    def van(self):
+        """NPV(tasa_mensual, FN_1..FN_H) - inversión  (flujos a fin de período)."""
+        npv = vna(self.tasa_mensual, self.filas["flujo_neto"])
+        return npv - np.asarray(self.params["inversion"], dtype=float)
+
+    @property
+    def tir_mensual(self):
+        """NaN donde la hoja muestra "N/D"."""
+        return tir(self.flujos_tir)
+
+    @property
+    def tir_anual(self):
+        return (1 + self.tir_mensual) ** 12 - 1
+
+    @property
+    def payback_meses(self):
+        """Meses con acumulado < 0 (COUNTIF de Resumen)."""
+        return payback_countif(self.filas["flujo_acum"])
+
+    @property
+    def payback_mes(self):
+        """Primer mes con acumulado ≥ 0; NaN si no se recupera."""
+        return payback_mes(self.filas["flujo_acum"])
+
+    def resumen(self):
+        """Valores de las celdas de Resumen, por clave (solo caso escalar)."""
+        p = {k: float(v) for k, v in self.params.items()}
+        ing_bruto = p["adr"] * p["noches"]
+        egresos   = p["g_comunes"] + p["servicios"] + p["fondo"] + p["dividendo"]
+        tot       = self.totales
+        tir_m     = self.tir_mensual
+        payback   = int(self.payback_meses)
+
+        return {
+            **p,
+            "ing_bruto_mes":    ing_bruto,
+            "comision_mes":     ing_bruto * p["comision"],
+            "ing_neto_mes":     ing_bruto * (1 - p["comision"]),
+            "egresos_mes":      egresos,
+            "margen_mes":       ing_bruto * (1 - p["comision"]) - egresos,
+            "ing_netos_total":  float(tot["ing_netos"]),
+            "egresos_total":    float(tot["tot_egresos"]),
+            "flujo_neto_total": float(tot["flujo_neto"]),
+            "flujo_acum_final": float(tot["flujo_acum"]),
+            "tasa_mensual":     float(self.tasa_mensual),
+            "van":              float(self.van),
+            "tir_mensual":      con_nd(tir_m),
+            "tir_anual":        con_nd((1 + tir_m) ** 12 - 1),
+            "payback":          (NO_RECUPERADO if payback == self.horizonte
+                                 else f"{payback} meses"),
+        }
@@ -0,0 +1,48 @@
+"""
+Parámetros por defecto, textos de la hoja Resumen y lectura / validación de
+valores (numero, validar).
+
+Sin dependencias: lo importan modelo.py y los caminos que deben arrancar
+rápido (cli.py, lote.py) sin cargar NumPy ni openpyxl.
+"""
+
+# ── Parámetros por defecto (mismas claves que P_ROW) ──────────────────────────
+PARAMETROS_DEFAULT = {
+    "horizonte":  36,
+    "gracia":     6,
+    "adr":        38_000,
+    "noches":     21,
+    "crec_adr":   0.03,
+    "comision":   0.18,
+    "g_comunes":  90_000,
+    "servicios":  60_000,
+    "fondo":      40_000,
+    "dividendo":  274_000,
+    "inversion":  3_500_000,
+    "tasa":       0.12,
+}
+
+ND            = "N/D"                           # IFERROR(IRR(...),"N/D")
+NO_RECUPERADO = "No recuperado en el horizonte"
+SIN_SOLUCION  = "Sin solución en el rango"     # equilibrio.resolver sin borde
+
+
+# ── Lectura y validación ──────────────────────────────────────────────────────
+def numero(valor):
+    """int o float desde un número o un texto ("38000", "38_000", "0.03")."""
+    if isinstance(valor, (int, float)):
+        return valor
+    valor = str(valor).strip().replace("_", "")
+    try:
+        return int(valor)
+    except ValueError:
+        return float(valor)
+
+
+def validar(params):
+    """ValueError si horizonte / gracia no forman un layout válido."""
+    h, gracia = params["horizonte"], params["gracia"]
+    if h != int(h) or h < 1:
+        raise ValueError(f"horizonte debe ser un entero ≥ 1: {h}")
+    if not 0 <= gracia <= h:
+        raise ValueError(f"gracia fuera de rango (0..{h}): {gracia}")
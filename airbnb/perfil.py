@@ -0,0 +1,191 @@
+"""
+Perfil de la generación de un libro: tiempo y memoria por etapa.
+
+Mide cada etapa de generar_libro (modelo, build_parametros, build_flujo,
+build_resumen, wb.save, valores_cacheados) con perf_counter y el pico de
+memoria Python de la etapa con tracemalloc. Del xlsx resultante cuenta
+celdas, fórmulas, estilos distintos (cellXfs) y tamaño. El resultado es un
+registro JSON; con --cprofile se guarda además el volcado pstats y las
+funciones más costosas (style_cell, get_column_letter…) van en el registro.
+
+    python perfil.py --horizonte 360 --json perfil.json --cprofile perfil.pstats
+    python generar_flujo_caja.py --profile perfil.json
+
+tracemalloc agrega overhead: los tiempos con memoria son comparables entre
+sí, no con una corrida sin perfil (use --sin-memoria para tiempos limpios).
+"""
+
+import argparse
+import contextlib
+import cProfile
+import datetime
+import json
+import os
+import platform
+import pstats
+import re
+import sys
+import time
+import tracemalloc
+import zipfile
+
+from modelo import PARAMETROS_DEFAULT
+
+_RE_CELDA   = re.compile(rb"<c\s")
+_RE_FORMULA = re.compile(rb"<f[\s>/]")
+_RE_XFS     = re.compile(rb'<cellXfs count="(\d+)"')
+
+
+class Perfil:
+    """Acumula {etapa: {segundos, pico_bytes}}; `etapa` es el `medir` de generar_libro."""
+
+    def __init__(self, memoria=True):
+        self.memoria = memoria
+        self.etapas  = {}
+
+    @contextlib.contextmanager
+    def etapa(self, nombre):
+        if self.memoria:
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            seg = time.perf_counter() - t0
+            registro = self.etapas.setdefault(nombre, {"segundos": 0.0, "pico_bytes": None})
+            registro["segundos"] = round(registro["segundos"] + seg, 6)
+            if self.memoria:
+                pico = tracemalloc.get_traced_memory()[1] - base
+                registro["pico_bytes"] = max(registro["pico_bytes"] or 0, pico)
+
+
+def contar(path):
+    """Celdas, fórmulas (incl. seguidoras compartidas) y estilos del xlsx."""
+    celdas = formulas = estilos = 0
+    hojas = {}
+    with zipfile.ZipFile(path) as zf:
+        for info in zf.infolist():
+            if info.filename.startswith("xl/worksheets/") and info.filename.endswith(".xml"):
+                xml = zf.read(info.filename)
+                n_c, n_f = len(_RE_CELDA.findall(xml)), len(_RE_FORMULA.findall(xml))
+                hojas[os.path.basename(info.filename)] = {"celdas": n_c, "formulas": n_f,
+                                                          "bytes_xml": info.file_size}
+                celdas, formulas = celdas + n_c, formulas + n_f
+            elif info.filename == "xl/styles.xml":
+                m = _RE_XFS.search(zf.read(info.filename))
+                estilos = int(m.group(1)) if m else 0
+    return {"celdas": celdas, "formulas": formulas, "estilos": estilos,
+            "bytes": os.path.getsize(path), "hojas": hojas}
+
+
+def rss_pico_kb(hijos=False):
+    """RSS pico en KB del proceso (con `hijos`, o de sus hijos si es mayor); None en Windows."""
+    try:
+        import resource
+    except ImportError:                                # Windows
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if hijos:
+        rss = max(rss, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    return rss // 1024 if sys.platform == "darwin" else rss     # macOS reporta bytes
+
+
+def _top_funciones(prof, n):
+    st = pstats.Stats(prof)
+    filas = []
+    for (archivo, linea, funcion), (_, ncalls, tottime, cumtime, _) in st.stats.items():
+        filas.append({
+            "funcion":  f"{os.path.basename(archivo)}:{linea}({funcion})",
+            "llamadas": ncalls,
+            "tottime":  round(tottime, 6),
+            "cumtime":  round(cumtime, 6),
+        })
+    return sorted(filas, key=lambda f: -f["tottime"])[:n]
+
+
+def perfilar(params=None, out="perfil.xlsx", backend="openpyxl", formulas="celda",
+             cachear_valores=True, memoria=True, cprofile=None, top=25):
+    """
+    Genera el libro instrumentado y devuelve el registro (dict apto para JSON).
+    `cprofile` es la ruta del volcado pstats (None: sin cProfile).
+    """
+    from generar_flujo_caja import generar_libro
+
+    params = {**PARAMETROS_DEFAULT, **(params or {})}
+    perfil = Perfil(memoria)
+    prof   = cProfile.Profile() if cprofile else None
+
+    if memoria:
+        tracemalloc.start()
+    t0 = time.perf_counter()
+    try:
+        if prof is not None:
+            prof.enable()
+        generar_libro(params, out, cachear_valores, backend=backend, formulas=formulas,
+                      medir=perfil.etapa)
+    finally:
+        if prof is not None:
+            prof.disable()
+        total = time.perf_counter() - t0
+        pico_total = tracemalloc.get_traced_memory()[1] if memoria else None
+        if memoria:
+            tracemalloc.stop()
+
+    registro = {
+        "fecha":    datetime.datetime.now().isoformat(timespec="seconds"),
+        "python":   platform.python_version(),
+        "params":   {k: float(v) for k, v in params.items()},
+        "opciones": {"backend": backend, "formulas": formulas,
+                     "cachear_valores": cachear_valores, "memoria": memoria},
+        "etapas":   perfil.etapas,
+        "total":    {"segundos": round(total, 6), "pico_bytes": pico_total,
+                     "rss_pico_kb": rss_pico_kb()},
+        "salida":   {"archivo": out, **contar(out)},
+    }
+    if prof is not None:
+        prof.dump_stats(cprofile)
+        registro["cprofile"] = {"archivo": cprofile, "top": _top_funciones(prof, top)}
+    return registro
+
+
+def imprimir(registro, file=sys.stdout):
+    print(f"{'etapa':<20} {'segundos':>9} {'pico MB':>9}", file=file)
+    for nombre, e in registro["etapas"].items():
+        pico = f"{e['pico_bytes'] / 2**20:>9.2f}" if e["pico_bytes"] is not None else f"{'–':>9}"
+        print(f"{nombre:<20} {e['segundos']:>9.4f} {pico}", file=file)
+    s = registro["salida"]
+    print(f"{'total':<20} {registro['total']['segundos']:>9.4f}", file=file)
+    print(f"{s['celdas']:,} celdas · {s['formulas']:,} fórmulas · {s['estilos']} estilos · "
+          f"{s['bytes'] / 1024:.1f} KB", file=file)
+    for f in registro.get("cprofile", {}).get("top", [])[:10]:
+        print(f"  {f['tottime']:>8.4f}s {f['llamadas']:>9,}  {f['funcion']}", file=file)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--horizonte", type=int, default=None)
+    ap.add_argument("--backend", choices=("openpyxl", "stream"), default="openpyxl")
+    ap.add_argument("--formulas", choices=("celda", "compartidas"), default="celda")
+    ap.add_argument("--out", default="perfil.xlsx", help="xlsx generado")
+    ap.add_argument("--json", default=None, help="Registro JSON (por defecto: stdout)")
+    ap.add_argument("--cprofile", default=None, help="Volcado pstats")
+    ap.add_argument("--top", type=int, default=25, help="Funciones en el registro")
+    ap.add_argument("--sin-memoria", action="store_true", help="Sin tracemalloc")
+    args = ap.parse_args(argv)
+
+    params = {"horizonte": args.horizonte} if args.horizonte else None
+    registro = perfilar(params, args.out, args.backend, args.formulas,
+                        memoria=not args.sin_memoria, cprofile=args.cprofile, top=args.top)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(registro, f, ensure_ascii=False, indent=2)
+        imprimir(registro)
+        print(f"Perfil guardado: {args.json}")
+    else:
+        json.dump(registro, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
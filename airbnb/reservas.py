@@ -0,0 +1,430 @@
+"""
+Ocupación real desde exportaciones de reservas (CSV o iCal).
+
+Cada reserva (check-in, check-out, tarifa por noche) se reparte en las noches
+que ocupa de cada mes calendario, sin expandir noche a noche, y los tramos se
+agregan por (propiedad, mes) con np.unique + np.bincount. Los archivos se leen
+en bloques de `bloque` reservas: la memoria depende del bloque y del número de
+pares (propiedad, mes), no del largo de la exportación.
+
+    python reservas.py reservas.csv depto-1.ics --csv ocupacion.csv
+    python cli.py --reservas reservas.csv --listing depto-1 --calibrar -o depto.xlsx
+
+Ocupacion entrega por propiedad las series mensuales de noches, ingresos y
+ADR, y `reales()`: las filas ADR y Noches de los meses ya cerrados para
+ModeloFlujo / generar_libro. El resto del horizonte se sigue proyectando con
+los parámetros, que `calibrar()` puede ajustar a los últimos meses reales.
+"""
+
+import argparse
+import csv
+import datetime
+import itertools
+import math
+import os
+import re
+import sys
+import time
+
+import numpy as np
+
+BLOQUE = 100_000
+
+# Encabezados aceptados (en minúsculas, con "-" y espacios como "_")
+COLUMNAS = {
+    "listing":  ("listing", "listing_id", "propiedad", "id_propiedad", "property", "anuncio"),
+    "checkin":  ("check_in", "checkin", "llegada", "entrada", "fecha_inicio", "start_date",
+                 "arrival"),
+    "checkout": ("check_out", "checkout", "salida", "fecha_fin", "end_date", "departure"),
+    "tarifa":   ("tarifa", "tarifa_noche", "nightly_rate", "rate", "precio_noche", "adr"),
+    "total":    ("total", "monto", "ingreso", "payout", "total_payout", "amount"),
+    "estado":   ("estado", "status"),
+}
+
+# Eventos iCal que bloquean fechas sin ser reservas (SUMMARY, en minúsculas)
+BLOQUEOS = ("not available", "blocked", "bloqueado", "no disponible")
+
+_RE_MILES = re.compile(r"-?\d{1,3}(\.\d{3})+")
+_RE_COMA  = re.compile(r"-?\d+,\d{1,2}")
+_RE_BARRA = re.compile(r"(\d{1,2})[/.-](\d{1,2})[/.-](\d{4})")
+
+
+# ── Campos ────────────────────────────────────────────────────────────────────
+FORMATOS_FECHA = ("DMA", "MDA")
+
+
+def _fecha_iso(t, formato):
+    if len(t) >= 10 and t[4] == "-":
+        return t[:10]
+    m = _RE_BARRA.match(t)
+    if m:
+        a, b, anio = m.groups()
+        dia, mes = (b, a) if formato == "MDA" else (a, b)
+        return f"{anio}-{int(mes):02d}-{int(dia):02d}"
+    if len(t) >= 8 and t[:8].isdigit():
+        return f"{t[:4]}-{t[4:6]}-{t[6:8]}"
+    return None
+
+
+def _fechas(textos, formato=None, estricto=True):
+    """
+    datetime64[D] desde AAAA-MM-DD (con o sin hora), AAAAMMDD o D/M/AAAA (día y
+    mes con o sin cero). `formato`: "DMA" (por defecto) o "MDA" para las
+    fechas con barras, o un patrón strptime ("%m/%d/%y"). Con estricto=False
+    lo que no se reconoce queda NaT en vez de lanzar ValueError.
+    """
+    if formato is not None and "%" in formato:
+        iso = []
+        for t in textos:
+            try:
+                iso.append(datetime.datetime.strptime(t, formato).date().isoformat())
+            except ValueError:
+                if estricto:
+                    raise ValueError(f"Fecha {t!r} no calza con {formato!r}") from None
+                iso.append("NaT")
+        return np.array(iso, dtype="datetime64[D]")
+    if formato not in (None, *FORMATOS_FECHA):
+        raise ValueError(f"Formato de fecha desconocido: {formato!r} "
+                         f"({' / '.join(FORMATOS_FECHA)} o un patrón strptime)")
+
+    if textos and len(textos[0]) == 10 and textos[0][4] == "-":
+        try:
+            return np.array(textos, dtype="datetime64[D]")
+        except ValueError:
+            pass
+    iso = []
+    for t in textos:
+        f = _fecha_iso(t, formato)
+        if f is None:
+            if estricto:
+                raise ValueError(f"Fecha no reconocida: {t!r}")
+            f = "NaT"
+        iso.append(f)
+    try:
+        return np.array(iso, dtype="datetime64[D]")
+    except ValueError:                           # 31/02/2025, 13/25/2025…
+        salida = np.empty(len(iso), dtype="datetime64[D]")
+        for i, (t, f) in enumerate(zip(textos, iso)):
+            try:
+                salida[i] = np.datetime64(f, "D")
+            except ValueError:
+                if estricto:
+                    pista = (" (¿M/D/AAAA? use formato MDA)"
+                             if formato is None and _RE_BARRA.match(t) else "")
+                    raise ValueError(f"Fecha inválida: {t!r}{pista}") from None
+                salida[i] = np.datetime64("NaT")
+        return salida
+
+
+def _monto(texto):
+    """"$42.000" → 42000, "42,50" → 42.5, "" → NaN."""
+    t = re.sub(r"[^\d,.\-]", "", texto)
+    if not t:
+        return math.nan
+    if "," in t and "." in t:                    # el último separador es el decimal
+        miles = "." if t.rfind(",") > t.rfind(".") else ","
+        t = t.replace(miles, "").replace(",", ".")
+    elif "," in t:
+        t = t.replace(",", "." if _RE_COMA.fullmatch(t) else "")
+    elif _RE_MILES.fullmatch(t):
+        t = t.replace(".", "")
+    return float(t)
+
+
+def _montos(textos):
+    if not any("." in t and _RE_MILES.fullmatch(t) for t in textos):     # "38.000": miles
+        try:
+            return np.array([t or "nan" for t in textos], dtype=float)
+        except ValueError:
+            pass
+    return np.array([_monto(t) for t in textos], dtype=float)
+
+
+# ── Lectores por bloque: (propiedades, check-in, check-out, tarifa) ───────────
+def _indices(encabezado, path):
+    norm = [re.sub(r"[\s\-]+", "_", c.strip().lower()) for c in encabezado]
+    idx = {campo: next((norm.index(a) for a in alias if a in norm), None)
+           for campo, alias in COLUMNAS.items()}
+    for campo in ("checkin", "checkout"):
+        if idx[campo] is None:
+            raise ValueError(f"{path}: falta la columna {campo} "
+                             f"({' / '.join(COLUMNAS[campo])})")
+    return idx
+
+
+def _bloques_csv(path, bloque, listing, formato):
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        filas = csv.reader(f)
+        idx = _indices(next(filas, []), path)
+        while True:
+            trozo = list(itertools.islice(filas, bloque))
+            if not trozo:
+                return
+            if idx["estado"] is not None:
+                trozo = [r for r in trozo if "cancel" not in r[idx["estado"]].lower()]
+
+            def col(campo):
+                return None if idx[campo] is None else [r[idx[campo]].strip() for r in trozo]
+
+            d0, d1 = _fechas(col("checkin"), formato), _fechas(col("checkout"), formato)
+            if idx["tarifa"] is not None:
+                tarifa = _montos(col("tarifa"))
+            elif idx["total"] is not None:
+                tarifa = _montos(col("total")) / np.maximum((d1 - d0).astype(np.int64), 1)
+            else:
+                tarifa = np.full(len(trozo), np.nan)
+            props = col("listing") or [listing] * len(trozo)
+            yield props, d0, d1, tarifa
+
+
+def _desplegar(f):
+    """Líneas lógicas de un iCal (las que empiezan con espacio continúan la anterior)."""
+    actual = None
+    for linea in f:
+        linea = linea.rstrip("\r\n")
+        if linea[:1] in (" ", "\t") and actual is not None:
+            actual += linea[1:]
+            continue
+        if actual is not None:
+            yield actual
+        actual = linea
+    if actual is not None:
+        yield actual
+
+
+def _bloques_ical(path, bloque, listing):
+    """VEVENT → reserva; la tarifa sale de X-TARIFA / X-RATE si la exportación la trae."""
+    eventos, evento = [], None
+    with open(path, encoding="utf-8-sig") as f:
+        for linea in _desplegar(f):
+            nombre, _, valor = linea.partition(":")
+            nombre = nombre.split(";")[0].upper()
+            if nombre == "BEGIN" and valor.upper() == "VEVENT":
+                evento = {}
+            elif nombre == "END" and valor.upper() == "VEVENT" and evento is not None:
+                resumen = evento.get("SUMMARY", "").lower()
+                if ("DTSTART" in evento and "DTEND" in evento
+                        and evento.get("STATUS", "").upper() != "CANCELLED"
+                        and not any(b in resumen for b in BLOQUEOS)):
+                    eventos.append(evento)
+                evento = None
+                if len(eventos) == bloque:
+                    yield _eventos(eventos, listing)
+                    eventos = []
+            elif evento is not None:
+                evento[nombre] = valor.strip()
+    if eventos:
+        yield _eventos(eventos, listing)
+
+
+def _eventos(eventos, listing):
+    tarifas = [e.get("X-TARIFA", e.get("X-RATE", "")) for e in eventos]
+    return ([listing] * len(eventos), _fechas([e["DTSTART"] for e in eventos]),
+            _fechas([e["DTEND"] for e in eventos]), _montos(tarifas))
+
+
+def bloques(path, bloque=BLOQUE, listing=None, formato=None):
+    """
+    Itera (propiedades, check-in, check-out, tarifa) de a `bloque` reservas.
+    Sin columna de propiedad (o en iCal) las reservas son de `listing`, o del
+    nombre del archivo. `formato` es el de las fechas del CSV (ver _fechas).
+    """
+    listing = listing or os.path.splitext(os.path.basename(path))[0]
+    if path.lower().endswith((".ics", ".ical")):
+        return _bloques_ical(path, bloque, listing)
+    return _bloques_csv(path, bloque, listing, formato)
+
+
+# ── Reparto por mes ───────────────────────────────────────────────────────────
+def repartir(d0, d1, tarifa):
+    """
+    Tramos (reserva, mes, noches, ingresos) de las estadías [d0, d1): una fila
+    por mes calendario que toca cada reserva, con las noches de ese mes.
+    """
+    m0 = d0.astype("datetime64[M]")
+    k  = ((d1 - 1).astype("datetime64[M]") - m0).astype(np.int64) + 1
+    fila  = np.repeat(np.arange(d0.size), k)
+    salto = np.arange(fila.size) - np.repeat(np.cumsum(k) - k, k)
+    mes   = m0[fila] + salto
+    desde = np.maximum(d0[fila], mes.astype("datetime64[D]"))
+    hasta = np.minimum(d1[fila], (mes + 1).astype("datetime64[D]"))
+    noches = (hasta - desde).astype(np.int64)
+    return fila, mes, noches, noches * tarifa[fila]
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# OCUPACIÓN  (propiedad × mes)
+# ═════════════════════════════════════════════════════════════════════════════
+class Ocupacion:
+    """
+    Series mensuales por propiedad: `noches`, `ingresos`, `noches_tarifa`
+    (noches con tarifa conocida, base del ADR) y `reservas` (por mes de
+    check-in), cada una de forma (propiedades, meses) sobre `meses`
+    (datetime64[M] contiguos).
+    """
+
+    def __init__(self, propiedades, meses, noches, ingresos, noches_tarifa, reservas):
+        self.propiedades   = list(propiedades)
+        self.meses         = meses
+        self.noches        = noches
+        self.ingresos      = ingresos
+        self.noches_tarifa = noches_tarifa
+        self.reservas      = reservas
+
+    @property
+    def adr(self):
+        """Ingresos / noches con tarifa; NaN en meses sin ese dato."""
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(self.noches_tarifa > 0, self.ingresos / self.noches_tarifa, np.nan)
+
+    def _fila(self, propiedad):
+        if propiedad is None:
+            if len(self.propiedades) != 1:
+                raise ValueError(f"Hay {len(self.propiedades)} propiedades: elija una "
+                                 f"({', '.join(self.propiedades[:5])}…)")
+            return 0
+        try:
+            return self.propiedades.index(str(propiedad))
+        except ValueError:
+            raise ValueError(f"Sin reservas para la propiedad {propiedad!r}") from None
+
+    def _observados(self, i, corte):
+        """Meses cerrados con datos: del primero con noches hasta el anterior a `corte`."""
+        corte = np.datetime64(corte or datetime.date.today(), "M")
+        con_datos = np.flatnonzero(self.noches[i] > 0)
+        if not con_datos.size:
+            return np.zeros(self.meses.size, dtype=bool)
+        return (self.meses >= self.meses[con_datos[0]]) & (self.meses < corte)
+
+    def reales(self, propiedad=None, horizonte=36, corte=None, inicio=None):
+        """
+        {"adr": (H,), "noches": (H,)} alineados con los meses del modelo
+        (mes 1 = `inicio`, por defecto START_DATE): el valor real en los meses
+        cerrados, NaN donde se proyecta con los parámetros.
+        """
+        if inicio is None:
+            from generar_flujo_caja import START_DATE as inicio
+        i   = self._fila(propiedad)
+        obs = self._observados(i, corte)
+        meses = np.datetime64(inicio, "M") + np.arange(horizonte)
+        pos   = (meses - self.meses[0]).astype(np.int64)
+        dentro = (pos >= 0) & (pos < self.meses.size)
+        pos    = np.where(dentro, pos, 0)
+        ok     = dentro & obs[pos]
+        return {
+            "adr":    np.where(ok, self.adr[i][pos], np.nan),
+            "noches": np.where(ok, self.noches[i][pos], np.nan),
+        }
+
+    def calibrar(self, propiedad=None, crec_adr=0.0, corte=None, inicio=None, meses=12):
+        """
+        {"adr", "noches"} para proyectar desde los últimos `meses` cerrados:
+        noches promedio y ADR del período, llevado al año 0 del modelo con
+        `crec_adr` (el modelo vuelve a aplicar el crecimiento por año).
+        """
+        if inicio is None:
+            from generar_flujo_caja import START_DATE as inicio
+        i   = self._fila(propiedad)
+        obs = np.flatnonzero(self._observados(i, corte))[-meses:]
+        if not obs.size:
+            raise ValueError("No hay meses cerrados con reservas para calibrar")
+        params = {"noches": float(self.noches[i][obs].mean())}
+        tarifadas = self.noches_tarifa[i][obs].sum()
+        if tarifadas > 0:
+            anio = int(self.meses[obs[-1]] - np.datetime64(inicio, "M")) // 12
+            adr  = self.ingresos[i][obs].sum() / tarifadas
+            params["adr"] = float(adr / (1 + crec_adr) ** anio)
+        return params
+
+    def filas(self):
+        """(propiedad, "AAAA-MM", noches, ingresos, adr, reservas) por mes."""
+        adr = self.adr
+        for i, prop in enumerate(self.propiedades):
+            for j, mes in enumerate(self.meses):
+                yield (prop, str(mes), int(self.noches[i, j]), float(self.ingresos[i, j]),
+                       float(adr[i, j]), int(self.reservas[i, j]))
+
+
+def leer_reservas(paths, bloque=BLOQUE, listing=None, formato=None):
+    """
+    Ocupacion de uno o más archivos CSV / iCal, leídos por bloques; `formato`
+    de las fechas del CSV como en _fechas (p.ej. "MDA" para M/D/AAAA).
+    """
+    if isinstance(paths, str):
+        paths = [paths]
+    codigos = {}                          # propiedad → código
+    acum    = {}                          # código · 2^32 + mes → [noches, ingresos, n_tarifa, reservas]
+
+    for path in paths:
+        for props, d0, d1, tarifa in bloques(path, bloque, listing, formato):
+            validas = ~(np.isnat(d0) | np.isnat(d1)) & (d1 > d0)
+            unicas, cod = np.unique(np.asarray(props, dtype=str)[validas], return_inverse=True)
+            cod = np.array([codigos.setdefault(p, len(codigos)) for p in unicas],
+                           dtype=np.int64)[cod]
+            d0, d1, tarifa = d0[validas], d1[validas], tarifa[validas]
+
+            fila, mes, noches, ingresos = repartir(d0, d1, tarifa)
+            con_tarifa = ~np.isnan(ingresos)
+            primero    = np.r_[True, fila[1:] != fila[:-1]]       # tramo del check-in
+            clave = (cod[fila] << 32) + mes.astype(np.int64)
+            unicas, inv = np.unique(clave, return_inverse=True)
+            sumas = np.stack([
+                np.bincount(inv, noches, unicas.size),
+                np.bincount(inv, np.where(con_tarifa, ingresos, 0.0), unicas.size),
+                np.bincount(inv, np.where(con_tarifa, noches, 0), unicas.size),
+                np.bincount(inv, primero, unicas.size),
+            ], axis=1)
+            for k, s in zip(unicas.tolist(), sumas):
+                if k in acum:
+                    acum[k] += s
+                else:
+                    acum[k] = s
+
+    if not acum:
+        raise ValueError("No hay reservas válidas en " + ", ".join(paths))
+    claves = np.fromiter(acum, dtype=np.int64, count=len(acum))
+    cod, mes = claves >> 32, claves & 0xFFFFFFFF
+    inicio = mes.min()
+    meses  = np.arange(inicio, mes.max() + 1).astype("datetime64[M]")
+    series = np.zeros((4, len(codigos), meses.size))
+    series[:, cod, mes - inicio] = np.array(list(acum.values())).T
+    return Ocupacion(codigos, meses, *series)
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# CLI
+# ═════════════════════════════════════════════════════════════════════════════
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("archivos", nargs="+", help="Exportaciones CSV o iCal (.ics)")
+    ap.add_argument("--csv", default=None, help="Series mensuales (por defecto: stdout)")
+    ap.add_argument("--listing", default=None,
+                    help="Propiedad de los archivos sin columna de propiedad (iCal)")
+    ap.add_argument("--formato-fecha", default=None, metavar="DMA|MDA|PATRÓN",
+                    help="Fechas con barras: DMA (por defecto), MDA (EE.UU.) o strptime")
+    ap.add_argument("--bloque", type=int, default=BLOQUE, help="Reservas por bloque")
+    args = ap.parse_args(argv)
+
+    t0 = time.perf_counter()
+    try:
+        ocup = leer_reservas(args.archivos, args.bloque, args.listing, args.formato_fecha)
+    except (OSError, ValueError) as e:
+        ap.error(str(e))
+
+    f = open(args.csv, "w", newline="", encoding="utf-8") if args.csv else sys.stdout
+    try:
+        w = csv.writer(f)
+        w.writerow(["propiedad", "mes", "noches", "ingresos", "adr", "reservas"])
+        for fila in ocup.filas():
+            w.writerow(["" if isinstance(v, float) and math.isnan(v) else v for v in fila])
+    finally:
+        if args.csv:
+            f.close()
+    print(f"{len(ocup.propiedades)} propiedades · {ocup.meses.size} meses "
+          f"({ocup.meses[0]} – {ocup.meses[-1]}) en {time.perf_counter() - t0:.2f}s",
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
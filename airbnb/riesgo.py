@@ -0,0 +1,238 @@
+"""
+Simulación Monte Carlo del Flujo de Caja (hoja "Riesgo").
+
+Muestrea adr, noches, crec_adr, comision y tasa desde distribuciones dadas y
+evalúa el flujo de build_flujo como un arreglo escenarios × meses (ModeloFlujo
+en lote, sin bucle por escenario). Los resultados se procesan por bloques de
+tamaño fijo con acumuladores de histograma, así la memoria no crece con N.
+
+    python riesgo.py --n 1000000 --chunk 20000 --seed 1 --out libro.xlsx
+"""
+
+import argparse
+import json
+
+import numpy as np
+
+from modelo import ModeloFlujo, PARAMETROS_DEFAULT
+
+PERCENTILES = (5, 50, 95)
+
+# Distribuciones: ("normal", media, desv) | ("lognormal", mu, sigma) |
+#                 ("uniforme", min, max) | ("triangular", min, moda, max) | valor fijo
+DISTRIBUCIONES_DEFAULT = {
+    "adr":      ("normal",     38_000, 4_000),
+    "noches":   ("triangular", 12, 21, 27),
+    "crec_adr": ("uniforme",   0.0, 0.05),
+    "comision": ("uniforme",   0.15, 0.20),
+    "tasa":     ("uniforme",   0.10, 0.14),
+}
+
+# Rango válido de cada parámetro muestreado
+LIMITES = {
+    "adr":      (0, None),
+    "noches":   (0, 31),
+    "crec_adr": (-1, None),
+    "comision": (0, 1),
+    "tasa":     (-0.99, None),
+}
+
+
+def muestrear(rng, dist, n):
+    """n muestras de `dist` (ver DISTRIBUCIONES_DEFAULT)."""
+    if not isinstance(dist, (tuple, list)):
+        return np.full(n, float(dist))
+    tipo, *args = dist
+    if tipo == "normal":
+        return rng.normal(args[0], args[1], n)
+    if tipo == "lognormal":
+        return rng.lognormal(args[0], args[1], n)
+    if tipo == "uniforme":
+        return rng.uniform(args[0], args[1], n)
+    if tipo == "triangular":
+        return rng.triangular(args[0], args[1], args[2], n)
+    raise ValueError(f"Distribución desconocida: {tipo!r}")
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# ACUMULADORES
+# ═════════════════════════════════════════════════════════════════════════════
+class HistogramaStream:
+    """
+    Histograma de ancho fijo que se ensancha (duplicando el ancho de bin) cuando
+    llegan valores fuera de rango. Memoria O(bins); cuantiles por interpolación
+    dentro del bin, con error máximo de un ancho de bin.
+    """
+
+    def __init__(self, bins=16384):
+        if bins % 2:
+            raise ValueError("bins debe ser par")
+        self.bins   = bins
+        self.counts = np.zeros(bins, dtype=np.int64)
+        self.lo     = None
+        self.width  = None
+        self.n      = 0
+        self.suma   = 0.0
+        self.nan    = 0
+
+    @property
+    def hi(self):
+        return self.lo + self.bins * self.width
+
+    def _ensanchar(self, abajo):
+        pares = self.counts.reshape(-1, 2).sum(axis=1)
+        nuevo = np.zeros_like(self.counts)
+        if abajo:
+            nuevo[self.bins // 2:] = pares
+            self.lo -= self.bins * self.width
+        else:
+            nuevo[:self.bins // 2] = pares
+        self.counts = nuevo
+        self.width *= 2
+
+    def agregar(self, x):
+        x = np.asarray(x, dtype=float).ravel()
+        validos = np.isfinite(x)
+        self.nan += int(x.size - validos.sum())
+        x = x[validos]
+        if not x.size:
+            return
+
+        xmin, xmax = float(x.min()), float(x.max())
+        if self.lo is None:
+            span = xmax - xmin
+            self.width = (span / self.bins * 1.01) if span > 0 else max(abs(xmin) * 1e-9, 1e-9)
+            self.lo    = xmin
+        while xmin < self.lo:
+            self._ensanchar(abajo=True)
+        while xmax >= self.hi:
+            self._ensanchar(abajo=False)
+
+        idx = ((x - self.lo) / self.width).astype(np.int64)
+        np.clip(idx, 0, self.bins - 1, out=idx)
+        self.counts += np.bincount(idx, minlength=self.bins)
+        self.n    += x.size
+        self.suma += float(x.sum())
+
+    def cuantil(self, q):
+        if not self.n:
+            return float("nan")
+        cum    = np.cumsum(self.counts)
+        target = q * self.n
+        i      = int(np.searchsorted(cum, target))
+        i      = min(i, self.bins - 1)
+        antes  = cum[i - 1] if i else 0
+        frac   = (target - antes) / self.counts[i] if self.counts[i] else 0.0
+        return self.lo + (i + frac) * self.width
+
+    @property
+    def media(self):
+        return self.suma / self.n if self.n else float("nan")
+
+
+class ConteoEntero:
+    """Distribución exacta de un entero en 0..maximo (mes de payback)."""
+
+    def __init__(self, maximo):
+        self.counts = np.zeros(maximo + 1, dtype=np.int64)
+        self.n      = 0
+        self.suma   = 0
+
+    def agregar(self, k):
+        k = np.asarray(k, dtype=np.int64).ravel()
+        self.counts += np.bincount(k, minlength=self.counts.size)
+        self.n      += k.size
+        self.suma   += int(k.sum())
+
+    def cuantil(self, q):
+        return int(np.searchsorted(np.cumsum(self.counts), q * self.n))
+
+    @property
+    def media(self):
+        return self.suma / self.n if self.n else float("nan")
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# SIMULACIÓN
+# ═════════════════════════════════════════════════════════════════════════════
+def simular(params=None, distribuciones=None, n=100_000, chunk=10_000,
+            seed=None, bins=16384):
+    """
+    Corre `n` escenarios en bloques de `chunk` y devuelve un dict con P5/P50/P95,
+    medias y probabilidades de VAN, TIR anual, flujo acumulado final y payback.
+    """
+    params = {**PARAMETROS_DEFAULT, **(params or {})}
+    dists  = {**DISTRIBUCIONES_DEFAULT, **(distribuciones or {})}
+    horizonte = int(params["horizonte"])
+    rng = np.random.default_rng(seed)
+
+    acc = {
+        "van":              HistogramaStream(bins),
+        "tir_anual":        HistogramaStream(bins),
+        "flujo_acum_final": HistogramaStream(bins),
+    }
+    payback    = ConteoEntero(horizonte)
+    van_neg    = 0
+
+    hechos = 0
+    while hechos < n:
+        m = min(chunk, n - hechos)
+        lote = dict(params)
+        for key, dist in dists.items():
+            x = muestrear(rng, dist, m)
+            lo, hi = LIMITES.get(key, (None, None))
+            lote[key] = np.clip(x, lo, hi) if (lo, hi) != (None, None) else x
+
+        modelo = ModeloFlujo(lote, horizonte=horizonte)
+        van = modelo.van
+        acc["van"].agregar(van)
+        acc["tir_anual"].agregar(modelo.tir_anual)
+        acc["flujo_acum_final"].agregar(modelo.filas["flujo_acum"][:, -1])
+        payback.agregar(modelo.payback_meses)
+        van_neg += int(np.sum(van < 0))
+        hechos  += m
+
+    pct = {k: {q: a.cuantil(q / 100) for q in PERCENTILES} for k, a in acc.items()}
+    pct["payback"] = {q: payback.cuantil(q / 100) for q in PERCENTILES}
+
+    return {
+        "n":           n,
+        "horizonte":   horizonte,
+        "distribuciones": dists,
+        "percentiles": pct,
+        "media": {**{k: a.media for k, a in acc.items()}, "payback": payback.media},
+        "prob_van_negativo":  van_neg / n,
+        "prob_tir_nd":        acc["tir_anual"].nan / n,
+        "prob_no_recuperado": int(payback.counts[horizonte]) / n,
+    }
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--n", type=int, default=100_000, help="Escenarios")
+    ap.add_argument("--chunk", type=int, default=10_000, help="Escenarios por bloque")
+    ap.add_argument("--seed", type=int, default=None)
+    ap.add_argument("--distribuciones", default=None,
+                    help="JSON {clave: [tipo, args...]} que reemplaza a las por defecto")
+    ap.add_argument("--out", default=None, help="Escribe el libro con la hoja Riesgo")
+    args = ap.parse_args(argv)
+
+    dists = None
+    if args.distribuciones:
+        with open(args.distribuciones, encoding="utf-8") as f:
+            dists = json.load(f)
+
+    res = simular(distribuciones=dists, n=args.n, chunk=args.chunk, seed=args.seed)
+    for k, v in res["percentiles"].items():
+        print(f"{k:18s} " + "  ".join(f"P{q}={x:,.4g}" for q, x in v.items()))
+    print(f"P(VAN<0)={res['prob_van_negativo']:.1%}  "
+          f"P(no recuperado)={res['prob_no_recuperado']:.1%}")
+
+    if args.out:
+        from generar_flujo_caja import generar_libro
+        generar_libro(out=args.out, riesgo=res)
+        print(f"Archivo guardado: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Sensibilidad del Flujo de Caja (hoja "Sensibilidad").
+
+Grillas 2-D de VAN y TIR anual sobre pares de parámetros (p.ej. ADR × noches,
+comisión × tasa) y un ranking tornado de qué parámetro mueve más el VAN.
+Cada grilla es una sola evaluación de ModeloFlujo por broadcasting
+(x como columna, y como fila), sin tabla What-If ni fórmulas por celda.
+
+    python sensibilidad.py --pares adr:noches comision:tasa --n 11 --out libro.xlsx
+"""
+
+import argparse
+
+import numpy as np
+
+from modelo import ModeloFlujo, PARAMETROS_DEFAULT
+from riesgo import LIMITES
+
+PARES_DEFAULT = (("adr", "noches"), ("comision", "tasa"))
+
+# Parámetros del tornado (horizonte cambia la forma del flujo: se excluye)
+TORNADO = ("gracia", "adr", "noches", "crec_adr", "comision", "g_comunes",
+           "servicios", "fondo", "dividendo", "inversion", "tasa")
+ENTEROS = {"gracia"}
+
+
+def variar(key, base, delta, n):
+    """`n` valores de `key` en base·(1 ± delta), recortados a LIMITES."""
+    valores = np.linspace(base * (1 - delta), base * (1 + delta), n)
+    lo, hi = LIMITES.get(key, (None, None))
+    if (lo, hi) != (None, None):
+        valores = np.clip(valores, lo, hi)
+    if key in ENTEROS:
+        valores = np.round(valores)
+    return valores
+
+
+def _indice_base(valores, base):
+    """Índice del valor de la grilla igual a `base` (salvo redondeo de linspace)."""
+    i = int(np.argmin(np.abs(valores - base)))
+    return i if np.isclose(valores[i], base, rtol=1e-9, atol=1e-12) else None
+
+
+def grilla(x, y, params=None, n=11, delta=0.3, valores_x=None, valores_y=None):
+    """
+    VAN y TIR anual para cada combinación de `x` (filas) e `y` (columnas).
+    Una sola evaluación: x con forma (nx, 1) e y con forma (1, ny).
+    `base` = [i, j] es la celda del caso base (None en el eje que no lo incluye).
+    """
+    params = {**PARAMETROS_DEFAULT, **(params or {})}
+    vx = np.asarray(valores_x if valores_x is not None
+                    else variar(x, params[x], delta, n), dtype=float)
+    vy = np.asarray(valores_y if valores_y is not None
+                    else variar(y, params[y], delta, n), dtype=float)
+
+    modelo = ModeloFlujo({**params, x: vx[:, None], y: vy[None, :]},
+                         horizonte=int(params["horizonte"]))
+    forma = (vx.size, vy.size)
+    return {
+        "x":         x,
+        "y":         y,
+        "valores_x": vx.tolist(),
+        "valores_y": vy.tolist(),
+        "base":      [_indice_base(vx, params[x]), _indice_base(vy, params[y])],
+        "van":       np.broadcast_to(modelo.van, forma).tolist(),
+        "tir_anual": np.broadcast_to(modelo.tir_anual, forma).tolist(),
+    }
+
+
+def tornado(params=None, delta=0.2, claves=TORNADO):
+    """
+    VAN con cada parámetro en base·(1 - delta) y base·(1 + delta), el resto fijo.
+    Los 2·k escenarios se evalúan en un lote; se ordena por rango de VAN.
+    """
+    params = {**PARAMETROS_DEFAULT, **(params or {})}
+    k = len(claves)
+    lote = {key: np.full(2 * k, float(v)) for key, v in params.items()}
+    for i, key in enumerate(claves):
+        lote[key][2 * i:2 * i + 2] = variar(key, float(params[key]), delta, 2)
+
+    van = ModeloFlujo(lote, horizonte=int(params["horizonte"])).van
+    filas = [{
+        "parametro": key,
+        "bajo":      float(lote[key][2 * i]),
+        "alto":      float(lote[key][2 * i + 1]),
+        "van_bajo":  float(van[2 * i]),
+        "van_alto":  float(van[2 * i + 1]),
+    } for i, key in enumerate(claves)]
+    return sorted(filas, key=lambda f: -abs(f["van_alto"] - f["van_bajo"]))
+
+
+def analizar(params=None, pares=PARES_DEFAULT, n=11, delta=0.3, delta_tornado=0.2):
+    """Resultado completo para build_sensibilidad."""
+    params = {**PARAMETROS_DEFAULT, **(params or {})}
+    return {
+        "params":   {k: float(v) for k, v in params.items()},
+        "van_base": float(ModeloFlujo(params).van),
+        "grillas":  [grilla(x, y, params, n, delta) for x, y in pares],
+        "tornado":  tornado(params, delta_tornado),
+        "delta_tornado": delta_tornado,
+    }
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--pares", nargs="+", default=[f"{x}:{y}" for x, y in PARES_DEFAULT],
+                    help="Pares x:y de claves de P_ROW")
+    ap.add_argument("--n", type=int, default=11, help="Puntos por eje")
+    ap.add_argument("--delta", type=float, default=0.3, help="Variación relativa de los ejes")
+    ap.add_argument("--delta-tornado", type=float, default=0.2)
+    ap.add_argument("--out", default=None, help="Escribe el libro con la hoja Sensibilidad")
+    args = ap.parse_args(argv)
+
+    pares = [tuple(par.split(":", 1)) for par in args.pares]
+    for par in pares:
+        if len(par) != 2 or not set(par) <= set(TORNADO):
+            raise SystemExit(f"Par inválido: {':'.join(par)!r}")
+
+    res = analizar(pares=pares, n=args.n, delta=args.delta,
+                   delta_tornado=args.delta_tornado)
+    print(f"VAN base: {res['van_base']:,.0f}")
+    for f in res["tornado"]:
+        print(f"{f['parametro']:10s} VAN {f['van_bajo']:>14,.0f} … {f['van_alto']:>14,.0f}")
+
+    if args.out:
+        from generar_flujo_caja import generar_libro
+        generar_libro(out=args.out, sensibilidad=res)
+        print(f"Archivo guardado: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,451 @@
+"""
+Servicio HTTP local (asyncio) que genera libros y KPIs bajo demanda.
+
+    python servicio.py --puerto 8750 --workers 4 --cola 16 --lru-mb 256
+
+    POST /libro[?backend=stream&formulas=compartidas]   cuerpo JSON {clave: valor}
+         → xlsx (application/vnd.openxmlformats-officedocument.spreadsheetml.sheet)
+    POST /kpis                                          → JSON de KPIs (como cli.py --summary json)
+    GET  /metricas                                      → latencias, cola, LRU
+    GET  /salud
+
+build_parametros / build_flujo / build_resumen corren en un ProcessPoolExecutor
+de `workers` procesos; el libro se guarda en un io.BytesIO en el worker y los
+bytes viajan directo a la respuesta, sin archivo temporal. A lo más `workers`
+trabajos están en el pool: el resto espera en la cola del servicio, acotada a
+`cola`; con la cola llena se responde 503 con Retry-After (contrapresión en vez
+de encolar sin límite). Los pedidos idénticos en curso comparten el mismo
+trabajo y los resultados recientes quedan en un LRU en memoria por parámetros.
+
+Solo escucha en localhost por defecto: no hay autenticación.
+"""
+
+import argparse
+import asyncio
+import collections
+import http
+import io
+import json
+import multiprocessing
+import os
+import sys
+import time
+import urllib.parse
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from cache_libros import huella
+from parametros import PARAMETROS_DEFAULT, numero, validar
+
+HOST_DEFAULT   = "127.0.0.1"
+PUERTO_DEFAULT = 8750
+COLA_DEFAULT   = 16
+LRU_MB_DEFAULT = 256
+MAX_CUERPO     = 1 * 2**20          # bytes del cuerpo JSON
+TIMEOUT_LECTURA = 30                # segundos por pedido
+MUESTRAS       = 2048               # latencias recientes por ruta (percentiles)
+
+RUTAS = ("/libro", "/kpis", "/metricas", "/salud")
+XLSX  = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+JSON  = "application/json; charset=utf-8"
+
+
+class ErrorHTTP(Exception):
+    def __init__(self, estado, mensaje, cabeceras=()):
+        super().__init__(mensaje)
+        self.estado    = estado
+        self.cabeceras = cabeceras
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# WORKERS  (corren en el proceso hijo)
+# ═════════════════════════════════════════════════════════════════════════════
+def _precargar():
+    """Inicializador del pool: importa openpyxl / NumPy antes del primer pedido."""
+    import generar_flujo_caja  # noqa: F401
+
+
+def _libro(params, backend, formulas):
+    from generar_flujo_caja import generar_libro
+
+    buf = io.BytesIO()
+    generar_libro(params, buf, backend=backend, formulas=formulas)
+    return buf.getvalue()
+
+
+def _kpis(params):
+    from cli import resumen
+
+    return json.dumps({"params": params, "kpis": resumen(params)},
+                      ensure_ascii=False).encode("utf-8")
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# LRU Y MÉTRICAS
+# ═════════════════════════════════════════════════════════════════════════════
+class LRU:
+    """Resultados (bytes) por clave, acotado en bytes; desaloja el menos usado."""
+
+    def __init__(self, max_bytes=LRU_MB_DEFAULT * 2**20):
+        self.max_bytes = max_bytes
+        self.bytes     = 0
+        self.hits      = 0
+        self.misses    = 0
+        self.desalojos = 0
+        self._datos    = collections.OrderedDict()
+
+    def obtener(self, clave):
+        valor = self._datos.get(clave)
+        if valor is None:
+            self.misses += 1
+            return None
+        self._datos.move_to_end(clave)
+        self.hits += 1
+        return valor
+
+    def guardar(self, clave, valor):
+        if len(valor) > self.max_bytes or clave in self._datos:
+            return
+        self._datos[clave] = valor
+        self.bytes += len(valor)
+        while self.bytes > self.max_bytes:
+            _, viejo = self._datos.popitem(last=False)
+            self.bytes -= len(viejo)
+            self.desalojos += 1
+
+    def estadisticas(self):
+        consultas = self.hits + self.misses
+        return {
+            "entradas":  len(self._datos),
+            "bytes":     self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits":      self.hits,
+            "misses":    self.misses,
+            "hit_rate":  self.hits / consultas if consultas else 0.0,
+            "desalojos": self.desalojos,
+        }
+
+
+def _percentiles(muestras):
+    if not muestras:
+        return {"n": 0}
+    orden = sorted(muestras)
+
+    def q(p):
+        return round(orden[min(len(orden) - 1, int(p * len(orden)))] * 1000, 3)
+    return {"n": len(orden), "p50_ms": q(0.50), "p90_ms": q(0.90), "p99_ms": q(0.99),
+            "max_ms": round(orden[-1] * 1000, 3)}
+
+
+class Metricas:
+    """
+    Latencia total por ruta, y por trabajo del pool la espera en cola y el
+    tiempo en el worker (ventana de las últimas MUESTRAS). Si la espera crece
+    mientras el tiempo en worker se mantiene, faltan workers.
+    """
+
+    def __init__(self, muestras=MUESTRAS):
+        self.inicio     = time.time()
+        self.latencias  = collections.defaultdict(lambda: collections.deque(maxlen=muestras))
+        self.espera     = collections.deque(maxlen=muestras)
+        self.worker     = collections.deque(maxlen=muestras)
+        self.respuestas = collections.Counter()
+        self.rechazos   = 0
+        self.cola_max   = 0
+
+    def pedido(self, ruta, estado, segundos):
+        self.latencias[ruta].append(segundos)
+        self.respuestas[str(estado)] += 1
+
+    def trabajo(self, espera, worker):
+        self.espera.append(espera)
+        self.worker.append(worker)
+
+    def resumen(self):
+        return {
+            "uptime_s":   round(time.time() - self.inicio, 1),
+            "respuestas": dict(self.respuestas),
+            "rechazos":   self.rechazos,
+            "latencia":   {ruta: _percentiles(m) for ruta, m in self.latencias.items()},
+            "espera_cola": _percentiles(self.espera),
+            "en_worker":  _percentiles(self.worker),
+            "cola_max":   self.cola_max,
+        }
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# SERVICIO
+# ═════════════════════════════════════════════════════════════════════════════
+def leer_cuerpo(cuerpo):
+    """{clave: número} completo y validado desde el JSON del pedido."""
+    try:
+        datos = json.loads(cuerpo or b"{}")
+    except ValueError as e:
+        raise ValueError(f"JSON inválido: {e}") from None
+    if isinstance(datos, dict) and isinstance(datos.get("params"), dict):
+        datos = datos["params"]
+    if not isinstance(datos, dict):
+        raise ValueError("El cuerpo debe ser un objeto JSON {clave: valor}")
+    desconocidas = set(datos) - set(PARAMETROS_DEFAULT)
+    if desconocidas:
+        raise ValueError(f"Claves desconocidas {sorted(desconocidas)}")
+    params = dict(PARAMETROS_DEFAULT)
+    params.update({k: numero(v) for k, v in datos.items() if v not in (None, "")})
+    validar(params)
+    return params
+
+
+class Servicio:
+    """
+    Pool acotado + cola con contrapresión + LRU. `trabajos` cuenta los
+    pedidos aceptados aún sin resultado: los primeros `workers` están en el
+    pool y el resto en cola.
+    """
+
+    def __init__(self, workers=None, cola=COLA_DEFAULT, lru_bytes=LRU_MB_DEFAULT * 2**20):
+        self.workers  = workers or os.cpu_count() or 1
+        self.max_cola = cola
+        self.lru      = LRU(lru_bytes)
+        self.metricas = Metricas()
+        self.trabajos = 0
+        self._pool    = None
+        self._cupos   = None
+        self._en_vuelo = {}
+
+    @property
+    def en_cola(self):
+        return max(self.trabajos - self.workers, 0)
+
+    def _nuevo_pool(self):
+        # forkserver, no fork: el pool arranca sus procesos a demanda, en medio
+        # de un pedido, y un fork heredaría el socket de escucha y los de los
+        # clientes abiertos (Connection: close nunca llegaría a EOF).
+        return ProcessPoolExecutor(max_workers=self.workers, initializer=_precargar,
+                                   mp_context=multiprocessing.get_context("forkserver"))
+
+    def iniciar(self):
+        self._pool  = self._nuevo_pool()
+        self._cupos = asyncio.Semaphore(self.workers)
+
+    def cerrar(self):
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+
+    async def _ejecutar(self, fn, *args):
+        t0 = time.perf_counter()
+        pool = None
+        try:
+            async with self._cupos:
+                t1 = time.perf_counter()
+                pool = self._pool
+                resultado = await asyncio.get_running_loop().run_in_executor(pool, fn, *args)
+                self.metricas.trabajo(t1 - t0, time.perf_counter() - t1)
+                return resultado
+        except BrokenProcessPool:
+            # Un worker murió (OOM, señal): el pool no se recupera solo. Todos los
+            # trabajos en vuelo fallan juntos; solo el primero lo reemplaza.
+            if pool is not None and self._pool is pool:
+                pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = self._nuevo_pool()
+            raise
+        finally:
+            self.trabajos -= 1
+
+    async def resultado(self, tipo, params, opciones=()):
+        """
+        (bytes, origen) del trabajo `tipo` ("libro" o "kpis"); origen es "hit"
+        (LRU), "compartido" (mismo pedido ya en curso) o "miss".
+        """
+        clave = huella({"tipo": tipo, "params": {k: float(v) for k, v in params.items()},
+                        "opciones": list(opciones)})
+        valor = self.lru.obtener(clave)
+        if valor is not None:
+            return valor, "hit"
+
+        tarea  = self._en_vuelo.get(clave)
+        origen = "compartido"
+        if tarea is None:
+            origen = "miss"
+            if self.trabajos >= self.workers + self.max_cola:
+                self.metricas.rechazos += 1
+                raise ErrorHTTP(503, f"Cola llena ({self.max_cola} pedidos en espera)",
+                                [("Retry-After", "1")])
+            self.trabajos += 1
+            self.metricas.cola_max = max(self.metricas.cola_max, self.en_cola)
+            fn = _libro if tipo == "libro" else _kpis
+            tarea = asyncio.ensure_future(self._ejecutar(fn, params, *opciones))
+            self._en_vuelo[clave] = tarea
+            tarea.add_done_callback(lambda t: self._terminar(clave, t))
+        # shield: si el cliente se desconecta, el trabajo compartido sigue
+        return await asyncio.shield(tarea), origen
+
+    def _terminar(self, clave, tarea):
+        del self._en_vuelo[clave]
+        if not tarea.cancelled() and tarea.exception() is None:
+            self.lru.guardar(clave, tarea.result())
+
+    def estado(self):
+        return {
+            "workers":   self.workers,
+            "trabajos":  self.trabajos,
+            "en_pool":   min(self.trabajos, self.workers),
+            "en_cola":   self.en_cola,
+            "max_cola":  self.max_cola,
+            "lru":       self.lru.estadisticas(),
+            **self.metricas.resumen(),
+        }
+
+    # ── HTTP ──────────────────────────────────────────────────────────────────
+    async def atender(self, ruta, metodo, query, cuerpo):
+        """(estado, tipo, bytes, cabeceras extra) de un pedido."""
+        if ruta == "/salud" and metodo == "GET":
+            return 200, JSON, b'{"ok": true}', []
+        if ruta == "/metricas" and metodo == "GET":
+            return 200, JSON, json.dumps(self.estado(), ensure_ascii=False).encode(), []
+        if ruta not in ("/libro", "/kpis"):
+            raise ErrorHTTP(404, f"Ruta desconocida: {ruta}")
+        if metodo != "POST":
+            raise ErrorHTTP(405, "Use POST", [("Allow", "POST")])
+
+        try:
+            params = leer_cuerpo(cuerpo)
+        except ValueError as e:
+            raise ErrorHTTP(400, str(e)) from None
+
+        if ruta == "/kpis":
+            datos, origen = await self.resultado("kpis", params)
+            return 200, JSON, datos, [("X-Cache", origen)]
+
+        backend  = query.get("backend", "openpyxl")
+        formulas = query.get("formulas", "celda")
+        if backend not in ("openpyxl", "stream"):
+            raise ErrorHTTP(400, f"Backend desconocido: {backend!r}")
+        if formulas not in ("celda", "compartidas"):
+            raise ErrorHTTP(400, f"Modo de fórmulas desconocido: {formulas!r}")
+        datos, origen = await self.resultado("libro", params, (backend, formulas))
+        return 200, XLSX, datos, [("X-Cache", origen),
+                                  ("Content-Disposition",
+                                   'attachment; filename="flujo_caja_airbnb.xlsx"')]
+
+    async def conexion(self, reader, writer):
+        """Una conexión HTTP/1.1 (keep-alive salvo Connection: close)."""
+        try:
+            while True:
+                try:
+                    pedido = await asyncio.wait_for(_leer_pedido(reader), TIMEOUT_LECTURA)
+                except ErrorHTTP as e:
+                    await _responder(writer, e.estado, JSON, _error(e), e.cabeceras, False)
+                    return
+                if pedido is None:
+                    return
+                metodo, ruta, query, cabeceras, cuerpo = pedido
+                seguir = cabeceras.get("connection", "").lower() != "close"
+
+                t0 = time.perf_counter()
+                try:
+                    estado, tipo, datos, extra = await self.atender(ruta, metodo, query, cuerpo)
+                except ErrorHTTP as e:
+                    estado, tipo, datos, extra = e.estado, JSON, _error(e), e.cabeceras
+                except ValueError as e:         # parámetros que rechaza el generador
+                    estado, tipo, datos, extra = 400, JSON, _error(e), []
+                except Exception as e:          # el worker falló: error del generador
+                    estado, tipo, datos, extra = (500, JSON,
+                                                  _error(f"{type(e).__name__}: {e}"), [])
+                await _responder(writer, estado, tipo, datos, extra, seguir)
+                self.metricas.pedido(ruta if ruta in RUTAS else "otras", estado,
+                                     time.perf_counter() - t0)
+                if not seguir:
+                    return
+        except (asyncio.TimeoutError, ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+def _error(e):
+    return json.dumps({"error": str(e)}, ensure_ascii=False).encode("utf-8")
+
+
+async def _leer_pedido(reader):
+    """(método, ruta, query, cabeceras, cuerpo); None si el cliente cerró."""
+    linea = await reader.readline()
+    if not linea.strip():
+        return None
+    try:
+        metodo, destino, _ = linea.decode("latin-1").split()
+    except ValueError:
+        raise ErrorHTTP(400, "Línea de pedido inválida") from None
+
+    cabeceras = {}
+    while True:
+        linea = await reader.readline()
+        if linea in (b"\r\n", b"\n", b""):
+            break
+        nombre, _, valor = linea.decode("latin-1").partition(":")
+        cabeceras[nombre.strip().lower()] = valor.strip()
+
+    try:
+        largo = int(cabeceras.get("content-length") or 0)
+    except ValueError:
+        raise ErrorHTTP(400, "Content-Length inválido") from None
+    if largo < 0:
+        raise ErrorHTTP(400, "Content-Length inválido")
+    if largo > MAX_CUERPO:
+        raise ErrorHTTP(413, f"Cuerpo de más de {MAX_CUERPO} bytes")
+    cuerpo = await reader.readexactly(largo) if largo else b""
+
+    url = urllib.parse.urlsplit(destino)
+    query = dict(urllib.parse.parse_qsl(url.query))
+    return metodo.upper(), url.path, query, cabeceras, cuerpo
+
+
+async def _responder(writer, estado, tipo, datos, extra=(), seguir=True):
+    cabeceras = [("Content-Type", tipo), ("Content-Length", str(len(datos))),
+                 ("Connection", "keep-alive" if seguir else "close"), *extra]
+    texto = f"HTTP/1.1 {estado} {http.HTTPStatus(estado).phrase}\r\n" + "".join(
+        f"{k}: {v}\r\n" for k, v in cabeceras) + "\r\n"
+    writer.write(texto.encode("latin-1") + datos)
+    await writer.drain()
+
+
+async def servir(host=HOST_DEFAULT, puerto=PUERTO_DEFAULT, workers=None, cola=COLA_DEFAULT,
+                 lru_bytes=LRU_MB_DEFAULT * 2**20, listo=None):
+    """Atiende hasta ser cancelado. `listo(servidor)` se llama al empezar a escuchar."""
+    servicio = Servicio(workers, cola, lru_bytes)
+    servicio.iniciar()
+    try:
+        servidor = await asyncio.start_server(servicio.conexion, host, puerto)
+        async with servidor:
+            if listo is not None:
+                listo(servidor)
+            await servidor.serve_forever()
+    finally:
+        servicio.cerrar()
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--host", default=HOST_DEFAULT)
+    ap.add_argument("--puerto", type=int, default=PUERTO_DEFAULT)
+    ap.add_argument("--workers", type=int, default=None,
+                    help="Procesos del pool (por defecto: os.cpu_count())")
+    ap.add_argument("--cola", type=int, default=COLA_DEFAULT,
+                    help="Pedidos en espera antes de responder 503")
+    ap.add_argument("--lru-mb", type=float, default=LRU_MB_DEFAULT,
+                    help="Tamaño del LRU de resultados en memoria")
+    args = ap.parse_args(argv)
+
+    def listo(servidor):
+        host, puerto = servidor.sockets[0].getsockname()[:2]
+        print(f"Escuchando en http://{host}:{puerto} (Ctrl+C para terminar)", file=sys.stderr)
+
+    try:
+        asyncio.run(servir(args.host, args.puerto, args.workers, args.cola,
+                           int(args.lru_mb * 2**20), listo))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,259 @@
+"""
+Backend de escritura en streaming (openpyxl write_only).
+
+La hoja Flujo de Caja Mensual se emite fila a fila con las mismas fórmulas y
+estilos que build_flujo, así la memoria no crece con horizonte × filas. Las
+hojas chicas (Parámetros, Resumen, Riesgo) reutilizan sus builders sobre un
+buffer que se vuelca ordenado al final.
+
+Se selecciona con generar_libro(..., backend="stream").
+"""
+
+import openpyxl
+from openpyxl.cell import Cell, WriteOnlyCell
+from openpyxl.utils.cell import (column_index_from_string, coordinate_from_string,
+                                 coordinate_to_tuple)
+
+import generar_flujo_caja as g
+from modelo import ModeloFlujo, PARAMETROS_DEFAULT
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# HOJAS CHICAS: buffer con la API de Worksheet que usan los builders
+# ═════════════════════════════════════════════════════════════════════════════
+class HojaBuffer:
+    """
+    Envuelve una WriteOnlyWorksheet: acepta ws["A1"], ws.cell(), merge_cells y
+    dimensiones en cualquier orden, y escribe las filas ordenadas en volcar().
+    """
+
+    def __init__(self, ws):
+        self._ws     = ws
+        self._celdas = {}
+
+    def __getattr__(self, name):
+        # column_dimensions, row_dimensions, sheet_view, title…
+        return getattr(self._ws, name)
+
+    @property
+    def freeze_panes(self):
+        return self._ws.freeze_panes
+
+    @freeze_panes.setter
+    def freeze_panes(self, ref):
+        self._ws.freeze_panes = ref
+
+    def __getitem__(self, coord):
+        row, col = coordinate_to_tuple(coord)
+        return self.cell(row, col)
+
+    def cell(self, row, column, value=None):
+        c = self._celdas.get((row, column))
+        if c is None:
+            c = self._celdas[row, column] = Cell(self._ws, row=row, column=column)
+        if value is not None:
+            c.value = value
+        return c
+
+    def merge_cells(self, rango):
+        self._ws.merged_cells.add(rango)
+
+    def volcar(self):
+        if not self._celdas:
+            return
+        max_row = max(r for r, _ in self._celdas)
+        max_col = max(c for _, c in self._celdas)
+        for r in range(1, max_row + 1):
+            self._ws.append([self._celdas.get((r, c)) for c in range(1, max_col + 1)])
+        self._celdas.clear()
+
+
+class LibroStream:
+    """Workbook write_only cuyo create_sheet devuelve HojaBuffer."""
+
+    def __init__(self):
+        self.wb     = openpyxl.Workbook(write_only=True)
+        self._hojas = []
+
+    def create_sheet(self, title):
+        hoja = HojaBuffer(self.wb.create_sheet(title))
+        self._hojas.append(hoja)
+        return hoja
+
+    def save(self, out):
+        for hoja in self._hojas:
+            hoja.volcar()
+        self.wb.save(out)
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# HOJA 2 – FLUJO DE CAJA MENSUAL  (fila a fila)
+# ═════════════════════════════════════════════════════════════════════════════
+class ValoresFlujo:
+    """
+    Cache de la hoja Flujo de Caja como vista sobre el ModeloFlujo: responde
+    `ref in` y `[ref]` como el {celda: valor} de build_flujo, sin una entrada
+    por celda (horizonte × filas) que haría crecer la memoria.
+    """
+
+    def __init__(self, modelo, lay, compartidas=False):
+        self._modelo = modelo
+        self._h      = lay.horizonte
+        self._filas  = {row_num: g.FC_KEY[row_num] for row_num, *_ in g.FC_DATA_ROWS}
+        self._gracia = g.FC_HELPER_ROWS["gracia"] if compartidas else None
+
+    def _mes(self, ref):
+        """(mes, fila); mes = horizonte + 1 en la columna TOTAL, 0 fuera de rango."""
+        col, row = coordinate_from_string(ref)
+        m = column_index_from_string(col) - 1
+        if row in self._filas:
+            return (m if 1 <= m <= self._h + 1 else 0), row
+        return (m if row == self._gracia and 1 <= m <= self._h else 0), row
+
+    def __bool__(self):
+        return True
+
+    def __contains__(self, ref):
+        return self._mes(ref)[0] > 0
+
+    def __getitem__(self, ref):
+        m, row = self._mes(ref)
+        if not m:
+            raise KeyError(ref)
+        if row == self._gracia:
+            return bool(m <= self._modelo.params["gracia"])
+        key = self._filas[row]
+        return self._modelo.totales[key] if m > self._h else self._modelo.filas[key][m - 1]
+
+
+def build_flujo_stream(libro, modelo=None, lay=None, compartidas=False, reales=None):
+    """Equivalente a build_flujo sobre un LibroStream; devuelve el cache de valores."""
+    lay = lay or g.layout()
+    formula = g.fc_formula_compartida if compartidas else g.fc_formula
+    ws = libro.wb.create_sheet("Flujo de Caja Mensual")
+    ws.sheet_view.showGridLines = False
+
+    # ── Anchos y alturas (antes de escribir filas) ──
+    ws.column_dimensions["A"].width = 32
+    for col in lay.cols:
+        ws.column_dimensions[col].width = 11
+    ws.column_dimensions[lay.total_col].width = 15
+
+    for row_num, height in [(1, 38), (2, 28), (3, 20)]:
+        ws.row_dimensions[row_num].height = height
+    for row_num in g.FC_SECTION_ROWS:
+        ws.row_dimensions[row_num].height = 22
+    for row_num, *_ in g.FC_DATA_ROWS:
+        ws.row_dimensions[row_num].height = 20
+    if compartidas:
+        for row_num in g.FC_HELPER_ROWS.values():
+            ws.row_dimensions[row_num].height = 14
+
+    ws.freeze_panes = "B4"
+
+    def celda(value=None, **estilo):
+        c = WriteOnlyCell(ws, value)
+        g.style_cell(c, **estilo)
+        return c
+
+    def titulo(value, bg, size, h):
+        c = WriteOnlyCell(ws, value)
+        g.style_cell(c, bg=bg, fg=g.C_WHITE, bold=True, size=size, h=h, border=False)
+        return c
+
+    # ── Fila 1: Título ──
+    ws.merged_cells.add(f"A1:{lay.total_col}1")
+    ws.append([titulo("FLUJO DE CAJA MENSUAL  –  AIRBNB", g.C_DARK, 14, "center")])
+
+    # ── Fila 2: "Mes N" / "TOTAL" ──
+    ws.append(
+        [celda("Concepto", bg=g.C_DARK, fg=g.C_WHITE, bold=True, h="left")]
+        + [celda(f"Mes {m}", bg=g.C_ACCENT if lay.en_gracia(m) else g.C_BLUE,
+                 fg=g.C_WHITE, bold=True, size=9, h="center")
+           for m in lay.meses]
+        + [celda("TOTAL / FINAL", bg=g.C_INDIGO, fg=g.C_WHITE, bold=True, size=9,
+                 h="center")]
+    )
+
+    # ── Fila 3: período ──
+    ws.append(
+        [celda("Período", bg="2C3E50", fg=g.C_WHITE, bold=True, size=9, h="left")]
+        + [celda(g.periodo(m), bg="2C3E50", fg=g.C_WHITE, size=8, h="center")
+           for m in lay.meses]
+        + [celda(f"{lay.horizonte} meses", bg="2C3E50", fg=g.C_WHITE, size=8,
+                 h="center")]
+    )
+
+    # ── Filas 4..18: secciones y datos ──
+    datos = {row_num: rest for row_num, *rest in g.FC_DATA_ROWS}
+
+    for row_num in range(4, max(datos) + 1):
+        if row_num in g.FC_SECTION_ROWS:
+            texto, color = g.FC_SECTION_ROWS[row_num]
+            ws.merged_cells.add(f"A{row_num}:{lay.total_col}{row_num}")
+            ws.append([titulo(texto, color, 10, "left")])
+            continue
+
+        label, is_bold, num_fmt = datos[row_num]
+        fila = [celda(label, bg=g.C_BLUE_L if is_bold else g.C_WHITE,
+                      bold=is_bold, h="left")]
+        for m in lay.meses:
+            bg, fg = g.fc_colores(row_num, m, lay)
+            real = g.fc_real(reales, row_num, m)
+            fila.append(celda(formula(row_num, m) if real is None else real,
+                              bg=bg if real is None else g.C_YELLOW, fg=fg,
+                              bold=is_bold, size=9, num_fmt=num_fmt))
+        fila.append(celda(g.fc_total_formula(row_num, lay), bg=g.C_BLUE_L, bold=True,
+                          num_fmt=num_fmt))
+        ws.append(fila)
+
+    # ── Filas helper del modo compartidas ──
+    if compartidas:
+        ultima = max(datos)
+        for row_num, label, valores in g.fc_helpers(lay):
+            for _ in range(row_num - ultima - 1):
+                ws.append([])
+            ultima = row_num
+            ws.append([celda(label, bg=None, fg="AAAAAA", size=8, italic=True, h="left",
+                             border=False), *valores])
+
+    return ValoresFlujo(modelo, lay, compartidas) if modelo is not None else {}
+
+
+def generar_libro_stream(params=None, out=g.OUT_DEFAULT, cachear_valores=True,
+                         riesgo=None, equilibrio=None, sensibilidad=None, formulas="celda",
+                         medir=g.sin_medir, reales=None, conciliacion=None):
+    """Como generar_libro, pero con openpyxl en modo write_only."""
+    params = {**PARAMETROS_DEFAULT, **(params or {})}
+    lay    = g.layout_de(params)
+    with medir("modelo"):
+        modelo = (ModeloFlujo(params, horizonte=lay.horizonte, reales=reales)
+                  if cachear_valores else None)
+    compartidas = formulas == "compartidas"
+
+    libro = LibroStream()
+    with medir("build_parametros"):
+        g.build_parametros(libro, params)
+    with medir("build_flujo"):
+        cache_fc = build_flujo_stream(libro, modelo, lay, compartidas, reales)
+    with medir("build_resumen"):
+        cache_resumen = g.build_resumen(libro, modelo, lay, equilibrio)
+    cache = {"Flujo de Caja Mensual": cache_fc, "Resumen": cache_resumen}
+    if riesgo is not None:
+        with medir("build_riesgo"):
+            g.build_riesgo(libro, riesgo)
+    if sensibilidad is not None:
+        with medir("build_sensibilidad"):
+            g.build_sensibilidad(libro, sensibilidad)
+    if conciliacion is not None:
+        with medir("build_real_vs_proyectado"):
+            cache["Real vs Proyectado"] = g.build_real_vs_proyectado(libro, conciliacion,
+                                                                     modelo, lay)
+
+    with medir("wb.save"):
+        libro.save(out)
+    grupos = {"Flujo de Caja Mensual": g.grupos_compartidos(lay)} if compartidas else None
+    if modelo is not None or grupos:
+        with medir("valores_cacheados"):
+            g.escribir_valores_cacheados(out, cache if modelo is not None else {}, grupos)
+    return out
@@ -0,0 +1,6 @@
+"""Los módulos de airbnb/ se importan planos (python cli.py …): mismo sys.path acá."""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
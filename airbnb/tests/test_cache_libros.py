@@ -0,0 +1,45 @@
+import os
+import stat
+
+from cache_libros import CacheLibros
+
+
+def _libro(tmp_path, nombre, size):
+    path = tmp_path / nombre
+    path.write_bytes(b"x" * size)
+    return str(path)
+
+
+def test_acierto_entrega_una_copia_escribible(tmp_path):
+    cache = CacheLibros(str(tmp_path / "cache"))
+    cache.guardar("k", _libro(tmp_path, "src.xlsx", 10))
+    out = str(tmp_path / "out.xlsx")
+
+    assert cache.obtener("k", out)
+    entrada = cache._ruta("k")
+    assert not os.path.samefile(out, entrada)
+    assert os.stat(out).st_mode & stat.S_IWUSR
+    assert not os.stat(entrada).st_mode & stat.S_IWUSR
+
+    with open(out, "ab") as f:                   # editar la salida no toca el cache
+        f.write(b"editado")
+    assert os.path.getsize(entrada) == 10
+
+
+def test_desaloja_solo_al_pasar_el_presupuesto(tmp_path, monkeypatch):
+    cache = CacheLibros(str(tmp_path / "cache"), max_bytes=25)
+    recorridos = []
+    desalojar = cache.desalojar
+    monkeypatch.setattr(cache, "desalojar", lambda: recorridos.append(1) or desalojar())
+
+    for i in range(2):
+        cache.guardar(f"k{i}", _libro(tmp_path, f"{i}.xlsx", 10))
+    assert recorridos == [] and cache.bytes == 20
+
+    cache.guardar("k1", _libro(tmp_path, "1b.xlsx", 12))     # reemplazo: suma la diferencia
+    assert recorridos == [] and cache.bytes == 22
+
+    cache.guardar("k2", _libro(tmp_path, "2.xlsx", 10))
+    assert recorridos == [1] and cache.bytes <= 25
+    assert not os.path.exists(cache._ruta("k0"))             # el menos usado
+    assert CacheLibros(cache.directorio).bytes == cache.bytes
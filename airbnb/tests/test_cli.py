@@ -0,0 +1,67 @@
+import json
+import os
+import random
+import subprocess
+import sys
+
+import openpyxl
+import pytest
+
+from cli import main
+from evaluador import Evaluador
+from generar_flujo_caja import generar_libro
+from parametros import PARAMETROS_DEFAULT
+
+AIRBNB = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CELDAS = {
+    "Flujo acumulado final":    "flujo_acum_final",
+    "VAN  (Valor Actual Neto)": "van",
+    "TIR mensual":              "tir_mensual",
+    "TIR anual equiv.":         "tir_anual",
+    "Payback (meses aprox.)":   "payback",
+}
+
+
+def _params(rng):
+    h = rng.randint(12, 240)
+    return {**PARAMETROS_DEFAULT,
+            "horizonte": h,
+            "gracia":    rng.randint(0, min(h, 18)),
+            "adr":       rng.uniform(15_000, 80_000),
+            "noches":    rng.uniform(5, 28),
+            "crec_adr":  rng.uniform(-0.05, 0.10),
+            "dividendo": rng.uniform(0, 900_000),
+            "inversion": rng.uniform(0, 20_000_000),
+            "tasa":      rng.uniform(0.02, 0.25)}
+
+
+@pytest.mark.parametrize("semilla", range(6))
+def test_summary_coincide_con_el_libro(tmp_path, semilla, capsys):
+    """--summary (ModeloFlujo) contra las fórmulas del libro recalculadas por el evaluador."""
+    params = _params(random.Random(semilla))
+    out = str(tmp_path / "libro.xlsx")
+    generar_libro(params, out, cachear_valores=False)       # sin valores de ModeloFlujo
+    ev = Evaluador.desde_libro(out).calcular()
+    ws = openpyxl.load_workbook(out)["Resumen"]
+    libro = {CELDAS[a.value]: ev.valor(("Resumen", b.coordinate))
+             for a, b in ws.iter_rows(min_col=1, max_col=2) if a.value in CELDAS}
+
+    argv = ["--summary", "json"] + [f"--{k.replace('_', '-')}={v!r}" for k, v in params.items()]
+    assert main(argv) == 0
+    kpis = json.loads(capsys.readouterr().out)
+    assert set(libro) == set(CELDAS.values())
+    for clave, valor in libro.items():
+        if isinstance(valor, str):
+            assert kpis[clave] == valor
+        else:
+            assert kpis[clave] == pytest.approx(valor, rel=1e-9, abs=1e-6)
+
+
+def test_summary_no_importa_openpyxl():
+    codigo = ("import sys, cli; cli.main(['--summary', 'json']); "
+              "print('openpyxl' in sys.modules, file=sys.stderr)")
+    r = subprocess.run([sys.executable, "-c", codigo], cwd=AIRBNB, capture_output=True,
+                       text=True, check=True)
+    assert r.stderr.strip() == "False"
+    assert json.loads(r.stdout)["payback"].endswith("meses")
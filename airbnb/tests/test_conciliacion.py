@@ -0,0 +1,101 @@
+import numpy as np
+import pytest
+
+from conciliacion import CONCEPTOS, Reglas, conciliar
+
+C = {c: i for i, c in enumerate(CONCEPTOS)}
+
+
+# ── Reglas ────────────────────────────────────────────────────────────────────
+def test_reglas_por_defecto():
+    r = Reglas()
+    assert r.clasificar("TRANSF. AIRBNB PAYMENTS", 350_000) == C["ing_netos"]
+    assert r.clasificar("PAC Aguas Andinas S.A.", -18_000) == C["servicios"]
+    assert r.clasificar("Pago Gastos Comunes Depto 1203", -90_000) == C["g_comunes"]
+    assert r.clasificar("Compra supermercado", -25_000) == -1
+
+
+def test_reglas_signo_y_frase_completa():
+    r = Reglas([{"concepto": "ing_netos", "contiene": "airbnb", "signo": "+"},
+                {"concepto": "servicios", "contiene": "aguas andinas"}])
+    assert r.clasificar("AIRBNB reverso", -10_000) == -1          # signo no calza
+    assert r.clasificar("aguas del valle andinas", -1) == -1      # frase no contigua
+    assert r.clasificar("Aguas  Andinas", -1) == C["servicios"]   # normaliza espacios
+
+
+def test_reglas_la_primera_gana():
+    r = Reglas([{"concepto": "fondo", "contiene": "mantencion ascensor"},
+                {"concepto": "g_comunes", "contiene": "mantencion"}])
+    assert r.clasificar("Mantención ascensor edificio", -1) == C["fondo"]
+    assert r.clasificar("Mantención jardín", -1) == C["g_comunes"]
+    assert r.clasificar("Mantención ascensor edificio", -1) == C["fondo"]   # memo
+
+
+@pytest.mark.parametrize("regla", [{"concepto": "otro", "contiene": "x"},
+                                   {"concepto": "fondo", "contiene": "  "},
+                                   {"concepto": "fondo", "contiene": "x", "signo": "?"},
+                                   {"contiene": "x"}])
+def test_reglas_invalidas(regla):
+    with pytest.raises(ValueError):
+        Reglas([regla])
+
+
+# ── Conciliación ──────────────────────────────────────────────────────────────
+def test_conciliar_agrega_por_concepto_y_mes(tmp_path):
+    cartola = tmp_path / "cartola.csv"
+    cartola.write_text(
+        "Fecha;Descripción;Cargo;Abono;Saldo\n"
+        "02/01/2025;Transferencia Airbnb;;400.000;400.000\n"
+        "5/1/2025;Gastos comunes enero;90.000;;310.000\n"
+        "03/02/2025;Airbnb;;250.000;560.000\n"
+        "10/02/2025;Compra farmacia;12.000;;548.000\n", encoding="utf-8")
+    conc = conciliar(str(cartola), bloque=2)
+    assert conc.meses.astype(str).tolist() == ["2025-01", "2025-02"]
+    assert conc.fila("ing_netos").tolist() == [400_000, 250_000]
+    assert conc.fila("g_comunes").tolist() == [90_000, 0]      # egresos en positivo
+    assert conc.sin_clasificar.tolist() == [0, -12_000]
+    assert conc.movimientos.tolist() == [2, 2]
+    assert conc.no_clasificados.tolist() == [0, 1]
+    assert conc.descartadas == 0
+
+
+def test_conciliar_descarta_filas_que_no_son_movimientos(tmp_path):
+    cartola = tmp_path / "cartola.csv"
+    cartola.write_text(
+        "fecha,descripcion,monto\n"
+        "2025-01-02,Airbnb,400000\n"
+        "Saldo final\n"                         # fila corta
+        ",Subtotal enero,400000\n"              # sin fecha
+        "Total,,400000\n"                       # fecha no reconocida
+        "2025-01-09,Enel,\n"                    # sin monto
+        "2025-01-10,Enel,-30000\n", encoding="utf-8")
+    conc = conciliar(str(cartola))
+    assert conc.fila("ing_netos").tolist() == [400_000]
+    assert conc.fila("servicios").tolist() == [30_000]
+    assert conc.descartadas == 4
+    assert [f for _, f in conc.muestra_descartadas][:2] == ["Saldo final",
+                                                            ";Subtotal enero;400000"]
+
+
+def test_conciliar_formato_mes_primero(tmp_path):
+    cartola = tmp_path / "cartola.csv"
+    cartola.write_text("date,description,amount\n1/31/2025,Airbnb,100\n",
+                       encoding="utf-8")
+    conc = conciliar(str(cartola), formato="MDA")
+    assert conc.meses.astype(str).tolist() == ["2025-01"]
+    assert np.array_equal(conc.fila("ing_netos"), [100.0])
+
+
+def test_conciliar_meses_antes_de_1970(tmp_path):
+    cartola = tmp_path / "cartola.csv"
+    cartola.write_text(
+        "fecha,descripcion,monto\n"
+        "1969-11-03,Airbnb,100\n"
+        "1969-12-20,Enel,-30\n"
+        "1970-01-05,Airbnb,200\n"
+        "1970-01-06,Compra,-7\n", encoding="utf-8")
+    conc = conciliar(str(cartola), bloque=2)
+    assert conc.meses.astype(str).tolist() == ["1969-11", "1969-12", "1970-01"]
+    assert conc.fila("ing_netos").tolist() == [100, 0, 200]
+    assert conc.fila("servicios").tolist() == [0, 30, 0]
+    assert conc.sin_clasificar.tolist() == [0, 0, -7]
@@ -0,0 +1,114 @@
+import zipfile
+
+import numpy as np
+import openpyxl
+import pytest
+from openpyxl.utils.cell import coordinate_to_tuple
+
+from evaluador import Evaluador, recalcular
+from generar_flujo_caja import P_ROW, ErrorExcel, generar_libro
+
+CASOS = [
+    ({}, {}),
+    ({"horizonte": 120, "gracia": 10, "crec_adr": 0.07}, {}),
+    ({"horizonte": 12, "gracia": 12}, {}),                      # TIR N/D, no recuperado
+    ({"adr": 5_000}, {"backend": "stream"}),
+    ({"horizonte": 48}, {"formulas": "compartidas"}),
+    ({}, {"reales": {"adr": np.r_[np.full(8, 41_000.0), np.full(28, np.nan)]}}),
+]
+
+
+def _iguales(v, ref):
+    if isinstance(v, str) or isinstance(ref, str):
+        return v == ref
+    if isinstance(v, bool) or isinstance(ref, bool):
+        return bool(v) == bool(ref)
+    return abs(v - ref) <= 1e-7 * max(1.0, abs(ref))
+
+
+@pytest.mark.parametrize("params, opciones", CASOS)
+def test_recalculo_igual_a_valores_cacheados(tmp_path, params, opciones):
+    out = str(tmp_path / "libro.xlsx")
+    generar_libro(params, out, **opciones)
+    ev = Evaluador.desde_libro(out).calcular()
+    wb = openpyxl.load_workbook(out, data_only=True)
+
+    distintas = [(hoja, coord, v, wb[hoja][coord].value)
+                 for hoja, vals in ev.resultados().items() for coord, v in vals.items()
+                 if not _iguales(v, wb[hoja][coord].value)]
+    assert sum(map(len, ev.resultados().values())) > 100
+    assert distintas == []
+
+
+def test_cambio_incremental_igual_a_regenerar(tmp_path):
+    base, nuevo = str(tmp_path / "base.xlsx"), str(tmp_path / "nuevo.xlsx")
+    generar_libro({}, base)
+    generar_libro({"adr": 42_000}, nuevo)
+
+    ev  = Evaluador.desde_libro(base).calcular()
+    n   = ev.cambiar({f"Parámetros!B{P_ROW['adr']}": 42_000})
+    ref = Evaluador.desde_libro(nuevo).calcular()
+    assert 0 < n < len(ev.formulas)
+    esperado = ref.resultados()
+    assert [(h, c) for h, vals in ev.resultados().items() for c, v in vals.items()
+            if not _iguales(v, esperado[h][c])] == []
+
+
+def _partes(path):
+    with zipfile.ZipFile(path) as z:
+        return {n: z.read(n) for n in z.namelist()}
+
+
+def test_recalcular_con_cambios_conserva_el_xml(tmp_path):
+    opciones = {"backend": "stream", "formulas": "compartidas"}
+    path, nuevo = str(tmp_path / "libro.xlsx"), str(tmp_path / "nuevo.xlsx")
+    generar_libro({}, path, **opciones)
+    generar_libro({"adr": 42_000}, nuevo, **opciones)
+    antes = _partes(path)
+
+    recalcular(path, {f"Parámetros!B{P_ROW['adr']}": 42_000})
+    despues = _partes(path)
+    assert sorted(despues) == sorted(antes)
+    hoja_fc = "xl/worksheets/sheet2.xml"
+    assert despues[hoja_fc].count(b'<f t="shared"') == antes[hoja_fc].count(b'<f t="shared"') > 0
+    assert despues["xl/styles.xml"] == antes["xl/styles.xml"]
+
+    wb, ref = (openpyxl.load_workbook(p, data_only=True) for p in (path, nuevo))
+    for hoja in ("Parámetros", "Flujo de Caja Mensual", "Resumen"):
+        distintas = [c.coordinate for fila in ref[hoja].iter_rows() for c in fila
+                     if c.value is not None and not _iguales(wb[hoja][c.coordinate].value,
+                                                             c.value)]
+        assert distintas == []
+
+
+def test_recalcular_celda_inexistente_no_toca_el_libro(tmp_path):
+    path = str(tmp_path / "libro.xlsx")
+    generar_libro({}, path)
+    antes = _partes(path)
+    with pytest.raises(ValueError, match="Parámetros!Z999"):
+        recalcular(path, {"Parámetros!Z999": 1})
+    assert _partes(path) == antes
+
+
+# ── Fórmulas sueltas ──────────────────────────────────────────────────────────
+def _hoja(**celdas):
+    return Evaluador({("H", *coordinate_to_tuple(k)): v for k, v in celdas.items()})
+
+
+def test_funciones_y_errores():
+    ev = _hoja(A1=-100, A2=60, A3=60, A4=0,
+               B1="=IRR(A1:A3)", B2="=A1/A4", B3='=IFERROR(A1/A4,"N/D")',
+               B4='=COUNTIF(A1:A4,"<0")', B5='=IF(A2>=60,"sí","no")&"!"',
+               B6="=NPV(0.1,A2:A3)+A1", B7="=SUM(A1:A4)*10%").calcular()
+    assert ev.valor("H!B1") == pytest.approx(0.130662, abs=1e-6)
+    assert ev.valor("H!B2") == ErrorExcel("#DIV/0!")
+    assert ev.valor("H!B3") == "N/D"
+    assert ev.valor("H!B4") == 1
+    assert ev.valor("H!B5") == "sí!"
+    assert ev.valor("H!B6") == pytest.approx(60 / 1.1 + 60 / 1.21 - 100)
+    assert ev.valor("H!B7") == pytest.approx(2.0)
+
+
+def test_referencia_circular():
+    with pytest.raises(ValueError, match="circular"):
+        _hoja(A1="=B1+1", B1="=A1")
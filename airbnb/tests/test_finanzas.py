@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+
+import finanzas
+from finanzas import tir
+
+VP     = [-100.0, 110.0]                                   # Newton sobre el valor presente
+VF     = [-100.0] + [0.0] * 9 + [1.0]                      # r ≈ -37%: reintento en 1+r
+BISECC = [-1000.0] + [1.0] * 300                           # ambos Newton fallan
+
+
+def _vpn(flujos, r):
+    return sum(c / (1 + r) ** t for t, c in enumerate(flujos))
+
+
+@pytest.fixture
+def caminos(monkeypatch):
+    """Registra qué métodos corrió tir: ["vp", "vf", "biseccion"]."""
+    usados = []
+    newton, biseccion = finanzas._newton, finanzas._biseccion
+
+    def espia_newton(c, x, *args):
+        usados.append("vp" if "vp" not in usados else "vf")
+        return newton(c, x, *args)
+
+    def espia_biseccion(c, x0, *args):
+        usados.append("biseccion")
+        return biseccion(c, x0, *args)
+    monkeypatch.setattr(finanzas, "_newton", espia_newton)
+    monkeypatch.setattr(finanzas, "_biseccion", espia_biseccion)
+    return usados
+
+
+def test_newton_valor_presente(caminos):
+    assert tir(VP) == pytest.approx(0.10, abs=1e-12)
+    assert caminos == ["vp"]
+
+
+def test_reintento_valor_futuro(caminos):
+    assert tir(VF) == pytest.approx(0.01 ** 0.1 - 1, abs=1e-12)
+    assert caminos == ["vp", "vf"]
+
+
+def test_biseccion(caminos):
+    r = tir(BISECC)
+    assert caminos == ["vp", "vf", "biseccion"]
+    assert -1 < r < 0
+    assert abs(_vpn(BISECC, r)) < 1e-6
+
+
+@pytest.mark.parametrize("flujos", [[100.0, 50.0], [-100.0, -50.0], [0.0, 0.0, 0.0]])
+def test_sin_cambio_de_signo_es_nan(flujos):
+    assert np.isnan(tir(flujos))
+
+
+def test_lote_igual_a_filas_sueltas():
+    filas = [VP, VF, BISECC, [100.0, 50.0]]
+    n = max(map(len, filas))
+    lote = np.array([f + [0.0] * (n - len(f)) for f in filas])   # ceros al final: misma TIR
+    r = tir(lote.reshape(2, 2, n))
+    assert r.shape == (2, 2)
+    np.testing.assert_allclose(r.ravel(), [tir(f) for f in filas], rtol=1e-9, atol=1e-12)
+
+
+def test_filas_sin_cambio_de_signo_no_pasan_por_los_metodos(monkeypatch):
+    filas = []
+    newton = finanzas._newton
+
+    def espia(c, x, *args):
+        filas.append(len(c))
+        return newton(c, x, *args)
+    monkeypatch.setattr(finanzas, "_newton", espia)
+
+    lote = np.array([[-100.0, -50.0, -1.0], VP + [0.0], [5.0, 0.0, 1.0], [0.0, 0.0, 0.0]])
+    r = tir(lote)
+    assert filas == [1]                                        # solo la fila VP
+    assert r[1] == pytest.approx(0.10, abs=1e-12)
+    assert np.isnan(r[[0, 2, 3]]).all()
+
+    filas.clear()
+    assert np.isnan(tir(-np.ones((1000, 240)))).all()
+    assert filas == []
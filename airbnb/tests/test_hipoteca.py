@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+from hipoteca import SerieUF, cuota_uf, dividendos, params_credito
+
+
+def test_cuota_francesa():
+    assert cuota_uf(3000, 0.045, 300) == pytest.approx(16.67497, abs=1e-5)
+    assert cuota_uf(1200, 0.0, 120) == pytest.approx(10.0)
+
+
+def test_serie_uf_indice_mensual_y_proyeccion():
+    fechas = np.arange(np.datetime64("2025-01-01"), np.datetime64("2025-03-10"))
+    uf = SerieUF(fechas, 38_000 + np.arange(fechas.size), dia=9)
+    assert uf["2025-02"] == 38_000 + 31 + 8             # 9 de febrero
+    assert uf.mensual("2025-03", 13)[12] == pytest.approx(uf["2025-03"] * 1.03)
+    assert uf.mensual("2024-11", 3).tolist() == [38_008, 38_008, 38_008]   # antes: primer dato
+
+
+def test_serie_uf_que_parte_despues_del_inicio():
+    uf = SerieUF(np.array(["2025-07-01", "2025-08-01"], dtype="datetime64[D]"),
+                 [39_000, 39_100], inflacion=0.0)
+    params, reales = params_credito({"gracia": 0, "horizonte": 12}, 1000, 0.04, 24, uf)
+    assert reales["dividendo"][0] == pytest.approx(cuota_uf(1000, 0.04, 24) * 39_000)
+    assert reales["dividendo"][7] == pytest.approx(cuota_uf(1000, 0.04, 24) * 39_100)
+    assert params["dividendo"] == pytest.approx(reales["dividendo"][0])
+
+
+def test_dividendos_vectorizados():
+    uf = SerieUF.constante(40_000, desde="2025-01", inflacion=0.0)
+    div = dividendos(1000, np.array([0.04, 0.05]), 24, uf, horizonte=36, primer_mes=7,
+                     inicio="2025-01")
+    assert div.shape == (2, 36)
+    assert (div[:, :6] == 0).all() and (div[:, 30:] == 0).all()
+    assert div[1, 6] == pytest.approx(cuota_uf(1000, 0.05, 24) * 40_000)
+
+
+def test_params_credito_primera_cuota():
+    uf = SerieUF.constante(40_000, desde="2025-01", inflacion=0.0)
+    params, reales = params_credito({"gracia": 3}, 1000, np.array([0.04, 0.05]), 24, uf,
+                                    inicio="2025-01")
+    assert np.allclose(params["dividendo"], reales["dividendo"][:, 3])
+    assert (reales["dividendo"][:, :3] == 0).all()
@@ -0,0 +1,40 @@
+import csv
+
+import pytest
+
+from generar_flujo_caja import generar_libro
+from ingesta import escribir_csv, escribir_informe, leer_directorio
+from lote import leer_tabla
+from parametros import PARAMETROS_DEFAULT
+
+
+@pytest.fixture
+def directorio(tmp_path):
+    generar_libro({"adr": 61000}, str(tmp_path / "casa_a.xlsx"))
+    generar_libro({"adr": 48000, "noches": 20}, str(tmp_path / "casa_b.xlsx"))
+    (tmp_path / "rota.xlsx").write_bytes(b"no es un zip")
+    return tmp_path
+
+
+def test_csv_de_parametros_se_lee_con_lote(directorio, tmp_path):
+    tabla = leer_directorio(str(directorio), workers=1)
+    path = tmp_path / "parametros.csv"
+    escribir_csv(tabla, str(path))
+
+    filas = dict(leer_tabla(str(path)))
+    assert sorted(filas) == ["casa_a", "casa_b"]        # la rota queda fuera
+    assert set(filas["casa_a"]) == set(PARAMETROS_DEFAULT)
+    assert float(filas["casa_a"]["adr"]) == 61000
+    assert float(filas["casa_b"]["noches"]) == 20
+    assert float(filas["casa_b"]["tasa"]) == PARAMETROS_DEFAULT["tasa"]
+
+
+def test_informe_lleva_errores_y_kpis(directorio, tmp_path):
+    tabla = leer_directorio(str(directorio), workers=1)
+    path = tmp_path / "informe.csv"
+    escribir_informe(tabla, str(path), {"van": [1.5, 2.5, float("nan")]})
+
+    with open(path, newline="", encoding="utf-8") as f:
+        filas = {fila["id"]: fila for fila in csv.DictReader(f)}
+    assert filas["casa_a"]["error"] == "" and filas["casa_a"]["van"] == "1.5"
+    assert filas["rota"]["error"] and filas["rota"]["van"] == ""
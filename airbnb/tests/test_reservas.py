@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from reservas import _fechas, leer_reservas, repartir
+
+
+def _d(*fechas):
+    return np.array(fechas, dtype="datetime64[D]")
+
+
+# ── Fechas ────────────────────────────────────────────────────────────────────
+def test_fechas_dia_primero_con_y_sin_cero():
+    assert _fechas(["3/7/2025", "03/07/2025", "3.7.2025"]).tolist() == \
+        _d("2025-07-03", "2025-07-03", "2025-07-03").tolist()
+
+
+def test_fechas_mes_primero_y_strptime():
+    assert _fechas(["3/7/2025", "12/31/2025"], "MDA").tolist() == \
+        _d("2025-03-07", "2025-12-31").tolist()
+    assert _fechas(["7/3/25"], "%m/%d/%y").tolist() == _d("2025-07-03").tolist()
+
+
+def test_fechas_iso_y_compactas():
+    assert _fechas(["2025-01-05T15:00", "20250102"]).tolist() == \
+        _d("2025-01-05", "2025-01-02").tolist()
+
+
+@pytest.mark.parametrize("textos", [["12/31/2025"], ["31/02/2025"], ["Total"], [""]])
+def test_fechas_invalidas_lanzan(textos):
+    with pytest.raises(ValueError):
+        _fechas(textos)
+
+
+def test_fechas_no_estricto_deja_nat():
+    assert np.isnat(_fechas(["", "Total", "31/02/2025", "2025-01-01"], estricto=False)).tolist() \
+        == [True, True, True, False]
+
+
+# ── Reparto por mes ───────────────────────────────────────────────────────────
+def test_repartir_cruza_meses():
+    fila, mes, noches, ingresos = repartir(_d("2025-01-30"), _d("2025-03-02"),
+                                           np.array([100.0]))
+    assert mes.astype(str).tolist() == ["2025-01", "2025-02", "2025-03"]
+    assert noches.tolist() == [2, 28, 1]
+    assert ingresos.tolist() == [200.0, 2800.0, 100.0]
+    assert fila.tolist() == [0, 0, 0]
+
+
+def test_repartir_checkout_el_primero_no_toca_el_mes_siguiente():
+    _, mes, noches, _ = repartir(_d("2025-01-28", "2024-12-31"),
+                                 _d("2025-02-01", "2025-01-01"), np.array([1.0, 1.0]))
+    assert list(zip(mes.astype(str).tolist(), noches.tolist())) == \
+        [("2025-01", 4), ("2024-12", 1)]
+
+
+def test_leer_reservas_agrega_por_mes(tmp_path):
+    csv = tmp_path / "reservas.csv"
+    csv.write_text("listing,check_in,check_out,total,status\n"
+                   "a,1/30/2025,2/2/2025,300,confirmed\n"
+                   "a,2/27/2025,3/1/2025,200,confirmed\n"
+                   "a,2/10/2025,2/12/2025,999,cancelled\n", encoding="utf-8")
+    ocup = leer_reservas(str(csv), bloque=1, formato="MDA")
+    assert ocup.meses.astype(str).tolist() == ["2025-01", "2025-02"]
+    assert ocup.noches[0].tolist() == [2, 3]
+    assert ocup.ingresos[0].tolist() == [200.0, 300.0]
+    assert ocup.reservas[0].tolist() == [1, 1]
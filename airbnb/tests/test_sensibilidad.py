@@ -0,0 +1,30 @@
+import openpyxl
+import pytest
+
+from generar_flujo_caja import build_sensibilidad
+from sensibilidad import analizar, grilla, variar
+
+# linspace(base·0.7, base·1.3, 11)[5] != base por redondeo
+COMISION = 0.03949832775919732
+
+
+def test_variar_redondea_el_centro():
+    assert COMISION not in variar("comision", COMISION, 0.3, 11).tolist()
+
+
+@pytest.mark.parametrize("n, base", [(11, [5, 5]), (5, [2, 2]), (4, [None, None])])
+def test_grilla_ubica_el_caso_base(n, base):
+    g = grilla("comision", "tasa", {"comision": COMISION, "tasa": 0.0731}, n=n)
+    assert g["base"] == base
+
+
+def test_sensibilidad_marca_una_celda_base_por_grilla():
+    res = analizar({"comision": COMISION}, pares=[("comision", "tasa")], n=7)
+    wb = openpyxl.Workbook()
+    build_sensibilidad(wb, res)
+    ws = wb["Sensibilidad"]
+    # Filas de datos: columna A es un valor de comisión; celdas B.. en negrita = base
+    negritas = [c.coordinate for fila in ws.iter_rows(min_col=2, max_col=8)
+                for c in fila
+                if c.font.b and isinstance(ws.cell(c.row, 1).value, float)]
+    assert len(negritas) == 2                    # VAN y TIR anual
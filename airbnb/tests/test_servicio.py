@@ -0,0 +1,181 @@
+import asyncio
+import concurrent.futures
+import io
+import json
+import zipfile
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+import servicio
+from servicio import LRU, ErrorHTTP, Servicio, leer_cuerpo
+
+
+# ── LRU ───────────────────────────────────────────────────────────────────────
+def test_lru_desaloja_el_menos_usado_dentro_del_presupuesto():
+    lru = LRU(max_bytes=10)
+    lru.guardar("a", b"aaaa")
+    lru.guardar("b", b"bbbb")
+    assert lru.obtener("a") == b"aaaa"          # "a" pasa a ser el más reciente
+    lru.guardar("c", b"cccc")
+
+    assert lru.obtener("b") is None
+    assert lru.obtener("a") == b"aaaa" and lru.obtener("c") == b"cccc"
+    assert lru.bytes == 8 and lru.desalojos == 1
+    assert lru.estadisticas()["entradas"] == 2
+
+
+def test_lru_no_guarda_valores_mayores_que_el_presupuesto():
+    lru = LRU(max_bytes=10)
+    lru.guardar("a", b"aaaa")
+    lru.guardar("grande", b"x" * 11)
+    assert lru.obtener("grande") is None
+    assert lru.obtener("a") == b"aaaa"
+    assert lru.bytes == 4 and lru.desalojos == 0
+
+
+# ── Contrapresión ─────────────────────────────────────────────────────────────
+def test_cola_llena_responde_503_con_retry_after():
+    async def caso():
+        s = Servicio(workers=1, cola=1)
+        liberar = asyncio.Event()
+
+        async def ejecutar(fn, *args):
+            try:
+                await liberar.wait()
+                return b"ok"
+            finally:
+                s.trabajos -= 1
+        s._ejecutar = ejecutar
+
+        en_pool = asyncio.ensure_future(s.resultado("kpis", {"adr": 1}))
+        en_cola = asyncio.ensure_future(s.resultado("kpis", {"adr": 2}))
+        await asyncio.sleep(0)
+        assert (s.trabajos, s.en_cola) == (2, 1)
+
+        with pytest.raises(ErrorHTTP) as e:
+            await s.resultado("kpis", {"adr": 3})
+        assert e.value.estado == 503
+        assert ("Retry-After", "1") in e.value.cabeceras
+        assert s.metricas.rechazos == 1
+
+        # Un pedido idéntico a uno en curso lo comparte: no ocupa cola
+        compartido = asyncio.ensure_future(s.resultado("kpis", {"adr": 2}))
+        liberar.set()
+        assert await en_pool == (b"ok", "miss")
+        assert await en_cola == (b"ok", "miss")
+        assert await compartido == (b"ok", "compartido")
+        assert s.trabajos == 0
+    asyncio.run(caso())
+
+
+def test_pool_roto_se_reemplaza_una_sola_vez():
+    class PoolRoto:
+        def __init__(self):
+            self.cierres = 0
+
+        def submit(self, fn, *args):
+            f = concurrent.futures.Future()
+            f.set_exception(BrokenProcessPool("worker muerto"))
+            return f
+
+        def shutdown(self, wait=True, cancel_futures=False):
+            self.cierres += 1
+
+    async def caso():
+        s = Servicio(workers=2)
+        s._cupos = asyncio.Semaphore(2)
+        roto = s._pool = PoolRoto()
+        s.trabajos = 2
+        res = await asyncio.gather(s._ejecutar(len, b""), s._ejecutar(len, b""),
+                                   return_exceptions=True)
+        assert all(isinstance(r, BrokenProcessPool) for r in res)
+        assert roto.cierres == 1
+        assert isinstance(s._pool, concurrent.futures.ProcessPoolExecutor)
+        s.cerrar()
+    asyncio.run(caso())
+
+
+# ── HTTP ──────────────────────────────────────────────────────────────────────
+@pytest.mark.parametrize("largo", ["abc", "-1"])
+def test_content_length_invalido_responde_400(largo):
+    async def caso():
+        s = Servicio(workers=1)
+        servidor = await asyncio.start_server(s.conexion, "127.0.0.1", 0)
+        puerto = servidor.sockets[0].getsockname()[1]
+        async with servidor:
+            reader, writer = await asyncio.open_connection("127.0.0.1", puerto)
+            writer.write(f"POST /kpis HTTP/1.1\r\nContent-Length: {largo}\r\n\r\n".encode())
+            await writer.drain()
+            respuesta = await reader.read()
+            writer.close()
+        return respuesta
+    respuesta = asyncio.run(caso())
+    assert respuesta.startswith(b"HTTP/1.1 400 ")
+    assert b"Content-Length" in respuesta.split(b"\r\n\r\n", 1)[1]
+
+
+# ── Cuerpo del pedido ─────────────────────────────────────────────────────────
+@pytest.mark.parametrize("cuerpo, mensaje", [
+    (b"{no es json", "JSON inválido"),
+    (b"[1, 2]", "objeto JSON"),
+    (b'{"foo": 1}', "Claves desconocidas"),
+    (b'{"horizonte": 12, "gracia": 13}', "gracia fuera de rango"),
+    (b'{"horizonte": 0}', "horizonte debe ser"),
+])
+def test_leer_cuerpo_rechaza(cuerpo, mensaje):
+    with pytest.raises(ValueError, match=mensaje):
+        leer_cuerpo(cuerpo)
+
+
+def test_leer_cuerpo_rechaza_valor_no_numerico():
+    with pytest.raises(ValueError):
+        leer_cuerpo(b'{"adr": "abc"}')
+
+
+def test_leer_cuerpo_completa_con_defaults():
+    params = leer_cuerpo(b'{"params": {"adr": "42_000", "noches": null}}')
+    assert params["adr"] == 42000
+    assert params["noches"] == servicio.PARAMETROS_DEFAULT["noches"]
+
+
+# ── Extremo a extremo ─────────────────────────────────────────────────────────
+def _pedir_hasta_eof(ruta, cuerpo):
+    """Pedido con Connection: close contra servir(); lee la respuesta hasta EOF."""
+    async def caso():
+        listo = asyncio.get_running_loop().create_future()
+        servidor = asyncio.ensure_future(servicio.servir(
+            puerto=0, workers=1, listo=lambda srv: listo.set_result(srv)))
+        try:
+            srv = await asyncio.wait_for(listo, 30)
+            puerto = srv.sockets[0].getsockname()[1]
+            reader, writer = await asyncio.open_connection("127.0.0.1", puerto)
+            writer.write(f"POST {ruta} HTTP/1.1\r\nConnection: close\r\n"
+                         f"Content-Length: {len(cuerpo)}\r\n\r\n".encode() + cuerpo)
+            await writer.drain()
+            respuesta = await asyncio.wait_for(reader.read(), 60)
+            writer.close()
+            return respuesta
+        finally:
+            servidor.cancel()
+            await asyncio.gather(servidor, return_exceptions=True)
+    return asyncio.run(caso())
+
+
+def test_kpis_con_connection_close_llega_a_eof():
+    respuesta = _pedir_hasta_eof("/kpis", b'{"adr": 50000}')
+    cabeza, cuerpo = respuesta.split(b"\r\n\r\n", 1)
+    assert cabeza.startswith(b"HTTP/1.1 200 ")
+    assert b"Connection: close" in cabeza
+    datos = json.loads(cuerpo)
+    assert datos["params"]["adr"] == 50000 and "van" in datos["kpis"]
+
+
+def test_libro_con_connection_close_llega_a_eof():
+    respuesta = _pedir_hasta_eof("/libro", b"{}")
+    cabeza, cuerpo = respuesta.split(b"\r\n\r\n", 1)
+    assert cabeza.startswith(b"HTTP/1.1 200 ")
+    largo = int(next(l for l in cabeza.split(b"\r\n")
+                     if l.lower().startswith(b"content-length:")).split(b":")[1])
+    assert len(cuerpo) == largo
+    assert zipfile.ZipFile(io.BytesIO(cuerpo)).testzip() is None
@@ -0,0 +1,22 @@
+import zipfile
+
+import generar_flujo_caja
+from generar_flujo_caja import generar_libro
+
+
+def _partes(path):
+    with zipfile.ZipFile(path) as z:
+        return {n: z.read(n) for n in z.namelist() if n != "docProps/core.xml"}
+
+
+def test_reescritura_por_bloques_igual_a_una_pasada(tmp_path, monkeypatch):
+    params = {"horizonte": 60, "gracia": 4}
+    opciones = {"backend": "stream", "formulas": "compartidas"}
+    una, bloques = str(tmp_path / "una.xlsx"), str(tmp_path / "bloques.xlsx")
+    monkeypatch.setattr(generar_flujo_caja, "BLOQUE_XML", 2**30)
+    generar_libro(params, una, **opciones)
+    monkeypatch.setattr(generar_flujo_caja, "BLOQUE_XML", 101)    # corta celdas y UTF-8
+    generar_libro(params, bloques, **opciones)
+
+    assert _partes(bloques) == _partes(una)
+    assert b"<v>" in _partes(una)["xl/worksheets/sheet2.xml"]